@@ -428,10 +428,23 @@ document.addEventListener('click', function(e) {
     }
 });
 
+// Showcase image, using the mirrored AVIF/WebP variants (scripts/mirror_images.py) when present
+function showcaseImageHtml(product) {
+    if (!product.thumbnail) {
+        return '<div class="placeholder">💊</div>';
+    }
+    const img = `<img src="${product.thumbnail}" alt="${product.name}" loading="lazy">`;
+    if (!product.srcset) return img;
+    const sources = Object.entries(product.srcset).map(([format, srcset]) =>
+        `<source type="image/${format}" srcset="${srcset}" sizes="(max-width: 600px) 50vw, 300px">`
+    ).join('');
+    return `<picture>${sources}${img}</picture>`;
+}
+
 // Load random products for home page
 async function loadHomeProducts() {
     try {
-        const response = await fetch('data/nbs_supplements.json');
+        const response = await fetch('data/catalog/index.json');
         const data = await response.json();
         
         // Get 4 random products
@@ -443,15 +456,13 @@ async function loadHomeProducts() {
         if (!container) return;
         
         container.innerHTML = randomProducts.map(product => `
-            <div class="product-showcase-card" onclick="window.location.href='supplement-detail.html?product=${encodeURIComponent(product.url)}'">
+            <div class="product-showcase-card" onclick="window.location.href='pages/${product.page || `supplement-detail.html?product=${encodeURIComponent(product.id)}`}'">
                 <div class="product-showcase-image">
-                    ${product.images && product.images.length > 0 
-                        ? `<img src="${product.images[0]}" alt="${product.name}">` 
-                        : '<div class="placeholder">💊</div>'}
+                    ${showcaseImageHtml(product)}
                 </div>
                 <div class="product-showcase-info">
                     <h3 class="product-showcase-name">${product.name}</h3>
-                    <p class="product-showcase-description">${product.short_description || product.description.substring(0, 80) + '...'}</p>
+                    <p class="product-showcase-description">${product.summary}</p>
                     <div class="product-showcase-price">${product.price.toFixed(2)} <small>EGP</small></div>
                 </div>
             </div>
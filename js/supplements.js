@@ -8,13 +8,17 @@ let currentSearch = '';
 let currentCategory = 'all';
 let currentPage = 1;
 let productsPerPage = 20;
+let searchIndex = null;
+let searchIndexLoading = null;
 
-// Load products from JSON
+// Load the slim listing index built by scripts/build_data.py
 async function loadProducts() {
     try {
-        const response = await fetch('../data/nbs_supplements.json');
+        const response = await fetch('../data/catalog/index.json');
         const data = await response.json();
         allProducts = data.products;
+        // Search postings refer to products by their position in the index
+        allProducts.forEach((product, position) => { product.position = position; });
         filteredProducts = [...allProducts];
         
         // Update total count
@@ -96,11 +100,17 @@ function applyFilters() {
         });
     
     // Apply search filter
-    if (currentSearch) {
+    if (currentSearch && searchIndex) {
+        const matches = searchIndexLookup(searchIndex, currentSearch);
+        if (matches) {
+            products = products.filter(product => matches.has(product.position));
+        }
+    } else if (currentSearch) {
+        // Search index still loading, scan the listing fields meanwhile
         products = products.filter(product => {
             const searchLower = currentSearch.toLowerCase();
             return product.name.toLowerCase().includes(searchLower) ||
-                   (product.description && product.description.toLowerCase().includes(searchLower));
+                   (product.summary && product.summary.toLowerCase().includes(searchLower));
         });
     }
     
@@ -146,22 +156,20 @@ function renderProducts() {
     
     // Render products
     grid.innerHTML = productsToShow.map(product => `
-        <div class="product-card" onclick="viewProduct('${encodeURIComponent(product.url)}')">
+        <a class="product-card" href="${productHref(product)}">
             <div class="product-image">
-                ${product.images && product.images.length > 0 
-                    ? `<img src="${product.images[0]}" alt="${product.name}">` 
-                    : '<div class="product-image-placeholder">💊</div>'}
+                ${productImageHtml(product)}
             </div>
             <div class="product-info">
                 <h3 class="product-name">${product.name}</h3>
-                <p class="product-description">${product.short_description || product.description.substring(0, 100) + '...'}</p>
+                <p class="product-description">${product.summary}</p>
                 <div class="product-price">${product.price.toFixed(2)} <small>EGP</small></div>
                 <span class="stock-badge ${product.in_stock ? 'in-stock' : 'out-of-stock'}">
                     ${product.in_stock ? '✓ In Stock' : '✗ Out of Stock'}
                 </span>
-                <button class="view-details-btn">View Details</button>
+                <span class="view-details-btn">View Details</span>
             </div>
-        </div>
+        </a>
     `).join('');
     
     // Render pagination
@@ -232,12 +240,131 @@ function goToPage(page) {
     }
 }
 
+// Mirrored images (scripts/mirror_images.py) are site-relative, hot-linked ones absolute
+function sitePath(path) {
+    return /^https?:/.test(path) ? path : `../${path}`;
+}
+
+// Card image with the mirrored AVIF/WebP variants when the listing has them
+function productImageHtml(product) {
+    if (!product.thumbnail) {
+        return '<div class="product-image-placeholder">💊</div>';
+    }
+    const img = `<img src="${sitePath(product.thumbnail)}" alt="${product.name}" loading="lazy">`;
+    if (!product.srcset) return img;
+    const sources = Object.entries(product.srcset).map(([format, srcset]) => {
+        const candidates = srcset.split(', ').map(sitePath).join(', ');
+        return `<source type="image/${format}" srcset="${candidates}" sizes="(max-width: 600px) 50vw, 300px">`;
+    }).join('');
+    return `<picture>${sources}${img}</picture>`;
+}
+
 // Search functionality
 function searchProducts(query) {
     currentSearch = query.toLowerCase().trim();
+    if (currentSearch && !searchIndex) {
+        loadSearchIndex().then(index => {
+            if (index && currentSearch) applyFilters();
+        });
+    }
     applyFilters();
 }
 
+// Fetch the prebuilt search index (scripts/search_index.py) on the first search
+function loadSearchIndex() {
+    if (!searchIndexLoading) {
+        searchIndexLoading = fetch('../data/catalog/search.json')
+            .then(response => response.json())
+            .then(data => {
+                searchIndex = decodeSearchIndex(data);
+                return searchIndex;
+            })
+            .catch(error => {
+                console.error('Error loading search index:', error);
+                return null;
+            });
+    }
+    return searchIndexLoading;
+}
+
+function decodeDeltas(deltas) {
+    let total = 0;
+    return deltas.map(delta => (total += delta));
+}
+
+function decodeSearchIndex(data) {
+    const trigrams = new Map();
+    for (const [gram, positions] of Object.entries(data.trigrams)) {
+        trigrams.set(gram, decodeDeltas(positions));
+    }
+    return {
+        arabic: data.arabic,
+        tokens: data.tokens,
+        postings: data.postings.map(decodeDeltas),
+        trigrams
+    };
+}
+
+// Same normalisation as normalise() in scripts/search_index.py
+const ARABIC_FOLD = { 'ى': 'ي', 'ة': 'ه', 'ٱ': 'ا', 'ـ': '' };
+
+function normaliseSearchText(text, arabic) {
+    let normalised = (text || '').normalize('NFKD').replace(/\p{Mn}/gu, '').toLowerCase();
+    if (arabic) {
+        normalised = normalised
+            .replace(/[ىةٱـ]/g, char => ARABIC_FOLD[char])
+            .replace(/[\u0660-\u0669]/g, char => String(char.charCodeAt(0) - 0x0660))
+            .replace(/[\u06F0-\u06F9]/g, char => String(char.charCodeAt(0) - 0x06F0));
+    }
+    return normalised;
+}
+
+function tokenizeSearchText(text, arabic) {
+    return normaliseSearchText(text, arabic).match(/[\p{L}\p{N}]+/gu) || [];
+}
+
+// Indexed tokens that start with a short term or contain a longer one
+function matchingTokens(index, term) {
+    const tokens = index.tokens;
+    if (term.length < 3) {
+        let low = 0;
+        let high = tokens.length;
+        while (low < high) {
+            const mid = (low + high) >> 1;
+            if (tokens[mid] < term) low = mid + 1;
+            else high = mid;
+        }
+        const found = [];
+        for (let i = low; i < tokens.length && tokens[i].startsWith(term); i++) {
+            found.push(i);
+        }
+        return found;
+    }
+    let candidates = null;
+    for (let i = 0; i + 3 <= term.length; i++) {
+        const positions = index.trigrams.get(term.slice(i, i + 3));
+        if (!positions) return [];
+        candidates = candidates === null
+            ? new Set(positions)
+            : new Set(positions.filter(position => candidates.has(position)));
+    }
+    return [...candidates].filter(position => tokens[position].includes(term));
+}
+
+// Positions of products matching every query term, null when the query has no terms
+function searchIndexLookup(index, query) {
+    let matches = null;
+    for (const term of tokenizeSearchText(query, index.arabic)) {
+        const docs = new Set();
+        for (const position of matchingTokens(index, term)) {
+            for (const doc of index.postings[position]) docs.add(doc);
+        }
+        matches = matches === null ? docs : new Set([...matches].filter(doc => docs.has(doc)));
+        if (matches.size === 0) break;
+    }
+    return matches;
+}
+
 // Helper function to sort products
 function sortProducts(products, sortBy) {
     return [...products].sort((a, b) => {
@@ -288,9 +415,24 @@ function clearFilters() {
     updateProductCount();
 }
 
+// Pre-rendered page of a listing entry (scripts/render_pages.py), else the client-rendered detail page
+function productHref(product) {
+    return product.page || `supplement-detail.html?product=${encodeURIComponent(product.id)}`;
+}
+
 // View product details
-function viewProduct(productUrl) {
-    window.location.href = `supplement-detail.html?product=${productUrl}`;
+function viewProduct(productId) {
+    window.location.href = productHref(allProducts.find(p => p.id === productId) || { id: productId });
+}
+
+// Product id from the ?product= parameter; old links carry the full product URL
+function productIdFromParam(param) {
+    if (!param || !param.startsWith('http')) {
+        return param;
+    }
+    const segments = new URL(param).pathname.split('/').filter(Boolean);
+    const slug = decodeURIComponent(segments[segments.length - 1] || '');
+    return slug.toLowerCase().replace(/[^a-z0-9]+/g, '-').replace(/^-+|-+$/g, '');
 }
 
 // Toggle mobile filters
@@ -304,23 +446,33 @@ function toggleFilters() {
 // Product Detail Page Functions
 function loadProductDetail() {
     const urlParams = new URLSearchParams(window.location.search);
-    const productUrl = decodeURIComponent(urlParams.get('product'));
+    const productId = productIdFromParam(urlParams.get('product'));
     
-    if (!productUrl) {
+    if (!productId) {
         window.location.href = 'supplements.html';
         return;
     }
     
-    fetch('../data/nbs_supplements.json')
-        .then(response => response.json())
-        .then(data => {
-            const product = data.products.find(p => p.url === productUrl);
-            if (product) {
-                renderProductDetail(product, data.products);
-            } else {
+    // Only this product's record, then its category shard for recommendations
+    fetch(`../data/catalog/products/${encodeURIComponent(productId)}.json`)
+        .then(response => {
+            if (!response.ok) {
+                return null;
+            }
+            return response.json();
+        })
+        .then(product => {
+            if (!product) {
                 showError('Product not found');
                 setTimeout(() => window.location.href = 'supplements.html', 2000);
+                return;
             }
+            const shard = product.category_id
+                ? fetch(`../data/catalog/categories/${product.category_id}.json`)
+                    .then(response => response.ok ? response.json() : { products: [] })
+                    .catch(() => ({ products: [] }))
+                : Promise.resolve({ products: [] });
+            return shard.then(category => renderProductDetail(product, category.products));
         })
         .catch(error => {
             console.error('Error loading product:', error);
@@ -362,7 +514,7 @@ function renderProductDetail(product, allProductsList) {
     
     // Get random products for recommendations (excluding current product)
     const relatedProducts = allProductsList
-        .filter(p => p.url !== product.url)
+        .filter(p => p.id !== product.id)
         .sort(() => 0.5 - Math.random())
         .slice(0, 4);
     
@@ -374,19 +526,17 @@ function renderProductDetail(product, allProductsList) {
                 <h2>You May Also Like</h2>
                 <div class="related-products-grid">
                     ${relatedProducts.map(relatedProduct => {
-                        const relatedImage = relatedProduct.images && relatedProduct.images.length > 0 
-                            ? `<img src="${relatedProduct.images[0]}" alt="${relatedProduct.name}">` 
-                            : '<div class="product-image-placeholder">💊</div>';
+                        const relatedImage = productImageHtml(relatedProduct);
                         
                         return `
-                            <div class="product-card" data-product-url="${encodeURIComponent(relatedProduct.url)}">
+                            <a class="product-card" href="${productHref(relatedProduct)}">
                                 <div class="product-image">${relatedImage}</div>
                                 <div class="product-info">
                                     <h3 class="product-name">${relatedProduct.name}</h3>
                                     <div class="product-price">${relatedProduct.price.toFixed(2)} <small>EGP</small></div>
-                                    <button class="view-details-btn">View Details</button>
+                                    <span class="view-details-btn">View Details</span>
                                 </div>
-                            </div>
+                            </a>
                         `;
                     }).join('')}
                 </div>
@@ -412,6 +562,8 @@ function renderProductDetail(product, allProductsList) {
                     ${product.in_stock ? '✓ In Stock' : '✗ Out of Stock'}
                 </span>
                 
+                <div class="price-history" id="priceHistory" hidden></div>
+                
                 <div class="product-detail-description">
                     <h3>Description</h3>
                     <p>${product.description || product.short_description || 'No description available.'}</p>
@@ -428,6 +580,54 @@ function renderProductDetail(product, allProductsList) {
     
     // Add event listeners after rendering
     setupDetailPageListeners(product);
+    
+    if (product.history) {
+        loadPriceHistory(product.id);
+    }
+}
+
+// Pre-rendered detail pages already have their markup, only the listeners and history are missing
+function hydrateProductDetail(product) {
+    setupDetailPageListeners(product);
+    
+    if (product.history) {
+        loadPriceHistory(product.id);
+    }
+}
+
+// Price changes recorded by scripts/price_history.py, exported by build_data.py
+function loadPriceHistory(productId) {
+    fetch(`../data/catalog/history/${encodeURIComponent(productId)}.json`)
+        .then(response => response.ok ? response.json() : null)
+        .then(history => {
+            if (history) renderPriceHistory(history);
+        })
+        .catch(error => console.error('Error loading price history:', error));
+}
+
+function renderPriceHistory(history) {
+    const container = document.getElementById('priceHistory');
+    if (!container) return;
+    
+    // points are [timestamp, price, original_price, in_stock], oldest first; show the latest few
+    const recent = history.points.slice(-5).reverse();
+    container.innerHTML = `
+        <h3>Price History</h3>
+        ${history.lowest !== null ? `
+            <p class="price-history-range">
+                Lowest ${history.lowest.toFixed(2)} EGP · Highest ${history.highest.toFixed(2)} EGP
+            </p>
+        ` : ''}
+        <ul>
+            ${recent.map(([timestamp, price, originalPrice, inStock]) => `
+                <li>
+                    <span>${new Date(timestamp * 1000).toLocaleDateString()}</span>
+                    <span>${price !== null ? `${price.toFixed(2)} EGP` : '—'}${originalPrice ? ` <s>${originalPrice.toFixed(2)}</s>` : ''}${inStock === false ? ' · Out of stock' : ''}</span>
+                </li>
+            `).join('')}
+        </ul>
+    `;
+    container.hidden = false;
 }
 
 function setupDetailPageListeners(product) {
@@ -451,17 +651,6 @@ function setupDetailPageListeners(product) {
     if (buyNowBtn) {
         buyNowBtn.addEventListener('click', () => buyNow(JSON.stringify(product)));
     }
-    
-    // Related product click listeners
-    const relatedCards = document.querySelectorAll('.related-products-grid .product-card');
-    relatedCards.forEach(card => {
-        card.addEventListener('click', () => {
-            const productUrl = card.getAttribute('data-product-url');
-            if (productUrl) {
-                window.location.href = `supplement-detail.html?product=${productUrl}`;
-            }
-        });
-    });
 }
 
 // Function to change main image when thumbnail is clicked (legacy support)
@@ -478,6 +667,16 @@ function changeMainImage(imageSrc, index) {
     }
 }
 
+// Order ingestion service (scripts/order_service.py); a page can override it before this script loads
+const ORDER_ENDPOINT = window.ORDER_ENDPOINT || 'http://127.0.0.1:8081/api/orders';
+
+function newClientOrderId() {
+    if (window.crypto && crypto.randomUUID) {
+        return crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+}
+
 // Buy Now functionality
 async function buyNow(productDataString) {
     let product;
@@ -505,8 +704,15 @@ async function buyNow(productDataString) {
     const originalText = button.textContent;
     button.textContent = 'Processing...';
     
+    // One id per purchase attempt: a retry after a network error resends it,
+    // so the order service answers with the stored order instead of a duplicate
+    if (!button.dataset.clientOrderId) {
+        button.dataset.clientOrderId = newClientOrderId();
+    }
+    
     // Prepare order data
     const orderData = {
+        client_order_id: button.dataset.clientOrderId,
         product_name: product.name,
         price: product.price,
         quantity: 1,
@@ -516,11 +722,8 @@ async function buyNow(productDataString) {
     };
     
     try {
-        // TODO: Replace with actual endpoint URL when provided
-        const endpoint = 'https://your-backend-endpoint.com/api/orders';
-        
         // Make HTTP POST request
-        const response = await fetch(endpoint, {
+        const response = await fetch(ORDER_ENDPOINT, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
@@ -530,14 +733,14 @@ async function buyNow(productDataString) {
         
         if (response.ok) {
             // Success
+            delete button.dataset.clientOrderId;
             button.textContent = '✓ Order Placed!';
             button.style.background = 'linear-gradient(135deg, #00D9FF 0%, #6C63FF 100%)';
             
             // Show success message
             showSuccess('Order placed successfully!');
             
-            // Log to console for now (since we don't have a real endpoint)
-            console.log('Order Data:', orderData);
+            console.log('Order:', await response.json());
             
             // Reset button after 3 seconds
             setTimeout(() => {
@@ -547,14 +750,17 @@ async function buyNow(productDataString) {
                 button.style.background = '';
             }, 3000);
         } else {
-            throw new Error('Order failed');
+            // The service rejected the order (e.g. stale price), a new attempt gets a new id
+            const result = await response.json().catch(() => ({}));
+            delete button.dataset.clientOrderId;
+            throw new Error((result.details || [result.error || 'Order failed']).join(', '));
         }
     } catch (error) {
         console.error('Order error:', error);
-        console.log('Order Data (logged for testing):', orderData);
+        console.log('Order Data:', orderData);
         
-        // Show info message
-        showInfo('Order data logged to console (endpoint not configured yet)');
+        // Show error message
+        showError(`Order not placed: ${error.message}`);
         
         // Reset button
         button.disabled = false;
@@ -636,8 +842,13 @@ document.addEventListener('DOMContentLoaded', () => {
         }
         
     } else if (document.getElementById('productDetailContainer')) {
-        // Detail page
-        loadProductDetail();
+        // Detail page; pages pre-rendered by scripts/render_pages.py embed their record
+        const productData = document.getElementById('productData');
+        if (productData) {
+            hydrateProductDetail(JSON.parse(productData.textContent));
+        } else {
+            loadProductDetail();
+        }
     }
 });
 
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Crawl Benchmark
+Runs the three scrapers end-to-end against the stand-in WooCommerce server and stores pages/sec, CPU, peak RSS and bytes as JSON
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from stand_in_server import add_server_arguments
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(os.path.dirname(SCRIPTS_DIR), 'bench_results')
+
+# name: (module, scraper class or factory, site served by the stand-in server)
+SCRAPERS = {
+    'ifit': ('scrape_ifit', 'IFitScraper', 'ifit'),
+    'nbs': ('scrape_nbs', 'NBSScraper', 'nbs'),
+    'fish_oil': ('scrape_fish_oil', 'fish_oil_scraper', 'ifit'),
+}
+
+
+def run_scraper(name, base_url, max_pages, workers, per_host, rate, backoff):
+    """Crawl once in this process and return its measurements"""
+    import importlib
+    from crawl_engine import CrawlEngine
+    from http_client import HttpClient
+    from metrics import Metrics
+
+    module, factory, _ = SCRAPERS[name]
+    make_scraper = getattr(importlib.import_module(module), factory)
+    metrics = Metrics()
+    engine = CrawlEngine(max_workers=workers, per_host_limit=per_host, rate=rate, burst=max(per_host, 1),
+                         metrics=metrics)
+    http = HttpClient({'User-Agent': 'crawl-benchmark'}, throttle=engine.throttle, backoff=backoff, metrics=metrics)
+    scraper = make_scraper(engine=engine, http=http, store_api=False, base_url=base_url, metrics=metrics)
+
+    start = time.perf_counter()
+    cpu_start = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scraper.scrape_all(max_pages=max_pages)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    engine.shutdown()
+    http.close()
+
+    stats = http.stats()
+    return {
+        'scraper': name,
+        'pages': stats['responses'],
+        'products': scraper.product_count,
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(stats['responses'] / elapsed, 2) if elapsed else 0.0,
+        'cpu_seconds': round(cpu, 3),
+        'cpu_ms_per_page': round(cpu / stats['responses'] * 1000, 2) if stats['responses'] else 0.0,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'bytes_wire': stats['bytes_wire'],
+        'bytes_decoded': stats['bytes_decoded'],
+        'requests': stats['requests'],
+        'retries': stats['retries'],
+        'errors': stats['errors'],
+        'stages': {stage_name: {key: stage[key] for key in ('count', 'sum', 'p50', 'p99')}
+                   for stage_name, stage in metrics.to_json()['stages'].items()},
+    }
+
+
+def start_server(args):
+    """Run stand_in_server.py in its own process so it does not share our CPU time, returns (process, url)"""
+    command = [sys.executable, os.path.join(SCRIPTS_DIR, 'stand_in_server.py'), '--port', '0',
+               '--pages', str(args.pages), '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+               '--error-rate', str(args.error_rate), '--seed', str(args.seed)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith('Listening on '):
+        process.kill()
+        raise SystemExit(f"stand_in_server.py did not start: {line}")
+    return process, line.split()[2]
+
+
+def measure(name, url, args):
+    """Run one scraper in a fresh interpreter so peak RSS is its own"""
+    site = SCRAPERS[name][2]
+    command = [sys.executable, os.path.abspath(__file__), '--child', name, '--base-url', f"{url}/{site}",
+               '--pages', str(args.pages), '--workers', str(args.workers), '--per-host', str(args.per_host),
+               '--rate', str(args.rate), '--backoff', str(args.backoff)]
+    output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarise(runs):
+    """Median of each numeric field over repeated runs"""
+    summary = dict(runs[0])
+    for key, value in runs[0].items():
+        if isinstance(value, (int, float)):
+            summary[key] = statistics.median(run[key] for run in runs)
+    summary['runs'] = len(runs)
+    return summary
+
+
+def previous_result(results_dir):
+    try:
+        names = sorted(name for name in os.listdir(results_dir) if name.startswith('crawl-') and name.endswith('.json'))
+    except FileNotFoundError:
+        return None
+    if not names:
+        return None
+    with open(os.path.join(results_dir, names[-1]), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SCRIPTS_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the scrapers against a local stand-in WooCommerce server')
+    parser.add_argument('--scrapers', default=','.join(SCRAPERS), help='comma-separated scrapers to run')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per scraper (the median is reported)')
+    parser.add_argument('--workers', type=int, default=8, help='crawl engine threads')
+    parser.add_argument('--per-host', type=int, default=4, help='in-flight requests per host')
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='requests per second per host (0 = no rate limit, measure the scraper itself)')
+    parser.add_argument('--backoff', type=float, default=0.05, help='retry backoff base in seconds')
+    parser.add_argument('--results-dir', default=RESULTS_DIR, help='where the JSON results are stored')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    if args.child:
+        result = run_scraper(args.child, args.base_url, args.pages, args.workers, args.per_host,
+                             args.rate, args.backoff)
+        print(json.dumps(result))
+        return
+
+    names = [name.strip() for name in args.scrapers.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SCRAPERS]
+    if unknown:
+        raise SystemExit(f"Unknown scrapers: {', '.join(unknown)} (choose from {', '.join(SCRAPERS)})")
+
+    config = {key: getattr(args, key) for key in ('pages', 'latency_ms', 'jitter_ms', 'error_rate', 'seed',
+                                                  'workers', 'per_host', 'rate', 'backoff', 'repeat')}
+    print(f"Stand-in server: {args.pages} listing pages per site, {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, "
+          f"{args.error_rate:.0%} errors; {args.workers} workers, {args.per_host} per host")
+    print("=" * 78)
+    process, url = start_server(args)
+    results = []
+    try:
+        for name in names:
+            results.append(summarise([measure(name, url, args) for _ in range(args.repeat)]))
+    finally:
+        process.terminate()
+        process.wait()
+
+    previous = previous_result(args.results_dir)
+    before = {result['scraper']: result for result in previous['results']} if previous else {}
+    print(f"{'scraper':<10} {'pages':>6} {'pages/s':>9} {'CPU s':>7} {'ms/page':>8} {'RSS MB':>7} "
+          f"{'MB wire':>8} {'retries':>7}")
+    for result in results:
+        line = (f"{result['scraper']:<10} {result['pages']:>6} {result['pages_per_sec']:>9.1f} "
+                f"{result['cpu_seconds']:>7.2f} {result['cpu_ms_per_page']:>8.2f} {result['peak_rss_mb']:>7.1f} "
+                f"{result['bytes_wire'] / 1e6:>8.2f} {result['retries']:>7}")
+        old = before.get(result['scraper'])
+        if old and old.get('pages_per_sec') and previous.get('config') == config:
+            change = result['pages_per_sec'] / old['pages_per_sec'] - 1
+            line += f"   {change:+.0%} vs {previous['commit'] or previous['timestamp']}"
+        print(line)
+
+    timestamp = time.strftime('%Y%m%dT%H%M%S')
+    os.makedirs(args.results_dir, exist_ok=True)
+    path = os.path.join(args.results_dir, f"crawl-{timestamp}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'timestamp': timestamp, 'commit': git_commit(), 'python': sys.version.split()[0],
+                   'cpu_count': os.cpu_count(), 'config': config, 'results': results}, f, indent=2)
+    print("=" * 78)
+    print(f"✓ Results saved to {path}")
+
+
+if __name__ == '__main__':
+    main()
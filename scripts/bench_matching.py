@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Product Matching Benchmark
+Times MinHash/LSH cross-store matching on synthetic two-store catalogues up to 100k products and checks it against known duplicates and a pairwise scan
+"""
+
+import argparse
+import random
+import time
+
+from match_products import ProductMatcher
+
+BRANDS = ['Optimum Nutrition', 'MuscleTech', 'Dymatize', 'BSN', 'Scitec', 'Nutrex', 'Limitless', 'Redrex',
+          'Organic Nation', 'Yava Labs', 'Natrol', 'NOW', "Nature's Way", 'Solaray', 'Jarrow', 'NeoCell',
+          "Puritan's Pride", 'Allmax', 'BPI Sports', 'Rule1', 'Isopure', 'Novogen', 'Dozova', 'Mazora', 'JNX Sports',
+          'Universal', 'Cellucor', 'Ghost', 'Myprotein', 'Applied Nutrition', 'Kevin Levrone', 'Biotech USA',
+          'Weider', 'Olimp', 'Mutant', 'Ronnie Coleman', 'Evlution', 'MusclePharm', 'Kaged', 'Transparent Labs']
+LINES = ['Gold', 'Standard', 'Whey', 'Isolate', 'Hydro', 'Platinum', 'Mass', 'Gainer', 'Serious', 'Creatine',
+         'Monohydrate', 'Micronized', 'Omega', 'Fish', 'Oil', 'Vitamin', 'D3', 'B12', 'Zinc', 'Magnesium',
+         'Collagen', 'Joint', 'Complex', 'Multi', 'Women', 'Men', 'Energy', 'Amino', 'EAA', 'BCAA', 'Pre',
+         'Workout', 'Pump', 'Burn', 'Lipo', 'Carnitine', 'Casein', 'Night', 'Vegan', 'Protein', 'Plant', 'Beef',
+         'Iso', 'Fit', 'Pro', 'Max', 'Ultra', 'Elite', 'Advanced', 'Formula', 'Immune', 'Sleep', 'Melatonin',
+         'Biotin', 'Green', 'Coffee', 'Glutamine', 'Electrolytes', 'Hydration', 'Recovery']
+FORMS = ['Powder', 'Capsules', 'Tablets', 'Softgels', 'Gummies', 'Shake', 'Bar', 'Liquid', 'Chewables', '']
+QUANTITIES = [('1', 'lb'), ('2', 'lbs'), ('5', 'lbs'), ('10', 'lbs'), ('1', 'kg'), ('2', 'kg'), ('60', 'caps'),
+              ('90', 'caps'), ('120', 'tablets'), ('30', 'servings'), ('300', 'g'), ('1000', 'mg'), ('', '')]
+PROMOTIONS = ['(Free shaker)', '(Free premium shaker)', '(Free bag with 2.3 kg / 5 lbs )', '(Offer)', '(New)']
+COPY_WORDS = ['supports', 'muscle', 'recovery', 'growth', 'each', 'serving', 'delivers', 'grams', 'of', 'high',
+              'quality', 'protein', 'with', 'added', 'vitamins', 'minerals', 'to', 'help', 'you', 'reach', 'your',
+              'fitness', 'goals', 'faster', 'formulated', 'for', 'athletes', 'daily', 'use', 'absorption', 'energy',
+              'endurance', 'strength', 'immune', 'health', 'heart', 'brain', 'joint', 'bone', 'skin', 'hair']
+
+STORES = ('https://ifit-eg.com', 'https://www.nbs-supplements.com')
+
+
+def concept_name(rng):
+    words = rng.sample(LINES, rng.choice((2, 3)))
+    number, unit = rng.choice(QUANTITIES)
+    return rng.choice(BRANDS), words, rng.choice(FORMS), number, unit
+
+
+def first_store_name(brand, words, form, number, unit):
+    quantity = f"{number} {unit}" if number else ''
+    return ' '.join(part for part in (brand, *words, form, quantity) if part)
+
+
+def second_store_name(rng, brand, words, form, number, unit):
+    """The same product as the other store might title it: promotions, unit spellings, dropped or moved words"""
+    if len(words) > 2 and rng.random() < 0.3:
+        words = [word for word in words if word != rng.choice(words)]
+    quantity = f"{number}{unit}" if number and rng.random() < 0.5 else f"{number} {unit}".strip()
+    parts = [brand, *words, form, quantity] if rng.random() < 0.7 else [*words, form, '-', brand, quantity]
+    name = ' '.join(part for part in parts if part)
+    if rng.random() < 0.4:
+        name = f"{name} {rng.choice(PROMOTIONS)}"
+    return name.upper() if rng.random() < 0.1 else name
+
+
+def synthetic_stores(size, shared=0.3, seed=1):
+    """
+    size products over two stores. A shared fraction of the first store's
+    products is listed by the second too under a reworded name with the
+    brand's description copy; returns the products and the (first, second)
+    positions of those true matches.
+    """
+    rng = random.Random(seed)
+    concepts = set()
+    products = []
+    truth = set()
+    while len(products) < size:
+        concept = concept_name(rng)
+        key = (concept[0], tuple(sorted(concept[1])), *concept[2:])
+        if key in concepts:
+            continue
+        concepts.add(key)
+        copy = ' '.join(rng.choice(COPY_WORDS) for _ in range(40))
+        slug = f"p{len(concepts)}"
+        listed_twice = rng.random() < shared and len(products) + 1 < size
+        store = 0 if listed_twice else rng.randrange(2)
+        products.append({
+            'url': f"{STORES[store]}/product/{slug}/",
+            'name': first_store_name(*concept),
+            'price': float(rng.randrange(200, 5000)),
+            'description': copy,
+        })
+        if listed_twice:
+            truth.add((len(products) - 1, len(products)))
+            products.append({
+                'url': f"{STORES[1]}/product/{slug}-eg/",
+                'name': second_store_name(rng, *concept),
+                'price': float(rng.randrange(200, 5000)),
+                'description': copy if rng.random() < 0.8 else '',
+            })
+    return products, truth
+
+
+def found_pairs(groups):
+    return {(first, second) for docs in groups for i, first in enumerate(docs) for second in docs[i + 1:]}
+
+
+def pairwise(matcher):
+    """Every cross-store pair checked with the same rule: what LSH avoids"""
+    stores = matcher.stores
+    matched = set()
+    for first in range(len(stores)):
+        for second in range(first + 1, len(stores)):
+            if stores[first] != stores[second] and matcher.is_match(first, second):
+                matched.add((first, second))
+    return matched
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark MinHash/LSH product matching on synthetic catalogues')
+    parser.add_argument('--sizes', default='10000,25000,50000,100000', help='comma-separated catalogue sizes')
+    parser.add_argument('--pairwise', type=int, default=3000,
+                        help='catalogue size for the pairwise comparison (0 to skip)')
+    parser.add_argument('--shared', type=float, default=0.3, help='share of products listed by both stores')
+    args = parser.parse_args()
+
+    print(f"{'products':>9} {'signatures':>11} {'candidates':>11} {'verify':>8} {'total':>8} "
+          f"{'pairs':>9} {'precision':>10} {'recall':>7}")
+    print("=" * 80)
+    for size in [int(size) for size in args.sizes.split(',') if size.strip()]:
+        products, truth = synthetic_stores(size, args.shared)
+        matcher = ProductMatcher()
+        matcher.add_all(products)
+        groups = matcher.groups()
+        found = found_pairs(groups)
+        correct = len(found & truth)
+        total = sum(matcher.seconds.values())
+        print(f"{size:>9} {matcher.seconds['signatures']:>10.2f}s {matcher.seconds['candidates']:>10.2f}s "
+              f"{matcher.seconds['verify']:>7.2f}s {total:>7.2f}s {matcher.counts['candidates']:>9} "
+              f"{correct / len(found) if found else 1:>10.3f} {correct / len(truth) if truth else 1:>7.3f}")
+
+    if args.pairwise:
+        products, _ = synthetic_stores(args.pairwise, args.shared)
+        matcher = ProductMatcher()
+        matcher.add_all(products)
+        start = time.perf_counter()
+        groups = matcher.groups()
+        lsh_time = time.perf_counter() - start
+        lsh = found_pairs(groups)
+        start = time.perf_counter()
+        exact = pairwise(matcher)
+        pairwise_time = time.perf_counter() - start
+        print("=" * 80)
+        print(f"Pairwise on {args.pairwise} products: {pairwise_time:.2f}s vs LSH {lsh_time:.2f}s "
+              f"(after signatures), LSH finds {len(lsh & exact)}/{len(exact)} of its matches")
+        largest = max(int(size) for size in args.sizes.split(','))
+        print(f"- pairwise grows with n²: about {pairwise_time * (largest / args.pairwise) ** 2 / 60:.0f} min "
+              f"at {largest} products")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Order Service Load Test
+Fires concurrent keep-alive Buy Now orders at order_service.py and reports p50/p99 latency and orders per second
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from order_service import DATA_DIR
+from postprocess import read_products
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of sorted values"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+
+def make_orders(products, count, replay_fraction, seed=1):
+    """Order payloads like the Buy Now button sends; a fraction repeat an earlier client_order_id"""
+    rng = random.Random(seed)
+    orders = []
+    for _ in range(count):
+        if orders and rng.random() < replay_fraction:
+            orders.append(rng.choice(orders))
+            continue
+        product = rng.choice(products)
+        quantity = rng.randint(1, 3)
+        orders.append({
+            'client_order_id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'product_name': product['name'],
+            'product_url': product['url'],
+            'price': product['price'],
+            'quantity': quantity,
+            'total': round(product['price'] * quantity, 2),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        })
+    return orders
+
+
+async def post_orders(host, port, path, orders, latencies, statuses):
+    """One client: POST its orders back to back over a single keep-alive connection"""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for order in orders:
+            body = json.dumps(order).encode('utf-8')
+            request = (f"POST {path} HTTP/1.1\r\nHost: {host}:{port}\r\nContent-Type: application/json\r\n"
+                       f"Content-Length: {len(body)}\r\n\r\n").encode('latin-1') + body
+            start = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.lower() == 'content-length':
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def load_test(url, orders, concurrency):
+    parts = urlsplit(url)
+    latencies = []
+    statuses = {}
+    # Client i sends orders i, i + concurrency, ... so replays interleave with the originals
+    start = time.perf_counter()
+    await asyncio.gather(*(post_orders(parts.hostname, parts.port, parts.path, orders[i::concurrency],
+                                       latencies, statuses) for i in range(concurrency)))
+    return time.perf_counter() - start, sorted(latencies), statuses
+
+
+def fetch_health(url):
+    parts = urlsplit(url)
+    with socket.create_connection((parts.hostname, parts.port), timeout=5) as sock:
+        sock.sendall(f"GET /health HTTP/1.1\r\nHost: {parts.hostname}\r\nConnection: close\r\n\r\n".encode('latin-1'))
+        response = b''
+        while chunk := sock.recv(65536):
+            response += chunk
+    return json.loads(response.split(b'\r\n\r\n', 1)[1])
+
+
+def start_service(catalogue, db_path, batch_size, max_delay_ms):
+    """Run order_service.py on a free local port, returns (process, url)"""
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'order_service.py')
+    process = subprocess.Popen([sys.executable, script, '--catalogue', catalogue, '--db', db_path,
+                                '--port', str(port), '--batch-size', str(batch_size),
+                                '--max-delay-ms', str(max_delay_ms)],
+                               stdout=subprocess.PIPE, text=True)
+    url = f"http://127.0.0.1:{port}/api/orders"
+    for _ in range(100):
+        try:
+            fetch_health(url)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit(f"order_service.py did not start: {process.stdout.read()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the order ingestion service on localhost')
+    parser.add_argument('--url', help='running service to test (default: start one on a temporary database)')
+    parser.add_argument('--catalogue', default=os.path.join(DATA_DIR, 'nbs_supplements.json'),
+                        help='catalogue the orders are drawn from')
+    parser.add_argument('--orders', type=int, default=5000, help='orders to send')
+    parser.add_argument('--concurrency', type=int, default=64, help='concurrent client connections')
+    parser.add_argument('--replays', type=float, default=0.05,
+                        help='fraction of orders that resend an earlier client_order_id')
+    parser.add_argument('--batch-size', type=int, default=256, help='group commit size of the started service')
+    parser.add_argument('--max-delay-ms', type=float, default=0.0, help='group commit delay of the started service')
+    args = parser.parse_args()
+
+    products, _ = read_products(args.catalogue)
+    products = [p for p in products if p.get('price') and p.get('in_stock', True)]
+    orders = make_orders(products, args.orders, args.replays)
+
+    process = None
+    tmp_dir = tempfile.TemporaryDirectory()
+    url = args.url
+    if url is None:
+        process, url = start_service(args.catalogue, os.path.join(tmp_dir.name, 'orders.sqlite'),
+                                     args.batch_size, args.max_delay_ms)
+    try:
+        before = fetch_health(url)
+        elapsed, latencies, statuses = asyncio.run(load_test(url, orders, args.concurrency))
+        after = fetch_health(url)
+    finally:
+        if process is not None:
+            process.send_signal(signal.SIGINT)
+            process.wait()
+        tmp_dir.cleanup()
+
+    commits = after['commits'] - before['commits']
+    stored = after['accepted'] - before['accepted']
+    print(f"{len(orders)} orders, {args.concurrency} connections, {len(products)} products")
+    print("=" * 60)
+    print(f"Throughput: {len(orders) / elapsed:,.0f} orders/s ({elapsed:.2f}s)")
+    print(f"Latency: p50 {percentile(latencies, 0.50) * 1000:.2f} ms, p99 {percentile(latencies, 0.99) * 1000:.2f} ms, "
+          f"max {latencies[-1] * 1000:.2f} ms")
+    print(f"Responses: {', '.join(f'{status}: {count}' for status, count in sorted(statuses.items()))}")
+    print(f"Stored {stored} orders, {after['replayed'] - before['replayed']} idempotent replays, "
+          f"{commits} commits ({stored / commits if commits else 0:.1f} new orders per commit)")
+
+
+if __name__ == '__main__':
+    main()
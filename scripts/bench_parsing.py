@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+HTML Parsing Micro-Benchmark
+Compares the html.parser full-tree path with lxml / selectolax and scoped parsing on saved fixtures,
+and measures product-page throughput through the process-pool parsing stage
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import os
+import time
+
+from html_parsing import HAVE_LXML, LISTING_SCOPE, PRODUCT_SCOPE, SelectolaxParser, make_soup, resolve_parser
+from parse_pool import ParsePool, parse_product_page
+from scrape_ifit import IFitScraper
+from scrape_nbs import NBSScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# (label, parser, scoped) - the first entry is the original code path
+CONFIGS = [
+    ('html.parser full', 'html.parser', False),
+    ('html.parser scoped', 'html.parser', True),
+    ('lxml full', 'lxml', False),
+    ('lxml scoped', 'lxml', True),
+    ('selectolax scoped', 'selectolax', True),
+]
+
+
+def available_configs():
+    for label, parser, scoped in CONFIGS:
+        if parser == 'lxml' and not HAVE_LXML:
+            continue
+        if parser == 'selectolax' and SelectolaxParser is None:
+            continue
+        yield label, parser, scoped
+
+
+def load_fixtures():
+    """Return [(site, kind, name, bytes)] for every saved fixture page"""
+    fixtures = []
+    for site in ('ifit', 'nbs'):
+        for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, site, '*.html'))):
+            name = os.path.basename(path)
+            kind = 'listing' if name.startswith('listing') else 'product'
+            with open(path, 'rb') as f:
+                fixtures.append((site, kind, name, f.read()))
+    return fixtures
+
+
+def extract(scraper, kind, content, parser, scoped):
+    """Parse one page the way the scraper does and return its extracted data"""
+    if kind == 'listing':
+        soup = make_soup(content, parser, LISTING_SCOPE if scoped else None)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return scraper.parse_listing(soup)
+    soup = make_soup(content, parser, PRODUCT_SCOPE if scoped else None)
+    return scraper.parse_product('https://example.com/product/', soup)
+
+
+def bench_pool(scrapers, fixtures, workers, repeat):
+    """Product pages per second with parsing inline (workers=0) or in a ParsePool"""
+    pages = [(type(scrapers[site]), content) for site, kind, _, content in fixtures if kind == 'product'] * repeat
+    parser = resolve_parser('auto')
+    start = time.perf_counter()
+    if workers == 0:
+        for scraper_class, content in pages:
+            parse_product_page(scraper_class, 'https://example.com/product/', content, parser, True)
+    else:
+        pool = ParsePool(workers)
+        futures = [
+            pool.submit(parse_product_page, scraper_class, 'https://example.com/product/', content, parser, True)
+            for scraper_class, content in pages
+        ]
+        for future in futures:
+            future.result()
+        pool.shutdown()
+    return len(pages) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark HTML parser backends on the saved fixtures')
+    parser.add_argument('--repeat', type=int, default=20, help='parses per fixture and backend')
+    parser.add_argument('--workers', default='0,2,4',
+                        help='comma-separated parse pool sizes for the throughput run (0 = inline)')
+    args = parser.parse_args()
+
+    scrapers = {'ifit': IFitScraper(), 'nbs': NBSScraper()}
+    fixtures = load_fixtures()
+    total_bytes = sum(len(content) for _, _, _, content in fixtures)
+    print(f"{len(fixtures)} fixtures, {total_bytes / 1024:.0f} KB, {args.repeat} parses each")
+    print("=" * 60)
+
+    baseline = None
+    reference = {}
+    for label, backend, scoped in available_configs():
+        elapsed = 0.0
+        mismatches = 0
+        for site, kind, name, content in fixtures:
+            scraper = scrapers[site]
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                result = extract(scraper, kind, content, backend, scoped)
+            elapsed += time.perf_counter() - start
+
+            # Every backend must extract exactly what the original path does
+            key = (site, name)
+            if key not in reference:
+                reference[key] = result
+            elif result != reference[key]:
+                mismatches += 1
+                print(f"  ! {label}: {site}/{name} differs from the html.parser result")
+
+        per_page = elapsed / (len(fixtures) * args.repeat) * 1000
+        if baseline is None:
+            baseline = per_page
+        status = 'ok' if not mismatches else f'{mismatches} mismatches'
+        print(f"{label:<20} {per_page:8.2f} ms/page   {baseline / per_page:5.1f}x   {status}")
+
+    print("=" * 60)
+    print(f"Parse pool throughput (product pages, default backend, scoped, {os.cpu_count()} CPUs)")
+    inline = None
+    for workers in [int(w) for w in args.workers.split(',') if w.strip()]:
+        rate = bench_pool(scrapers, fixtures, workers, args.repeat)
+        inline = inline or rate
+        label = 'inline' if workers == 0 else f'{workers} workers'
+        print(f"{label:<20} {rate:8.1f} pages/s   {rate / inline:5.1f}x")
+
+    for scraper in scrapers.values():
+        scraper.engine.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Product Record Benchmark
+Memory of a 100k-product synthetic catalogue held as dicts vs Product records, plus conversion and columnar export timings
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from build_data import DATA_DIR
+from jsonl_store import write_document
+from postprocess import read_products
+from product import Product, read_records, to_columns
+
+FLAVOURS = ['Chocolate', 'Vanilla', 'Strawberry', 'Cookies & Cream', 'Unflavored', 'Mango', 'Banana', 'Caramel']
+
+
+def synthetic_catalogue(products, size, seed=1):
+    """size products built from the scraped ones, each with its own URL, name and price"""
+    rng = random.Random(seed)
+    for i in range(size):
+        base = products[i % len(products)]
+        flavour = rng.choice(FLAVOURS)
+        yield {
+            **base,
+            'url': f"{base['url'].rstrip('/')}-{i}/",
+            'name': f"{base['name']} {flavour}",
+            'price': float(rng.randrange(200, 5000)),
+        }
+
+
+def measure(load):
+    """(result, bytes still allocated once load() returns, seconds)"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = load()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark Product records against plain dicts')
+    parser.add_argument('--input', default=os.path.join(DATA_DIR, 'nbs_supplements.json'),
+                        help='scraped catalogue to draw products from')
+    parser.add_argument('--size', type=int, default=100000, help='products in the synthetic catalogue')
+    args = parser.parse_args()
+
+    products, _ = read_products(args.input)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'catalogue.json')
+        write_document(synthetic_catalogue(list(products), args.size), path)
+        print(f"{args.size} products, {os.path.getsize(path) / 1024 / 1024:.0f} MB document")
+        print("=" * 60)
+
+        # Both load from the same streaming reader, so only the held records are measured
+        dicts, dict_bytes, dict_time = measure(lambda: list(read_products(path)[0]))
+        records, record_bytes, record_time = measure(lambda: list(read_records(path)[0]))
+    print(f"{'dicts':<10} {dict_bytes / 1024 / 1024:8.1f} MB  {dict_bytes / args.size:7.0f} B/product  "
+          f"loaded in {dict_time:.2f}s")
+    print(f"{'records':<10} {record_bytes / 1024 / 1024:8.1f} MB  {record_bytes / args.size:7.0f} B/product  "
+          f"loaded in {record_time:.2f}s (validated)")
+    print(f"- {1 - record_bytes / dict_bytes:.0%} less memory")
+
+    # The name and description strings cost the same either way; the rest is what the layout changes
+    text = sum(sys.getsizeof(product[field]) for product in dicts
+               for field in ('name', 'description', 'short_description'))
+    print(f"- excluding {text / 1024 / 1024:.0f} MB of name and description text: "
+          f"{(dict_bytes - text) / args.size:.0f} vs {(record_bytes - text) / args.size:.0f} B/product")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    converted = [Product.from_dict(product, check=False) for product in dicts]
+    from_time = time.perf_counter() - start
+    start = time.perf_counter()
+    round_trip = [record.to_dict() for record in converted]
+    to_time = time.perf_counter() - start
+    start = time.perf_counter()
+    columns = to_columns(records)
+    columns_time = time.perf_counter() - start
+    in_stock = sum(columns['in_stock'])
+    print(f"dict → record {from_time / args.size * 1e6:6.2f} µs/product")
+    print(f"record → dict {to_time / args.size * 1e6:6.2f} µs/product "
+          f"(round trip {'identical' if round_trip == dicts else 'differs'})")
+    print(f"columns       {columns_time / args.size * 1e6:6.2f} µs/product "
+          f"({in_stock} in stock, mean price {sum(columns['price']) / len(columns['price']):.2f})")
+
+
+if __name__ == '__main__':
+    main()
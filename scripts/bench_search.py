@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Search Index Benchmark
+Compares the prebuilt search index with the linear scan the supplements page used, on a synthetic catalogue
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+
+from build_data import DATA_DIR
+from postprocess import read_products
+from search_index import SearchIndex, SearchIndexBuilder, normalise
+
+# Arabic names and descriptions the stores use alongside the English ones
+ARABIC_WORDS = ['بروتين', 'واي', 'كرياتين', 'أوميجا', 'فيتامين', 'مكمل', 'غذائي', 'عضلات', 'طاقة', 'زيت السمك',
+                'كولاجين', 'أحماض أمينية', 'حرق الدهون', 'تخسيس', 'ماس جينر', 'شوكولاتة', 'فانيليا', 'فراولة']
+FLAVOURS = ['Chocolate', 'Vanilla', 'Strawberry', 'Cookies & Cream', 'Unflavored', 'Mango', 'Banana', 'Caramel']
+SIZES = ['1 lb', '2 lb', '5 lb', '10 lb', '60 caps', '90 caps', '120 tabs', '30 servings', '1 kg']
+
+QUERIES = ['whey', 'wh', 'protein iso', 'creatine', 'omega 3', 'vitamin d3', 'chocolate', 'mass gainer',
+           'بروتين', 'كرياتين', 'اوميجا', 'زيت السمك', 'fat burner', 'collagen', 'bcaa', 'zz', 'c', '5 lb']
+
+
+def synthetic_catalogue(products, size, seed=1):
+    """size products built from the scraped ones with varied flavours, sizes and Arabic text"""
+    rng = random.Random(seed)
+    catalogue = []
+    for i in range(size):
+        base = products[i % len(products)]
+        arabic = ' '.join(rng.sample(ARABIC_WORDS, 3))
+        catalogue.append({
+            'name': f"{base['name']} {rng.choice(FLAVOURS)} {rng.choice(SIZES)} {arabic}",
+            'short_description': base.get('short_description', ''),
+            'description': f"{base.get('description', '')} {' '.join(rng.sample(ARABIC_WORDS, 5))}",
+        })
+    return catalogue
+
+
+def linear_search(texts, query):
+    """The previous page search: every term must appear somewhere in the product's text"""
+    terms = normalise(query).split()
+    return {doc for doc, text in enumerate(texts) if all(term in text for term in terms)}
+
+
+def time_queries(search, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            search(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the prebuilt search index against a linear scan')
+    parser.add_argument('--input', default=os.path.join(DATA_DIR, 'nbs_supplements.json'),
+                        help='scraped catalogue to draw products from')
+    parser.add_argument('--size', type=int, default=10000, help='products in the synthetic catalogue')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of the query set per method')
+    args = parser.parse_args()
+
+    products, _ = read_products(args.input)
+    catalogue = synthetic_catalogue(list(products), args.size)
+
+    start = time.perf_counter()
+    builder = SearchIndexBuilder()
+    for doc_id, product in enumerate(catalogue):
+        builder.add(doc_id, product['name'], product['short_description'], product['description'])
+    data = builder.to_json()
+    build_time = time.perf_counter() - start
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    index = SearchIndex(data)
+
+    # The page lower-cased the text on every keystroke; give the scan pre-normalised text instead
+    texts = [normalise(' '.join((p['name'], p['short_description'], p['description']))) for p in catalogue]
+    catalogue_size = sum(len(text.encode('utf-8')) for text in texts)
+
+    print(f"{args.size} products, {len(data['tokens'])} tokens, {len(data['trigrams'])} trigrams")
+    print(f"Index built in {build_time:.2f}s, {len(payload) / 1024:.0f} KB "
+          f"(searched text {catalogue_size / 1024:.0f} KB)")
+    print("=" * 60)
+
+    for query in QUERIES:
+        indexed = index.search(query)
+        scanned = linear_search(texts, query)
+        print(f"{query:<14} index {len(indexed or ()):6} matches   scan {len(scanned):6} matches")
+
+    scan_ms = time_queries(lambda query: linear_search(texts, query), QUERIES, args.repeat)
+    index_ms = time_queries(index.search, QUERIES, args.repeat)
+    print("=" * 60)
+    print(f"{'linear scan':<14} {scan_ms:8.3f} ms/query")
+    print(f"{'search index':<14} {index_ms:8.3f} ms/query   {scan_ms / index_ms:5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Static Asset Build
+Writes a deployable copy of the site with minified data, content-hashed CSS/JS/catalogue names and .br/.gz siblings
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import time
+
+# Brotli is optional (as in http_client.py); without it only .gz siblings are written
+try:
+    import brotli
+except ImportError:
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+# Only text compresses; images are already compressed formats
+COMPRESSIBLE = {'.html', '.css', '.js', '.json', '.svg', '.txt', '.xml'}
+MIN_COMPRESS_SIZE = 256
+
+# src="..." / href="..." attributes in the pages
+ATTRIBUTE_REF = re.compile(r'''((?:src|href)\s*=\s*)(["'])([^"'#?]+)\2''')
+# 'data/catalog/...' and '../data/catalog/...' in JS string and template literals
+CATALOG_REF = re.compile(r'''(['"`](?:\.\./)?)data/catalog/''')
+
+
+def content_digest(data):
+    return hashlib.sha1(data).hexdigest()[:10]
+
+
+def hashed_name(path, digest):
+    """js/script.js -> js/script.<digest>.js"""
+    base, extension = posixpath.splitext(path)
+    return f"{base}.{digest}{extension}"
+
+
+def minify_json(data):
+    return json.dumps(json.loads(data), ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def compressed_variants(data):
+    """{'.gz': bytes, '.br': bytes} for the encodings that make the file smaller"""
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    return {suffix: body for suffix, body in variants.items() if len(body) < len(data)}
+
+
+def read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+class AssetBuild:
+    def __init__(self, root=ROOT_DIR, output_dir=None, compress=True):
+        """Build root's pages, css/, js/, data/ and assets/ into output_dir (default <root>/dist)"""
+        self.root = root
+        self.output_dir = output_dir or os.path.join(root, 'dist')
+        self.compress = compress
+        self.mapping = {}
+        self.written = set()
+        self.counts = {'files': 0, 'written': 0, 'unchanged': 0, 'removed': 0}
+        self.bytes = {'source': 0, 'minified': 0, '.gz': 0, '.br': 0}
+
+    def _write(self, site_path, data):
+        path = os.path.join(self.output_dir, *site_path.split('/'))
+        self.written.add(os.path.abspath(path))
+        try:
+            if read_bytes(path) == data:
+                self.counts['unchanged'] += 1
+                return
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.counts['written'] += 1
+
+    def emit(self, site_path, data, source_size=None):
+        """Write one output file and, for text over MIN_COMPRESS_SIZE, its .gz/.br siblings"""
+        self._write(site_path, data)
+        self.counts['files'] += 1
+        if posixpath.splitext(site_path)[1] not in COMPRESSIBLE:
+            return
+        self.bytes['source'] += len(data) if source_size is None else source_size
+        self.bytes['minified'] += len(data)
+        if not self.compress or len(data) < MIN_COMPRESS_SIZE:
+            return
+        variants = compressed_variants(data)
+        for suffix in ('.gz', '.br'):
+            # Take the variant's own size when it is written, the plain file's when it is not worth it
+            self.bytes[suffix] += len(variants.get(suffix, data))
+        for suffix, body in variants.items():
+            self._write(site_path + suffix, body)
+
+    def _source_files(self, directory, extensions=None):
+        """Site paths of the files under a root directory, sorted"""
+        found = []
+        for dirpath, dirnames, filenames in os.walk(os.path.join(self.root, directory)):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if extensions is None or posixpath.splitext(name)[1] in extensions:
+                    found.append(os.path.relpath(os.path.join(dirpath, name), self.root).replace(os.sep, '/'))
+        return found
+
+    def build_catalog(self):
+        """
+        data/catalog is fetched by product id, so its files keep their names
+        and the directory is hashed instead: data/catalog.<digest>/ changes
+        whenever any file in it does.
+        """
+        files = [(path, minify_json(read_bytes(os.path.join(self.root, path))))
+                 for path in self._source_files('data/catalog', {'.json'})]
+        digest = hashlib.sha1()
+        for path, data in files:
+            digest.update(path.encode('utf-8') + b'\0' + data + b'\0')
+        directory = f"data/catalog.{digest.hexdigest()[:10]}"
+        self.mapping['data/catalog'] = directory
+        for path, data in files:
+            self.emit(directory + path[len('data/catalog'):], data, os.path.getsize(os.path.join(self.root, path)))
+
+    def build_data(self):
+        """The scraped catalogues, minified under their usual names for anything that loads them directly"""
+        for path in self._source_files('data', {'.json'}):
+            if not path.startswith('data/catalog/'):
+                self.emit(path, minify_json(read_bytes(os.path.join(self.root, path))),
+                          os.path.getsize(os.path.join(self.root, path)))
+
+    def build_hashed(self, directory, extension, rewrite=None):
+        """Emit each file as <name>.<digest><ext>, after rewrite(text) when given"""
+        for path in self._source_files(directory, {extension}):
+            data = read_bytes(os.path.join(self.root, path))
+            source_size = len(data)
+            if rewrite is not None:
+                data = rewrite(data.decode('utf-8')).encode('utf-8')
+            target = hashed_name(path, content_digest(data))
+            self.mapping[path] = target
+            self.emit(target, data, source_size)
+
+    def rewrite_script(self, text):
+        catalog = self.mapping['data/catalog']
+        return CATALOG_REF.sub(lambda match: f"{match.group(1)}{catalog}/", text)
+
+    def rewrite_page(self, text, page_path):
+        """Point the page's local src/href references at the hashed files"""
+        page_dir = posixpath.dirname(page_path)
+
+        def replace(match):
+            ref = match.group(3)
+            if re.match(r'^[a-z][a-z0-9+.-]*:|^//', ref, re.I):
+                return match.group(0)
+            target = self.mapping.get(posixpath.normpath(posixpath.join(page_dir, ref)))
+            if target is None:
+                return match.group(0)
+            relative = posixpath.relpath(target, page_dir or '.')
+            return f"{match.group(1)}{match.group(2)}{relative}{match.group(2)}"
+
+        return ATTRIBUTE_REF.sub(replace, text)
+
+    def build_pages(self):
+        """HTML entry points keep their URLs and are the only files that need revalidating"""
+        for path in ['index.html'] + self._source_files('pages', {'.html'}):
+            source = read_bytes(os.path.join(self.root, path))
+            self.emit(path, self.rewrite_page(source.decode('utf-8'), path).encode('utf-8'), len(source))
+
+    def copy_assets(self):
+        for path in self._source_files('assets'):
+            self.emit(path, read_bytes(os.path.join(self.root, path)))
+
+    def build(self):
+        # Dependencies first: the catalogue name goes into the JS, the CSS/JS names into the pages
+        self.build_catalog()
+        self.build_data()
+        self.build_hashed('css', '.css')
+        self.build_hashed('js', '.js', self.rewrite_script)
+        self.build_pages()
+        self.copy_assets()
+        self._write('asset-manifest.json', json.dumps(self.mapping, indent=2, sort_keys=True).encode('utf-8'))
+        self.prune()
+
+    def prune(self):
+        """Remove outputs of earlier builds (old hashes, deleted files)"""
+        for dirpath, dirnames, filenames in os.walk(self.output_dir, topdown=False):
+            for name in filenames:
+                path = os.path.abspath(os.path.join(dirpath, name))
+                if path not in self.written:
+                    os.remove(path)
+                    self.counts['removed'] += 1
+            if dirpath != self.output_dir and not os.listdir(dirpath):
+                os.rmdir(dirpath)
+
+    def print_stats(self):
+        counts, sizes = self.counts, self.bytes
+        print(f"✓ Built {counts['files']} files into {self.output_dir}")
+        print(f"- {counts['written']} written, {counts['unchanged']} unchanged, {counts['removed']} stale removed")
+        print(f"- Text assets: {sizes['source'] / 1024:.0f} KB source, {sizes['minified'] / 1024:.0f} KB minified, "
+              f"{sizes['.gz'] / 1024:.0f} KB gzip" +
+              (f", {sizes['.br'] / 1024:.0f} KB brotli" if brotli is not None and self.compress else ''))
+        if brotli is None and self.compress:
+            print("- brotli is not installed, only .gz siblings were written")
+        for source, target in sorted(self.mapping.items()):
+            print(f"  {source} -> {target}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the deployable static site with hashed, precompressed assets')
+    parser.add_argument('--output', default=os.path.join(ROOT_DIR, 'dist'), help='output directory')
+    parser.add_argument('--clean', action='store_true', help='delete the output directory first')
+    parser.add_argument('--no-compress', action='store_true', help='skip the .br/.gz siblings')
+    args = parser.parse_args()
+
+    if args.clean and os.path.isdir(args.output):
+        shutil.rmtree(args.output)
+    start = time.perf_counter()
+    build = AssetBuild(ROOT_DIR, args.output, compress=not args.no_compress)
+    build.build()
+    build.print_stats()
+    print(f"Done in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Static Data Build
+Splits the scraped catalogue into a slim listing index, one JSON file per product and per-category shards
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from urllib.parse import unquote, urlsplit
+
+from merge import canonical_url
+from mirror_images import IMAGES_DIR, load_manifest, local_image
+from postprocess import read_products
+from price_history import PriceHistory
+from render_pages import PAGES_DIR, PageRenderer, product_page_name
+from search_index import SearchIndexBuilder
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+
+def slugify(text):
+    """Lower-case ASCII slug; empty when nothing ASCII is left (e.g. an Arabic name)"""
+    return re.sub(r'[^a-z0-9]+', '-', unquote(text).lower()).strip('-')
+
+
+def product_slug(url):
+    """The WooCommerce product slug: last path segment of the product URL"""
+    segments = [segment for segment in urlsplit(url).path.split('/') if segment]
+    slug = slugify(segments[-1]) if segments else ''
+    return slug or 'product-' + hashlib.sha1(canonical_url(url).encode('utf-8')).hexdigest()[:10]
+
+
+def category_slug(name):
+    return slugify(name) or 'category-' + hashlib.sha1(name.encode('utf-8')).hexdigest()[:10]
+
+
+def listing_entry(product, slug, images=None):
+    """
+    The fields the listing grid, filters and home page need. With an image
+    manifest, a mirrored thumbnail is served locally with its srcset variants.
+    """
+    summary = product.get('short_description') or ''
+    if not summary and product.get('description'):
+        summary = product['description'][:100] + '...'
+    entry = {
+        'id': slug,
+        'name': product['name'],
+        'price': product.get('price'),
+        'thumbnail': product['images'][0] if product.get('images') else None,
+        'category': product.get('category', ''),
+        'categories': product.get('categories', []),
+        'in_stock': product.get('in_stock', True),
+        'summary': summary,
+    }
+    mirrored = local_image(images, entry['thumbnail']) if images and entry['thumbnail'] else None
+    if mirrored:
+        entry['thumbnail'], srcset = mirrored
+        if srcset:
+            entry['srcset'] = srcset
+    return entry
+
+
+def write_json(path, data):
+    """Write compact JSON atomically, leaving the file untouched when nothing changed"""
+    payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == payload:
+                return False
+    except FileNotFoundError:
+        pass
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
+    return True
+
+
+class StaticDataBuild:
+    def __init__(self, output_dir, arabic=True, images=None, history=None, pages=False):
+        """
+        output_dir receives index.json, search.json, products/<slug>.json and
+        categories/<slug>.json; arabic enables Arabic normalisation in the search
+        index; images is the mirror_images.py manifest, if any; history is a
+        PriceHistory whose per-product series go to history/<slug>.json; pages
+        links listing entries to their render_pages.py product pages
+        """
+        self.output_dir = output_dir
+        self.pages = pages
+        self.images = images
+        self.history = history
+        self.products_dir = os.path.join(output_dir, 'products')
+        self.categories_dir = os.path.join(output_dir, 'categories')
+        self.history_dir = os.path.join(output_dir, 'history')
+        os.makedirs(self.products_dir, exist_ok=True)
+        os.makedirs(self.categories_dir, exist_ok=True)
+        if history is not None:
+            os.makedirs(self.history_dir, exist_ok=True)
+        self.slugs = {}
+        self.seen = set()
+        self.entries = []
+        self.shards = {}
+        self.search = SearchIndexBuilder(arabic)
+        self.written = set()
+        self.counts = {'products': 0, 'written': 0, 'unchanged': 0, 'removed': 0, 'duplicates': 0, 'histories': 0}
+
+    def slug_for(self, key, url):
+        """A stable slug per product; a clash between two URLs gets a suffix from the canonical URL"""
+        slug = product_slug(url)
+        if self.slugs.setdefault(slug, key) != key:
+            slug = f"{slug}-{hashlib.sha1(key.encode('utf-8')).hexdigest()[:6]}"
+            self.slugs[slug] = key
+        return slug
+
+    def _write(self, path, data):
+        self.written.add(os.path.abspath(path))
+        if write_json(path, data):
+            self.counts['written'] += 1
+        else:
+            self.counts['unchanged'] += 1
+
+    def add(self, product):
+        """Write one product file and queue its listing entry"""
+        key = canonical_url(product['url'])
+        if key in self.seen:
+            # The catalogue lists this URL twice, the first record wins
+            self.counts['duplicates'] += 1
+            return
+        self.seen.add(key)
+        slug = self.slug_for(key, product['url'])
+        entry = listing_entry(product, slug, self.images)
+        if self.pages:
+            # The frontend links here and falls back to supplement-detail.html without it
+            entry['page'] = product_page_name(slug)
+        self.search.add(len(self.entries), product['name'], product.get('short_description', ''),
+                        product.get('description', ''))
+        self.entries.append(entry)
+        for name in dict.fromkeys([entry['category'], *entry['categories']]):
+            if name:
+                self.shards.setdefault(name, []).append(entry)
+        main_category = entry['category'] or next(iter(entry['categories']), '')
+        record = {'id': slug, 'category_id': category_slug(main_category) if main_category else None, **product}
+        prices = self.history.export(product['url']) if self.history is not None else None
+        if prices:
+            # Only products whose price or stock ever changed get a file; the flag saves the detail page a 404
+            record['history'] = True
+            self._write(os.path.join(self.history_dir, f"{slug}.json"), {'id': slug, **prices})
+            self.counts['histories'] += 1
+        self._write(os.path.join(self.products_dir, f"{slug}.json"), record)
+        self.counts['products'] += 1
+
+    def finish(self, scraped_at=None):
+        """Write the index and category shards, then remove files of products no longer listed"""
+        categories = []
+        for name in sorted(self.shards):
+            shard_id = category_slug(name)
+            entries = self.shards[name]
+            categories.append({'id': shard_id, 'name': name, 'count': len(entries)})
+            self._write(os.path.join(self.categories_dir, f"{shard_id}.json"),
+                        {'id': shard_id, 'name': name, 'products': entries})
+        self._write(os.path.join(self.output_dir, 'index.json'), {
+            'products': self.entries,
+            'categories': categories,
+            'total_products': len(self.entries),
+            'scraped_at': scraped_at,
+        })
+        # Postings refer to positions in index.json's products array
+        self._write(os.path.join(self.output_dir, 'search.json'), self.search.to_json())
+        for directory in (self.products_dir, self.categories_dir, self.history_dir):
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.abspath(os.path.join(directory, name))
+                if name.endswith('.json') and path not in self.written:
+                    os.remove(path)
+                    self.counts['removed'] += 1
+
+    def print_stats(self):
+        print(f"✓ Built {self.counts['products']} product files and {len(self.shards)} category shards "
+              f"in {self.output_dir}")
+        print(f"- {self.counts['written']} files written, {self.counts['unchanged']} unchanged, "
+              f"{self.counts['removed']} stale files removed")
+        if self.counts['histories']:
+            print(f"- Exported {self.counts['histories']} price histories")
+        if self.counts['duplicates']:
+            print(f"- Skipped {self.counts['duplicates']} duplicate product URLs")
+
+
+def build(input_path, output_dir, arabic=True, images_dir=IMAGES_DIR, history_path=None, pages_dir=None):
+    """
+    Stream the catalogue at input_path into output_dir, then pre-render the
+    pages that changed into pages_dir when given. Returns the StaticDataBuild
+    and the PageRenderer (None without pages_dir).
+    """
+    products, meta = read_products(input_path)
+    manifest_path = os.path.join(images_dir, 'manifest.json') if images_dir else None
+    images = load_manifest(manifest_path) if manifest_path and os.path.exists(manifest_path) else None
+    history = PriceHistory(history_path) if history_path and os.path.exists(history_path) else None
+    builder = StaticDataBuild(output_dir, arabic, images, history, pages=pages_dir is not None)
+    try:
+        for product in products:
+            builder.add(product)
+        builder.finish(meta.get('scraped_at'))
+    finally:
+        if history is not None:
+            history.close()
+    renderer = None
+    if pages_dir is not None:
+        renderer = PageRenderer(output_dir, pages_dir)
+        renderer.render()
+    return builder, renderer
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the sharded static data files the frontend loads')
+    parser.add_argument('--input', default=os.path.join(DATA_DIR, 'nbs_supplements.json'),
+                        help='scraped catalogue document')
+    parser.add_argument('--output', default=os.path.join(DATA_DIR, 'catalog'),
+                        help='directory for index.json, search.json, products/ and categories/')
+    parser.add_argument('--no-arabic', action='store_true',
+                        help='index text without Arabic letter/digit normalisation')
+    parser.add_argument('--images', default=IMAGES_DIR,
+                        help='mirror_images.py output; mirrored thumbnails are served from it')
+    parser.add_argument('--no-images', action='store_true', help='keep hot-linked image URLs')
+    parser.add_argument('--history', default=os.path.join(DATA_DIR, 'price_history.sqlite'),
+                        help='price_history.py database; products with changes get history/<slug>.json')
+    parser.add_argument('--no-history', action='store_true', help='do not export price histories')
+    parser.add_argument('--pages', default=PAGES_DIR,
+                        help='directory for the pre-rendered product-<id>.html and shop-<n>.html pages')
+    parser.add_argument('--no-pages', action='store_true',
+                        help='skip pre-rendering; product links go to the client-rendered detail page')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    builder, renderer = build(args.input, args.output, arabic=not args.no_arabic,
+                              images_dir=None if args.no_images else args.images,
+                              history_path=None if args.no_history else args.history,
+                              pages_dir=None if args.no_pages else args.pages)
+    builder.print_stats()
+    if renderer is not None:
+        renderer.print_stats()
+    index_size = os.path.getsize(os.path.join(args.output, 'index.json'))
+    search_size = os.path.getsize(os.path.join(args.output, 'search.json'))
+    print(f"- index.json is {index_size / 1024:.1f} KB, search.json {search_size / 1024:.1f} KB, catalogue was "
+          f"{os.path.getsize(args.input) / 1024:.1f} KB ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Shared Crawl Engine
+Runs listing and product page fetches concurrently under per-host politeness limits
+"""
+
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+from parse_pool import resolve
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CrawlEngine:
+    def __init__(self, max_workers=8, per_host_limit=4, rate=2.0, burst=2, metrics=None):
+        """
+        max_workers: size of the shared fetch thread pool
+        per_host_limit: maximum in-flight requests to a single host
+        rate / burst: token bucket per host (requests per second / bucket size)
+        metrics: optional Metrics receiving listing/product stage timings,
+            politeness waits and skipped-card counts
+        """
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.rate = rate
+        self.burst = burst
+        self.metrics = metrics
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.hosts = {}
+        self.hosts_lock = threading.Lock()
+
+    def _host_limits(self, url):
+        host = urlparse(url).netloc
+        with self.hosts_lock:
+            if host not in self.hosts:
+                self.hosts[host] = (
+                    threading.BoundedSemaphore(self.per_host_limit),
+                    TokenBucket(self.rate, self.burst),
+                )
+            return self.hosts[host]
+
+    @contextmanager
+    def throttle(self, url):
+        """Hold a per-host slot and a rate-limit token for the duration of one request"""
+        semaphore, bucket = self._host_limits(url)
+        start = time.perf_counter()
+        with semaphore:
+            bucket.acquire()
+            if self.metrics is not None:
+                self.metrics.observe('throttle_wait', time.perf_counter() - start)
+            yield
+
+    def submit(self, fn, *args):
+        """Run fn(*args) on the shared pool"""
+        return self.executor.submit(fn, *args)
+
+    def submit_stage(self, stage, fn, *args):
+        """submit(), timing fn(*args) as a metrics stage when metrics are collected"""
+        if self.metrics is None:
+            return self.submit(fn, *args)
+        return self.submit(self._run_stage, stage, fn, *args)
+
+    def _run_stage(self, stage, fn, *args):
+        with self.metrics.stage(stage):
+            return fn(*args)
+
+    def map(self, fn, items):
+        """Run fn over items concurrently, returning results in input order"""
+        futures = [self.submit(fn, item) for item in items]
+        return [future.result() for future in futures]
+
+    def crawl(self, scraper, max_pages=10, incremental=None, skip=None, frontier=None):
+        """
+        Drive a scraper through its listing pages.
+
+        The scraper provides:
+          scrape_category_page(page_num) -> (cards, has_next) or None,
+              each card a dict with at least 'url'
+          scrape_product_details(url)    -> product dict, None, or a Future of
+              either when parsing was handed to a ParsePool
+          collect_page(page_num, results) with results as [(url, product), ...]
+
+        The next listing page is requested as soon as the current one is parsed,
+        so listing and product fetches overlap. Results are handed back per page
+        in listing order. With an IncrementalCrawl, unchanged cards are carried
+        over without a detail fetch and the crawl stops at the first listing
+        page where nothing changed. Cards whose URL is in skip (products already
+        written by a resumed run) are dropped. A CrawlFrontier supplies listing
+        pages already fetched by an interrupted run, drops finished products
+        and failures still backing off, and records each page's outcome.
+        Returns the number of the last listing page fetched.
+        """
+        pages = []
+        last_page = 0
+        page_num = 1
+        listing = self._listing(scraper, page_num, frontier)
+
+        while listing is not None:
+            result = listing.result()
+            listing_reused = getattr(listing, 'from_frontier', False)
+            listing = None
+            if not result:
+                break
+            last_page = page_num
+            cards, has_next = result
+            if frontier is not None and not listing_reused:
+                frontier.record_listing(page_num, cards, has_next)
+            listed = len(cards)
+            if skip:
+                cards = [card for card in cards if card['url'] not in skip]
+            if frontier is not None:
+                cards = [card for card in cards if frontier.should_fetch(card['url'])]
+            if self.metrics is not None:
+                self.metrics.inc('cards_skipped', listed - len(cards))
+
+            if incremental is not None:
+                fetch_urls, carried = incremental.diff(cards)
+                if cards and not fetch_urls and has_next:
+                    print(f"\nListing page {page_num} unchanged, stopping early")
+                    incremental.stopped_early = True
+                    has_next = False
+            else:
+                fetch_urls, carried = [card['url'] for card in cards], {}
+            if self.metrics is not None and carried:
+                self.metrics.inc('cards_carried', len(carried))
+
+            # Queue the next listing ahead of this page's products
+            if has_next and page_num < max_pages:
+                listing = self._listing(scraper, page_num + 1, frontier)
+
+            fetch_urls = set(fetch_urls)
+            futures = []
+            for card in cards:
+                url = card['url']
+                if url in carried:
+                    future = Future()
+                    future.set_result(carried[url])
+                elif url in fetch_urls:
+                    future = self.submit_stage('product', scraper.scrape_product_details, url)
+                else:
+                    continue
+                futures.append((url, future))
+            pages.append((page_num, futures))
+            page_num += 1
+
+            # Hand back any pages that have already finished
+            while pages and all(future.done() for _, future in pages[0][1]):
+                self._collect(scraper, *pages.pop(0), frontier)
+
+        for page in pages:
+            self._collect(scraper, *page, frontier)
+
+        return last_page
+
+    def crawl_urls(self, scraper, urls, page_size=24, skip=None, frontier=None):
+        """
+        Fetch known product URLs (e.g. from a sitemap) without listing pages.
+        Results go to scraper.collect_page in groups of page_size, numbered
+        like listing pages, with the same skip and frontier handling as crawl().
+        Returns the number of groups.
+        """
+        listed = len(urls)
+        if skip:
+            urls = [url for url in urls if url not in skip]
+        if frontier is not None:
+            urls = [url for url in urls if frontier.should_fetch(url)]
+        if self.metrics is not None:
+            self.metrics.inc('cards_skipped', listed - len(urls))
+
+        pages = []
+        for start in range(0, len(urls), page_size):
+            futures = [(url, self.submit_stage('product', scraper.scrape_product_details, url))
+                       for url in urls[start:start + page_size]]
+            pages.append((len(pages) + 1, futures))
+        for page in pages:
+            self._collect(scraper, *page, frontier)
+        return len(pages)
+
+    def _listing(self, scraper, page_num, frontier):
+        """Future for a listing page, answered from the frontier when it was fetched before"""
+        recorded = frontier.listing(page_num) if frontier is not None else None
+        if recorded is None:
+            return self.submit_stage('listing', scraper.scrape_category_page, page_num)
+        future = Future()
+        future.from_frontier = True
+        future.set_result(recorded)
+        return future
+
+    def _collect(self, scraper, page_num, futures, frontier=None):
+        # A product may still be parsing in the process pool
+        results = [(url, resolve(future.result())) for url, future in futures]
+        scraper.collect_page(page_num, results)
+        # Only after the page is written, so done always means saved
+        if frontier is not None:
+            frontier.record_results(results)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def add_crawl_arguments(parser):
+    """Add the shared --workers / --per-host / --rate / --burst options to a scraper CLI"""
+    parser.add_argument('--workers', type=int, default=8, help='crawl engine threads')
+    parser.add_argument('--per-host', type=int, default=4, help='in-flight requests per host')
+    parser.add_argument('--rate', type=float, default=2.0, help='requests per second per host (0: unlimited)')
+    parser.add_argument('--burst', type=int, default=2, help='requests a host may get back to back')
+
+
+def engine_from_args(args, metrics=None):
+    """Build the CrawlEngine selected by add_crawl_arguments options"""
+    return CrawlEngine(max_workers=args.workers, per_host_limit=args.per_host, rate=args.rate,
+                       burst=args.burst, metrics=metrics)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Multi-Source Crawl
+Crawls every source in sources.json in parallel under shared per-host limits and merges them into one catalogue
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+from crawl_engine import add_crawl_arguments, engine_from_args
+from html_parsing import add_parser_arguments
+from http_cache import add_cache_arguments, cache_from_args
+from http_client import HttpClient
+from jsonl_store import write_document
+from merge import CatalogueIndex, merge_into
+from metrics import add_metrics_arguments, metrics_from_args
+from parse_pool import ParsePool
+from scrape_ifit import IFitScraper
+from scrape_nbs import NBSScraper
+from structured_data import add_structured_arguments
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.normpath(os.path.join(SCRIPTS_DIR, '..', 'data'))
+
+# The site parsers a source can use; selectors, JSON-LD and Store API handling live in their classes
+SITES = {
+    'ifit': IFitScraper,
+    'nbs': NBSScraper,
+}
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept-Language': 'en-US,en;q=0.9'
+}
+
+
+def load_sources(path, names=None):
+    """
+    The sources of a config file, in file order. Each entry has a name, a
+    site and optionally max_pages; every other key is passed to the site's
+    scraper (base_url, category_slug, category_names, keywords, ...).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        sources = json.load(f)['sources']
+    for source in sources:
+        if source.get('site') not in SITES:
+            raise SystemExit(f"Source {source.get('name')!r}: unknown site {source.get('site')!r} "
+                             f"(choose from {', '.join(SITES)})")
+    if names:
+        unknown = [name for name in names if name not in {source['name'] for source in sources}]
+        if unknown:
+            raise SystemExit(f"Unknown sources: {', '.join(unknown)}")
+        sources = [source for source in sources if source['name'] in names]
+    return sources
+
+
+class SourceCrawl:
+    def __init__(self, sources, engine, http, parser='auto', scoped=True, parse_pool=None, store_api=True,
+                 metrics=None):
+        """
+        sources: entries from load_sources(); all of them share the engine
+        (so per-host concurrency and rate limits hold across sources on the
+        same host), the HTTP client's connection pools, the parse pool and
+        the metrics
+        """
+        self.sources = sources
+        self.scrapers = []
+        for source in sources:
+            options = {key: value for key, value in source.items() if key not in ('name', 'site', 'max_pages')}
+            if 'keywords' in options and options['keywords'] is not None:
+                options['keywords'] = tuple(options['keywords'])
+            options.setdefault('store_api', store_api)
+            try:
+                scraper = SITES[source['site']](engine=engine, http=http, parser=parser, scoped=scoped,
+                                                parse_pool=parse_pool, metrics=metrics, **options)
+            except TypeError as e:
+                raise SystemExit(f"Source {source['name']!r}: {e}")
+            self.scrapers.append(scraper)
+        self.errors = {}
+        self.seconds = {}
+
+    def run(self, max_pages=None):
+        """Crawl all sources at once, one driver thread each; fetches run on the shared engine"""
+        def crawl(source, scraper):
+            start = time.perf_counter()
+            try:
+                scraper.scrape_all(max_pages=max_pages or source.get('max_pages', 10))
+            except Exception as e:
+                self.errors[source['name']] = e
+            self.seconds[source['name']] = time.perf_counter() - start
+
+        threads = [threading.Thread(target=crawl, args=(source, scraper), name=source['name'])
+                   for source, scraper in zip(self.sources, self.scrapers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def products(self):
+        """Every source's products, in config order"""
+        for scraper in self.scrapers:
+            yield from scraper.products
+
+    def print_stats(self):
+        print("\n" + "=" * 60)
+        for source, scraper in zip(self.sources, self.scrapers):
+            status = f"✗ {self.errors[source['name']]}" if source['name'] in self.errors else '✓'
+            print(f"{status} {source['name']}: {scraper.product_count} products "
+                  f"in {self.seconds.get(source['name'], 0):.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Crawl all configured sources in parallel into one catalogue')
+    parser.add_argument('--config', default=os.path.join(SCRIPTS_DIR, 'sources.json'), help='source list')
+    parser.add_argument('--sources', help='comma-separated source names to crawl (default: all)')
+    parser.add_argument('--max-pages', type=int, help="override every source's max_pages")
+    parser.add_argument('-o', '--output', default=os.path.join(DATA_DIR, 'nbs_supplements.json'),
+                        help='catalogue document to write')
+    parser.add_argument('--merge', action='store_true',
+                        help='upsert into the existing output instead of replacing it '
+                             '(keeps products of sources not crawled this run)')
+    add_crawl_arguments(parser)
+    add_parser_arguments(parser)
+    add_cache_arguments(parser)
+    add_structured_arguments(parser)
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.sources.split(',') if name.strip()] if args.sources else None
+    sources = load_sources(args.config, names)
+    metrics = metrics_from_args(args)
+    # One engine for all sources, so the per-host limits hold across them
+    engine = engine_from_args(args, metrics)
+    http = HttpClient(HEADERS, throttle=engine.throttle, cache=cache_from_args(args), offline=args.offline,
+                      pool_size=args.workers, metrics=metrics)
+    parse_pool = ParsePool(args.parse_workers) if args.parse_workers else None
+
+    crawl = SourceCrawl(sources, engine, http, parser=args.parser, scoped=not args.full_parse,
+                        parse_pool=parse_pool, store_api=not args.no_store_api, metrics=metrics)
+    print(f"Crawling {len(sources)} sources: {', '.join(source['name'] for source in sources)}")
+    try:
+        crawl.run(args.max_pages)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        engine.shutdown()
+    crawl.print_stats()
+    if crawl.errors:
+        raise SystemExit(f"{len(crawl.errors)} sources failed, {args.output} left unchanged")
+
+    # One pass over all sources: a product listed by several of them keeps every category
+    with metrics.stage('save'):
+        if args.merge:
+            index = merge_into(args.output, crawl.products())
+        else:
+            index = CatalogueIndex()
+            index.merge(crawl.products())
+            write_document(index.products, args.output,
+                           {'source': ', '.join(source['name'] for source in sources)})
+    index.print_stats()
+    print(f"✓ Wrote {len(index.products)} products to {args.output}")
+    metrics.finish(args.metrics, 'sources')
+
+
+if __name__ == '__main__':
+    main()
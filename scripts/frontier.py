@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Persistent Crawl Frontier
+SQLite record of listing pages, discovered product URLs and done/failed state so crawls can resume
+"""
+
+import json
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    page_num INTEGER PRIMARY KEY,
+    cards TEXT NOT NULL,
+    has_next INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    url TEXT PRIMARY KEY,
+    page_num INTEGER,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    last_error TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_state ON products (state);
+"""
+
+
+class CrawlFrontier:
+    def __init__(self, path, resume=False, retry_base=300, retry_cap=86400):
+        """
+        path: SQLite file holding the frontier
+        resume: continue the previous run; otherwise only failure history is kept
+        retry_base / retry_cap: within a resumed run, failed URLs wait
+            retry_base * 2^(attempts-1) seconds (at most retry_cap) before
+            they are fetched again
+        """
+        self.path = path
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self.counts = {'listings_reused': 0, 'done_skipped': 0, 'deferred': 0, 'done': 0, 'failed': 0}
+        if resume:
+            pending = self.db.execute("SELECT COUNT(*) FROM products WHERE state != 'done'").fetchone()[0]
+            done = self.db.execute("SELECT COUNT(*) FROM products WHERE state = 'done'").fetchone()[0]
+            print(f"Frontier: resuming from {path} ({done} done, {pending} pending or failed)")
+        else:
+            # A fresh run redoes everything. Failures keep their attempt count but are
+            # fetched again now: a deferred URL would be missing from the full output
+            with self.db:
+                self.db.execute("DELETE FROM listings")
+                self.db.execute("DELETE FROM products WHERE state != 'failed'")
+                self.db.execute("UPDATE products SET next_attempt_at = 0 WHERE state = 'failed'")
+
+    def listing(self, page_num):
+        """The (cards, has_next) recorded for a listing page, or None"""
+        row = self.db.execute("SELECT cards, has_next FROM listings WHERE page_num = ?", (page_num,)).fetchone()
+        if row is None:
+            return None
+        self.counts['listings_reused'] += 1
+        return json.loads(row[0]), bool(row[1])
+
+    def record_listing(self, page_num, cards, has_next):
+        """Store a fetched listing page and queue the product URLs it lists"""
+        now = time.time()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO listings (page_num, cards, has_next, fetched_at) VALUES (?, ?, ?, ?)",
+                (page_num, json.dumps(cards, ensure_ascii=False), int(has_next), now),
+            )
+            self.db.executemany(
+                "INSERT OR IGNORE INTO products (url, page_num, updated_at) VALUES (?, ?, ?)",
+                [(card['url'], page_num, now) for card in cards],
+            )
+
+    def should_fetch(self, url):
+        """False for products finished earlier in this run or failing and still backing off"""
+        row = self.db.execute("SELECT state, next_attempt_at FROM products WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return True
+        state, next_attempt_at = row
+        if state == 'done':
+            self.counts['done_skipped'] += 1
+            return False
+        if state == 'failed' and next_attempt_at > time.time():
+            self.counts['deferred'] += 1
+            return False
+        return True
+
+    def record_results(self, results):
+        """Mark a collected page's products done, or failed with a backoff"""
+        now = time.time()
+        with self.db:
+            for url, product in results:
+                if product and product.get('name'):
+                    self.counts['done'] += 1
+                    self.db.execute(
+                        "INSERT INTO products (url, state, updated_at) VALUES (?, 'done', ?) "
+                        "ON CONFLICT(url) DO UPDATE SET state = 'done', last_error = NULL, updated_at = excluded.updated_at",
+                        (url, now),
+                    )
+                    continue
+                self.counts['failed'] += 1
+                attempts = (self.db.execute("SELECT attempts FROM products WHERE url = ?", (url,)).fetchone() or (0,))[0] + 1
+                delay = min(self.retry_cap, self.retry_base * 2 ** (attempts - 1))
+                self.db.execute(
+                    "INSERT INTO products (url, state, attempts, next_attempt_at, last_error, updated_at) "
+                    "VALUES (?, 'failed', ?, ?, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET state = 'failed', attempts = excluded.attempts, "
+                    "next_attempt_at = excluded.next_attempt_at, last_error = excluded.last_error, "
+                    "updated_at = excluded.updated_at",
+                    (url, attempts, now + delay, 'no product data', now),
+                )
+
+    def print_stats(self):
+        failing = self.db.execute("SELECT COUNT(*) FROM products WHERE state = 'failed'").fetchone()[0]
+        print(f"Frontier: {self.counts['done']} done, {self.counts['failed']} failed this run, "
+              f"{self.counts['done_skipped']} already done, {self.counts['listings_reused']} listing pages reused")
+        if failing or self.counts['deferred']:
+            print(f"Frontier: {failing} URLs queued for retry ({self.counts['deferred']} still backing off)")
+
+    def close(self):
+        self.db.close()
+
+
+def add_frontier_arguments(parser, default_path):
+    """Add the shared --frontier / --no-frontier options to a scraper CLI"""
+    parser.add_argument('--frontier', default=default_path,
+                        help='SQLite crawl frontier used by --resume and for retrying failed URLs')
+    parser.add_argument('--no-frontier', action='store_true',
+                        help='do not record crawl progress')
+
+
+def frontier_from_args(args):
+    """Build the CrawlFrontier selected by add_frontier_arguments options (honours --resume)"""
+    if args.no_frontier:
+        return None
+    return CrawlFrontier(args.frontier, resume=getattr(args, 'resume', False))
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+HTML Parsing Backends
+Builds BeautifulSoup trees with lxml/html.parser (or selectolax pre-scoping) limited to the nodes the scrapers read
+"""
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+PARSERS = ('auto', 'lxml', 'html.parser', 'selectolax')
+
+
+def resolve_parser(parser='auto'):
+    """Pick the concrete backend, falling back to html.parser when a library is missing"""
+    if parser in (None, 'auto'):
+        return 'lxml' if HAVE_LXML else 'html.parser'
+    if parser == 'lxml' and not HAVE_LXML:
+        print("lxml is not installed, falling back to html.parser")
+        return 'html.parser'
+    if parser == 'selectolax' and SelectolaxParser is None:
+        print("selectolax is not installed, falling back to auto")
+        return resolve_parser('auto')
+    if parser not in PARSERS:
+        raise ValueError(f"Unknown parser backend: {parser}")
+    return parser
+
+
+class ParseScope:
+    """The subtrees of a page a scraper actually reads; everything else is never built"""
+
+    def __init__(self, names=(), classes=(), ids=(), script_types=()):
+        self.names = frozenset(names)
+        self.classes = frozenset(classes)
+        self.ids = frozenset(ids)
+        self.script_types = frozenset(script_types)
+
+    def matches(self, name, attrs):
+        if name in self.names:
+            return True
+        if not attrs:
+            return False
+        if name == 'script':
+            return attrs.get('type') in self.script_types
+        if attrs.get('id') in self.ids:
+            return True
+        classes = attrs.get('class')
+        if not classes:
+            return False
+        if isinstance(classes, str):
+            classes = classes.split()
+        return not self.classes.isdisjoint(classes)
+
+    def strainer(self):
+        """SoupStrainer keeping only top-level nodes that match this scope"""
+        scope = self
+        if hasattr(SoupStrainer, 'allow_tag_creation'):
+            # bs4 >= 4.13 asks the strainer directly, with the raw attributes
+            class ScopeStrainer(SoupStrainer):
+                def allow_tag_creation(self, nsprefix, name, attrs):
+                    return scope.matches(name, attrs)
+
+                def allow_string_creation(self, string):
+                    return False
+
+            return ScopeStrainer()
+        # Older bs4 calls a name function with (name, attrs)
+        return SoupStrainer(lambda name, attrs=None: scope.matches(name, attrs))
+
+    def css(self):
+        """The same scope as one CSS selector list"""
+        selectors = list(self.names)
+        selectors += [f'.{cls}' for cls in self.classes]
+        selectors += [f'#{element_id}' for element_id in self.ids]
+        selectors += [f'script[type="{script_type}"]' for script_type in self.script_types]
+        return ', '.join(selectors)
+
+    def extract(self, content):
+        """Cut the scoped nodes out of a page with selectolax, returns an HTML fragment"""
+        tree = SelectolaxParser(content)
+        kept = set()
+        fragments = []
+        for node in tree.css(self.css()):
+            parent = node.parent
+            nested = False
+            while parent is not None:
+                if parent.mem_id in kept:
+                    nested = True
+                    break
+                parent = parent.parent
+            if not nested:
+                kept.add(node.mem_id)
+                fragments.append(node.html)
+        return ''.join(fragments)
+
+
+# Single product page: summary, gallery, breadcrumb, description tabs, stock
+PRODUCT_SCOPE = ParseScope(
+    names=('h1',),
+    classes=(
+        'summary', 'woocommerce-product-gallery', 'woocommerce-breadcrumb', 'woocommerce-tabs',
+        'woocommerce-Tabs-panel--description', 'woocommerce-product-details__short-description',
+        'price', 'stock', 'wp-post-image', 'attachment-shop_single',
+    ),
+    ids=('tab-description',),
+    script_types=('application/ld+json',),
+)
+
+# Listing page: product cards and the pagination link
+LISTING_SCOPE = ParseScope(
+    classes=('product', 'next', 'woocommerce-pagination'),
+)
+
+
+def make_soup(content, parser='auto', scope=None):
+    """Parse page bytes into BeautifulSoup, optionally keeping only a ParseScope"""
+    parser = resolve_parser(parser)
+    if parser == 'selectolax':
+        if scope is not None:
+            content = scope.extract(content)
+        return BeautifulSoup(content, 'lxml' if HAVE_LXML else 'html.parser')
+    parse_only = scope.strainer() if scope is not None else None
+    return BeautifulSoup(content, parser, parse_only=parse_only)
+
+
+def add_parser_arguments(parser):
+    """Add the shared --parser / --full-parse / --parse-workers options to a scraper CLI"""
+    parser.add_argument('--parser', choices=PARSERS, default='auto',
+                        help='HTML parser backend (auto = lxml when installed)')
+    parser.add_argument('--full-parse', action='store_true',
+                        help='build the whole page tree instead of only the product nodes')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='parse product pages in this many worker processes (0 = in the fetch threads)')
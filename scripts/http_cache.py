@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+On-disk HTTP Response Cache
+Stores bodies with ETag/Last-Modified for conditional re-fetches and offline replay
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+class ResponseCache:
+    def __init__(self, directory='.http_cache'):
+        self.directory = directory
+        # Parsed records of one URL share a file, updates to it are serialised
+        self.parsed_lock = threading.Lock()
+
+    def _path(self, url, suffix):
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, key[:2], key + suffix)
+
+    def _write(self, path, data):
+        """Write through a temp file so a crash never leaves a torn entry"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Engine threads may store the same URL at once, each needs its own temp file
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, url):
+        """Return the cached metadata for a URL, or None"""
+        try:
+            with open(self._path(url, '.json'), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def body(self, url):
+        """Return the cached response body for a URL, or None"""
+        try:
+            with open(self._path(url, '.body'), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def conditional_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a cached URL"""
+        meta = self.get(url)
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, response):
+        """Cache a 200 response, returns False when the body is unchanged"""
+        content = response.content
+        digest = hashlib.sha1(content).hexdigest()
+        old = self.get(url)
+        changed = not old or old.get('sha1') != digest
+        if changed:
+            self._write(self._path(url, '.body'), content)
+            # The parsed records belong to the old body
+            try:
+                os.remove(self._path(url, '.parsed.json'))
+            except OSError:
+                pass
+        self._store_meta(url, response.headers, digest)
+        return changed
+
+    def touch(self, url, headers):
+        """Refresh validators after a 304 Not Modified"""
+        meta = self.get(url)
+        if meta:
+            self._store_meta(url, headers, meta.get('sha1'), meta)
+
+    def _store_meta(self, url, headers, digest, old=None):
+        old = old or {}
+        meta = {
+            'url': url,
+            'etag': headers.get('ETag') or old.get('etag'),
+            'last_modified': headers.get('Last-Modified') or old.get('last_modified'),
+            'content_type': headers.get('Content-Type') or old.get('content_type'),
+            'sha1': digest,
+            'stored_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self._write(self._path(url, '.json'), json.dumps(meta).encode('utf-8'))
+
+    def _load_records(self, url):
+        try:
+            with open(self._path(url, '.parsed.json'), 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        # Entries written before records were keyed by parser are a bare record
+        return records.get('parsed', {}) if isinstance(records, dict) else {}
+
+    def load_parsed(self, url, key=''):
+        """
+        Return the record the parser identified by key made of the cached body,
+        or None. Scrapers sharing a cache parse the same page differently (the
+        categories a product is filed under), so records are kept per parser.
+        """
+        return self._load_records(url).get(key)
+
+    def store_parsed(self, url, record, key=''):
+        """Cache the parser's record for the current body"""
+        with self.parsed_lock:
+            records = self._load_records(url)
+            records[key] = record
+            self._write(self._path(url, '.parsed.json'),
+                        json.dumps({'parsed': records}, ensure_ascii=False).encode('utf-8'))
+
+
+def add_cache_arguments(parser):
+    """Add the shared --cache-dir / --no-cache / --offline options to a scraper CLI"""
+    parser.add_argument('--cache-dir', default='.http_cache',
+                        help='directory for the conditional-request response cache')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always download full pages, do not read or write the cache')
+    parser.add_argument('--offline', action='store_true',
+                        help='rebuild the output entirely from the cache without network access')
+
+
+def cache_from_args(args):
+    """Build the ResponseCache selected by add_cache_arguments options"""
+    if args.no_cache:
+        if args.offline:
+            raise SystemExit('--offline needs the cache, drop --no-cache')
+        return None
+    return ResponseCache(args.cache_dir)
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Fetch Layer
+Pooled keep-alive sessions per host with compression and retry/backoff
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import Future
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# urllib3 only decodes brotli when one of these packages is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpClient:
+    def __init__(self, headers=None, throttle=None, max_retries=3, backoff=1.0,
+                 max_backoff=30.0, timeout=30, pool_size=10, cache=None, offline=False, metrics=None):
+        """
+        headers: default request headers for every session
+        throttle: optional per-URL context manager (e.g. CrawlEngine.throttle)
+            held around each attempt
+        max_retries / backoff / max_backoff: exponential backoff with full
+            jitter on 429/5xx and connection errors, Retry-After wins when longer
+        cache: optional ResponseCache for conditional requests (ETag/Last-Modified)
+        offline: serve everything from the cache and never touch the network
+        metrics: optional Metrics receiving fetch, ttfb and retry_sleep timings
+        """
+        self.headers = dict(headers or {})
+        self.headers.setdefault('Accept-Encoding', ACCEPT_ENCODING)
+        self.throttle = throttle
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.cache = cache
+        self.offline = offline
+        self.metrics = metrics
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.counters = {
+            'requests': 0,
+            'responses': 0,
+            'retries': 0,
+            'errors': 0,
+            'bytes_wire': 0,
+            'bytes_decoded': 0,
+            'not_modified': 0,
+            'cache_misses': 0,
+            'parses_skipped': 0,
+        }
+
+    def session_for(self, url):
+        """Return the keep-alive session for the URL's host"""
+        host = urlparse(url).netloc
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                session.headers.update(self.headers)
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self.sessions[host] = session
+            return session
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.counters[key] += amount
+
+    def _retry_delay(self, attempt, response=None):
+        """Full-jitter exponential backoff, honouring Retry-After"""
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * (2 ** attempt)))
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                wait = float(retry_after)
+            except ValueError:
+                try:
+                    wait = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    wait = 0
+            delay = max(delay, min(wait, self.max_backoff))
+        return delay
+
+    def _request(self, url, headers=None, stream=False):
+        session = self.session_for(url)
+        self._count('requests')
+        if self.throttle:
+            with self.throttle(url):
+                response = session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+        else:
+            response = session.get(url, headers=headers, timeout=self.timeout, stream=stream)
+        if self.metrics is not None:
+            # Until the headers arrived: connection setup (DNS, TCP, TLS) plus server time
+            self.metrics.observe('ttfb', response.elapsed.total_seconds())
+        return response
+
+    def _sleep(self, delay):
+        if self.metrics is not None:
+            self.metrics.observe('retry_sleep', delay)
+        time.sleep(delay)
+
+    def get(self, url, headers=None):
+        """
+        Fetch a URL with retries, returns the response or None on failure.
+
+        With a cache, the request is made conditional and a 304 is answered
+        from the cached body. response.not_modified tells callers whether the
+        body is the same one they saw last run.
+        """
+        if self.metrics is None:
+            return self._get(url, headers)
+        with self.metrics.stage('fetch'):
+            return self._get(url, headers)
+
+    def stream(self, url, chunk_size=1 << 16):
+        """
+        Fetch a URL with retries and yield its body in chunks as they arrive,
+        so a large body is never held whole. Streamed bodies bypass the
+        conditional cache; offline, the cached body is replayed in chunks.
+        Yields nothing when the fetch fails.
+        """
+        if self.offline:
+            response = self._replay(url)
+            content = response.content if response is not None else b''
+            for start in range(0, len(content), chunk_size):
+                yield content[start:start + chunk_size]
+            return
+        if self.metrics is None:
+            response = self._get(url, stream=True)
+        else:
+            with self.metrics.stage('fetch'):
+                response = self._get(url, stream=True)
+        if response is None:
+            return
+        try:
+            for chunk in response.iter_content(chunk_size):
+                self._count('bytes_decoded', len(chunk))
+                yield chunk
+            raw = getattr(response, 'raw', None)
+            wire = raw.tell() if raw is not None and hasattr(raw, 'tell') else 0
+            self._count('bytes_wire', wire)
+        finally:
+            response.close()
+
+    def _get(self, url, headers=None, stream=False):
+        if self.offline:
+            return self._replay(url)
+
+        if self.cache is not None and not stream:
+            headers = {**self.cache.conditional_headers(url), **(headers or {})}
+
+        attempt = 0
+        while True:
+            try:
+                response = self._request(url, headers, stream)
+                if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                    delay = self._retry_delay(attempt, response)
+                    print(f"  ↻ {response.status_code} from {url}, retrying in {delay:.1f}s")
+                    response.close()
+                    self._count('retries')
+                    attempt += 1
+                    self._sleep(delay)
+                    continue
+                if stream and response.status_code >= 400:
+                    response.close()
+                response.raise_for_status()
+                if stream:
+                    # The body is counted as the caller reads it
+                    self._count('responses')
+                    return response
+                self._record(response)
+                if response.status_code == 304 and self.cache is not None:
+                    self._count('not_modified')
+                    self.cache.touch(url, response.headers)
+                    return self._cached_response(url)
+                response.not_modified = False
+                if self.cache is not None and response.status_code == 200:
+                    response.not_modified = not self.cache.store(url, response)
+                return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt < self.max_retries:
+                    delay = self._retry_delay(attempt)
+                    print(f"  ↻ {type(e).__name__} for {url}, retrying in {delay:.1f}s")
+                    self._count('retries')
+                    attempt += 1
+                    self._sleep(delay)
+                    continue
+                print(f"Error fetching {url}: {e}")
+            except Exception as e:
+                print(f"Error fetching {url}: {e}")
+            self._count('errors')
+            return None
+
+    def _replay(self, url):
+        response = self._cached_response(url) if self.cache is not None else None
+        if response is None:
+            self._count('cache_misses')
+            print(f"Not in cache (offline): {url}")
+        return response
+
+    def _cached_response(self, url):
+        """Build a 200 response from the cached body"""
+        meta = self.cache.get(url)
+        body = self.cache.body(url)
+        if meta is None or body is None:
+            return None
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response._content = body
+        response.headers = CaseInsensitiveDict({'Content-Type': meta.get('content_type') or 'text/html'})
+        response.not_modified = True
+        return response
+
+    def get_parsed(self, url, parse, key=''):
+        """
+        Fetch a URL and return parse(response).
+
+        When the body is unchanged since the last run (304, identical body,
+        or offline replay) the record the same parser (key) cached with it is
+        reused. parse may return a Future (see ParsePool), which is passed
+        through.
+        """
+        response = self.get(url)
+        if response is None:
+            return None
+        if self.cache is None:
+            return parse(response)
+        if response.not_modified:
+            record = self.cache.load_parsed(url, key)
+            if record is not None:
+                self._count('parses_skipped')
+                return record
+        record = parse(response)
+        if isinstance(record, Future):
+            # Parsing was handed to a worker process, cache it when it lands
+            record.add_done_callback(lambda done: self._store_parsed(url, key, done))
+        elif record is not None:
+            self.cache.store_parsed(url, record, key)
+        return record
+
+    def _store_parsed(self, url, key, future):
+        if not future.cancelled() and future.exception() is None and future.result() is not None:
+            self.cache.store_parsed(url, future.result(), key)
+
+    def _record(self, response):
+        content = response.content
+        raw = getattr(response, 'raw', None)
+        wire = raw.tell() if raw is not None and hasattr(raw, 'tell') else 0
+        with self.lock:
+            self.counters['responses'] += 1
+            self.counters['bytes_decoded'] += len(content)
+            self.counters['bytes_wire'] += wire or len(content)
+
+    def handshakes(self):
+        """Number of new connections opened (each one a TCP+TLS handshake)"""
+        total = 0
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            for adapter in set(session.adapters.values()):
+                for key in list(adapter.poolmanager.pools.keys()):
+                    pool = adapter.poolmanager.pools.get(key)
+                    if pool is not None:
+                        total += pool.num_connections
+        return total
+
+    def stats(self):
+        """Per-run fetch counters"""
+        with self.lock:
+            stats = dict(self.counters)
+        stats['handshakes'] = self.handshakes()
+        stats['connections_reused'] = max(stats['requests'] - stats['handshakes'], 0)
+        return stats
+
+    def print_stats(self):
+        """Print a one-block summary of the fetch counters"""
+        stats = self.stats()
+        print(f"HTTP requests: {stats['requests']} ({stats['retries']} retries, {stats['errors']} errors)")
+        print(f"Handshakes: {stats['handshakes']} (connections reused: {stats['connections_reused']})")
+        print(f"Bytes transferred: {stats['bytes_wire']:,} on the wire, {stats['bytes_decoded']:,} decoded")
+        if self.cache is not None:
+            print(f"Cache: {stats['not_modified']} not modified, {stats['parses_skipped']} parses skipped, "
+                  f"{stats['cache_misses']} offline misses")
+
+    def close(self):
+        with self.lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+        for session in sessions:
+            session.close()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Incremental Crawl Support
+Diffs listing cards against the existing dataset so only new or changed products are re-scraped
+"""
+
+import json
+
+
+def listing_card(item, product_url, extract_price):
+    """Summarise a listing-page product card as {url, price, in_stock}"""
+    price = None
+    price_elem = item.find(class_='price')
+    if price_elem:
+        sale_price = price_elem.find('ins')
+        amounts = price_elem.find_all(class_='woocommerce-Price-amount')
+        if sale_price:
+            price = extract_price(sale_price.get_text())
+        elif amounts:
+            price = extract_price(amounts[-1].get_text())
+        else:
+            price = extract_price(price_elem.get_text())
+
+    # WooCommerce marks the card itself; some themes add a badge instead
+    classes = item.get('class') or []
+    in_stock = 'outofstock' not in classes
+    if in_stock and item.find(class_=['out-of-stock', 'out-of-stock-badge', 'soldout']):
+        in_stock = False
+
+    return {'url': product_url, 'price': price, 'in_stock': in_stock}
+
+
+class IncrementalCrawl:
+    mode = 'Incremental mode'
+
+    def __init__(self, existing_file, category=None):
+        """category restricts the baseline to one category of a shared dataset"""
+        self.existing_file = existing_file
+        self.existing = {}
+        self.scraped_at = None
+        try:
+            with open(existing_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.scraped_at = data.get('scraped_at')
+            for product in data.get('products', []):
+                if category is None or category in product.get('categories', []):
+                    self.existing.setdefault(product['url'], product)
+            print(f"{self.mode}: {len(self.existing)} products in {existing_file}")
+        except FileNotFoundError:
+            print(f"{self.mode}: {existing_file} not found, doing a full crawl")
+        self.seen = set()
+        self.stopped_early = False
+        self.counts = {'new': 0, 'changed': 0, 'unchanged': 0}
+
+    def card_changed(self, card, product):
+        """A card needs a detail fetch when its listing price or stock badge moved"""
+        if card['price'] is None:
+            return True
+        return card['price'] != product.get('price') or card['in_stock'] != product.get('in_stock', True)
+
+    def diff(self, cards):
+        """Split a page of cards into URLs to fetch and {url: product} carried over unchanged"""
+        fetch_urls = []
+        carried = {}
+        for card in cards:
+            url = card['url']
+            self.seen.add(url)
+            product = self.existing.get(url)
+            if product is None:
+                self.counts['new'] += 1
+                fetch_urls.append(url)
+            elif self.card_changed(card, product):
+                self.counts['changed'] += 1
+                fetch_urls.append(url)
+            else:
+                self.counts['unchanged'] += 1
+                carried[url] = product
+        return fetch_urls, carried
+
+    def unvisited(self):
+        """Existing products on listing pages the crawl skipped after stopping early"""
+        return [product for url, product in self.existing.items() if url not in self.seen]
+
+    def print_stats(self):
+        fetched = self.counts['new'] + self.counts['changed']
+        print(f"Incremental: {fetched} detail fetches ({self.counts['new']} new, {self.counts['changed']} changed), "
+              f"{self.counts['unchanged']} unchanged carried over")
+        if self.stopped_early:
+            print(f"Incremental: stopped early, {len(self.unvisited())} products on later pages carried over")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Streaming JSON Lines Product Store
+Appends products as they are scraped and compacts them into the frontend JSON document
+"""
+
+import argparse
+import json
+import os
+import time
+
+
+class JsonLinesWriter:
+    def __init__(self, path, checkpoint_every=25, resume=False):
+        """
+        path: the .jsonl file, one product per line
+        checkpoint_every: fsync after this many records (pages also checkpoint)
+        resume: keep existing records and report their URLs as already done
+        """
+        self.path = path
+        self.checkpoint_every = checkpoint_every
+        self.done_urls = set()
+        self.pending = 0
+        self.count = 0
+        if resume and os.path.exists(path):
+            self._recover()
+            self.file = open(path, 'a', encoding='utf-8')
+            print(f"Resuming: {len(self.done_urls)} products already in {path}")
+        else:
+            self.file = open(path, 'w', encoding='utf-8')
+
+    def _recover(self):
+        """Collect finished URLs and cut off a record torn by a crash"""
+        good_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if not line.endswith(b'\n'):
+                    break
+                good_size += len(line)
+                self.done_urls.add(record.get('url'))
+        if good_size != os.path.getsize(self.path):
+            print(f"Truncating torn record at byte {good_size} of {self.path}")
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_size)
+
+    def write(self, record):
+        """Append one product as a single JSON line"""
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.count += 1
+        self.pending += 1
+        if self.pending >= self.checkpoint_every:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Flush and fsync so everything written so far survives a crash"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.checkpoint()
+            self.file.close()
+
+
+def read_jsonl(path):
+    """Yield the records of a JSON Lines file, skipping a torn final line"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                print(f"Skipping unreadable line in {path}")
+
+
+def write_document(products, output_path, meta=None):
+    """
+    Stream product records into the frontend JSON document
+    {products, categories, total_products, scraped_at[, source]}.
+
+    meta supplies categories (merged with the records' own), scraped_at
+    (default now), source and any other top-level keys; it is only read after
+    the last record, so a streaming reader may fill it in as it goes.
+    Records are written one at a time to a temp file that then replaces
+    output_path, so memory stays flat and readers never see a partial file.
+    The output is byte-identical to json.dump(..., indent=2). Returns the
+    number of products written.
+    """
+    all_categories = set()
+    total = 0
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as out:
+        out.write('{\n  "products": [')
+        for product in products:
+            all_categories.update(product.get('categories') or [])
+            body = json.dumps(product, indent=2, ensure_ascii=False).replace('\n', '\n    ')
+            out.write((',\n    ' if total else '\n    ') + body)
+            total += 1
+        out.write('\n  ],\n' if total else '],\n')
+        meta = dict(meta or {})
+        all_categories.update(meta.pop('categories', None) or [])
+        tail = {
+            'categories': sorted(all_categories),
+            'total_products': total,
+            'scraped_at': meta.pop('scraped_at', None) or time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        tail.update((key, value) for key, value in meta.items()
+                    if key not in ('products', 'total_products') and value is not None)
+        tail_json = json.dumps(tail, indent=2, ensure_ascii=False)
+        out.write(tail_json[tail_json.index('\n') + 1:])
+        out.flush()
+        os.fsync(out.fileno())
+    os.replace(tmp_path, output_path)
+    return total
+
+
+def finalise(jsonl_path, output_path, source=None, categories=()):
+    """
+    Compact a JSON Lines file into {products, categories, total_products, scraped_at}.
+
+    Runs in two streaming passes: the first finds the last record for each URL
+    (a resumed crawl may have rewritten one), the second writes those records
+    through write_document.
+    """
+    last_line = {}
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f):
+            try:
+                last_line[json.loads(line)['url']] = line_no
+            except (ValueError, KeyError, TypeError):
+                continue
+    keep = set(last_line.values())
+
+    def latest():
+        with open(jsonl_path, 'r', encoding='utf-8') as src:
+            for line_no, line in enumerate(src):
+                if line_no in keep:
+                    yield json.loads(line)
+
+    return write_document(latest(), output_path, {'categories': categories, 'source': source})
+
+
+def add_stream_arguments(parser, default_path):
+    """Add the shared --jsonl / --resume / --no-stream options to a scraper CLI"""
+    parser.add_argument('--jsonl', default=default_path,
+                        help='JSON Lines file products are streamed to while scraping')
+    parser.add_argument('--resume', action='store_true',
+                        help='resume an interrupted crawl from the JSON Lines file and crawl frontier')
+    parser.add_argument('--no-stream', action='store_true',
+                        help='keep products in memory and write the JSON only at the end')
+
+
+def writer_from_args(args):
+    """Build the JsonLinesWriter selected by add_stream_arguments options"""
+    if args.no_stream:
+        if args.resume:
+            raise SystemExit('--resume needs the JSON Lines file, drop --no-stream')
+        return None
+    return JsonLinesWriter(args.jsonl, resume=args.resume)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compact a scraped JSON Lines file into the frontend JSON document')
+    parser.add_argument('jsonl', help='input .jsonl file')
+    parser.add_argument('output', help='output .json file')
+    parser.add_argument('--source', help='value for the "source" field')
+    args = parser.parse_args()
+
+    total = finalise(args.jsonl, args.output, source=args.source)
+    print(f"✓ Wrote {total} products to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
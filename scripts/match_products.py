@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+"""
+Cross-Store Product Matching
+Groups listings of the same product from different stores with MinHash signatures and LSH banding instead of pairwise comparison
+"""
+
+import argparse
+import hashlib
+import heapq
+import json
+import os
+import random
+import re
+import sys
+import time
+import zlib
+from array import array
+from itertools import groupby
+from urllib.parse import urlsplit
+
+from merge import canonical_url
+from postprocess import read_products, validate
+from search_index import TOKEN, normalise
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+MERSENNE = (1 << 61) - 1
+
+# Promotions the stores append to a name: "(Free bag with 2.3 kg / 5 lbs )"
+PROMOTION = re.compile(r'\([^)]*\)')
+
+# "5 lbs", "5lb" and "5-lb" are the same quantity token; the unit spellings are folded too
+QUANTITY = re.compile(r'(\d+(?:[.,]\d+)?)\s*-?\s*(lbs?|kg|g|gm|mg|mcg|iu|ml|l|caps?|capsules?|tabs?|tablets?|'
+                      r'softgels?|servings?|serv|pcs?|pieces?)\b')
+UNITS = {
+    'lbs': 'lb', 'gm': 'g', 'cap': 'caps', 'capsule': 'caps', 'capsules': 'caps', 'tab': 'tabs', 'tablet': 'tabs',
+    'tablets': 'tabs', 'softgel': 'softgels', 'serving': 'serv', 'servings': 'serv', 'pc': 'pcs', 'piece': 'pcs',
+    'pieces': 'pcs',
+}
+
+# Words that say nothing about which product it is
+STOPWORDS = frozenset(['and', 'with', 'for', 'the', 'of', 'a', 'by', 'in', 'plus', 'free', 'offer', 'bundle',
+                       'new', 'from'])
+
+DESCRIPTION_WORDS = 50
+# Enough text for DESCRIPTION_WORDS words, so long descriptions are not normalised in full
+DESCRIPTION_CHARS = 600
+SKETCH_SIZE = 16
+
+
+def store_of(product):
+    """The store a listing comes from: its host without www."""
+    host = urlsplit(product.get('url') or '').netloc.lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+def quantity_token(match):
+    number = match.group(1).replace(',', '.')
+    if '.' in number:
+        number = number.rstrip('0').rstrip('.')
+    return f"{number}{UNITS.get(match.group(2), match.group(2))}"
+
+
+def name_tokens(name):
+    """Normalised name words, promotions and stopwords dropped and quantities joined ('5lb')"""
+    text = QUANTITY.sub(quantity_token, normalise(PROMOTION.sub(' ', name or '')))
+    return [token for token in TOKEN.findall(text) if token not in STOPWORDS]
+
+
+def name_shingles(tokens):
+    """Words and adjacent word pairs, so 'whey protein' and 'protein whey' are close but not equal"""
+    return {*tokens, *(f"{first} {second}" for first, second in zip(tokens, tokens[1:]))}
+
+
+def quantities(tokens):
+    return frozenset(token for token in tokens if token[0].isdigit() and not token.isdigit())
+
+
+def shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def description_shingles(product):
+    """Three-word shingles of the start of the description, where stores paste the brand's copy"""
+    text = (product.get('description') or product.get('short_description') or '')[:DESCRIPTION_CHARS]
+    words = TOKEN.findall(normalise(text))[:DESCRIPTION_WORDS]
+    return {' '.join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def description_sketch(product):
+    """Bottom-k MinHash of the description shingles: the SKETCH_SIZE smallest CRC-32s, sorted"""
+    hashes = {zlib.crc32(shingle.encode('utf-8')) for shingle in description_shingles(product)}
+    return array('I', heapq.nsmallest(SKETCH_SIZE, hashes))
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    common = len(first & second)
+    return common / (len(first) + len(second) - common)
+
+
+def sketch_similarity(first, second):
+    """Jaccard estimate of two bottom-k sketches: the share of the union's k smallest hashes found in both"""
+    if not first or not second:
+        return 0.0
+    both = set(first).intersection(second)
+    union = sorted(set(first).union(second))[:SKETCH_SIZE]
+    return sum(value in both for value in union) / len(union)
+
+
+class MinHasher:
+    def __init__(self, num_perm=64, seed=1):
+        """num_perm universal hashes (a * x + b) mod 2^61 - 1 stand in for random permutations"""
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.perms = [(rng.randrange(1, MERSENNE), rng.randrange(MERSENNE)) for _ in range(num_perm)]
+        self.rows = {}
+
+    def row(self, shingle):
+        """The num_perm hash values of one shingle; a catalogue's name vocabulary is small, so they are cached"""
+        row = self.rows.get(shingle)
+        if row is None:
+            value = shingle_hash(shingle)
+            row = self.rows[shingle] = tuple([(a * value + b) % MERSENNE for a, b in self.perms])
+        return row
+
+    def signature(self, shingles):
+        """Column-wise minimum over the shingles' rows"""
+        return tuple(map(min, zip(*map(self.row, shingles))))
+
+
+class ProductMatcher:
+    def __init__(self, threshold=0.5, num_perm=64, bands=16, max_bucket=100, seed=1):
+        """
+        threshold: the similarity a pair needs, name Jaccard weighted 2:1 with
+        the description's when both listings have one. bands x rows of the
+        signature set where the LSH S-curve sits: 16 bands of 4 rows catch
+        name similarities from about 0.5 up.
+        Buckets larger than max_bucket are generic names shared by whole
+        product lines and are skipped rather than compared pairwise.
+        """
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.max_bucket = max_bucket
+        self.hasher = MinHasher(num_perm, seed)
+        self.products = []
+        self.urls = set()
+        self.stores = []
+        self.names = []
+        self.quantities = []
+        self.descriptions = []
+        # Each product's hash of its rows of the signature, band by band; the signature itself is not kept
+        self.band_keys = array('q')
+        self.band_slices = [slice(band * self.rows_per_band, (band + 1) * self.rows_per_band) for band in range(bands)]
+        self.counts = {'products': 0, 'skipped': 0, 'invalid': 0, 'duplicates': 0, 'candidates': 0, 'oversized_buckets': 0, 'matched_pairs': 0}
+        self.seconds = {}
+
+    def add(self, product):
+        # Any store's catalogue is accepted, so records are checked against the schema first
+        if not isinstance(product, dict) or validate(product):
+            self.counts['invalid'] += 1
+            return
+        tokens = name_tokens(product.get('name'))
+        store = store_of(product)
+        if not tokens or not store:
+            self.counts['skipped'] += 1
+            return
+        url = canonical_url(product['url'])
+        if url in self.urls:
+            # The first record of a URL wins, as in the catalogue build
+            self.counts['duplicates'] += 1
+            return
+        self.urls.add(url)
+        shingles = name_shingles(tokens)
+        self.products.append(product)
+        self.stores.append(store)
+        # Interned, so a shingle's text is held once however many names share it
+        self.names.append(frozenset(map(sys.intern, shingles)))
+        self.quantities.append(quantities(tokens))
+        self.descriptions.append(description_sketch(product))
+        signature = self.hasher.signature(shingles)
+        self.band_keys.extend([hash(signature[band]) for band in self.band_slices])
+        self.counts['products'] += 1
+
+    def add_all(self, products):
+        start = time.perf_counter()
+        for product in products:
+            self.add(product)
+        self.seconds['signatures'] = self.seconds.get('signatures', 0) + time.perf_counter() - start
+
+    def candidates(self):
+        """Cross-store pairs (i, j), i < j, whose signatures agree on every row of at least one band"""
+        pairs = set()
+        for band in range(self.bands):
+            keys = self.band_keys[band::self.bands]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            for _, docs in groupby(order, key=keys.__getitem__):
+                bucket = list(docs)
+                if len(bucket) < 2:
+                    continue
+                if len(bucket) > self.max_bucket:
+                    self.counts['oversized_buckets'] += 1
+                    continue
+                bucket.sort()
+                for i, first in enumerate(bucket):
+                    store = self.stores[first]
+                    pairs.update((first, second) for second in bucket[i + 1:] if self.stores[second] != store)
+        self.counts['candidates'] = len(pairs)
+        return pairs
+
+    def similarity(self, first, second):
+        names = jaccard(self.names[first], self.names[second])
+        if not self.descriptions[first] or not self.descriptions[second]:
+            return names
+        return (2 * names + sketch_similarity(self.descriptions[first], self.descriptions[second])) / 3
+
+    def is_match(self, first, second):
+        """Exact check of a candidate pair; two different stated sizes are different listings"""
+        if self.quantities[first] and self.quantities[second] and self.quantities[first] != self.quantities[second]:
+            return False
+        return self.similarity(first, second) >= self.threshold
+
+    def groups(self):
+        """Lists of product positions, each spanning at least two stores, largest first"""
+        start = time.perf_counter()
+        pairs = self.candidates()
+        self.seconds['candidates'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        parent = list(range(len(self.products)))
+
+        def find(doc):
+            while parent[doc] != doc:
+                parent[doc] = parent[parent[doc]]
+                doc = parent[doc]
+            return doc
+
+        for first, second in pairs:
+            if self.is_match(first, second):
+                self.counts['matched_pairs'] += 1
+                parent[find(second)] = find(first)
+        members = {}
+        for doc in range(len(self.products)):
+            members.setdefault(find(doc), []).append(doc)
+        groups = [docs for docs in members.values()
+                  if len(docs) > 1 and len({self.stores[doc] for doc in docs}) > 1]
+        groups.sort(key=lambda docs: (-len(docs), docs[0]))
+        self.seconds['verify'] = time.perf_counter() - start
+        return groups
+
+    def export(self, groups):
+        """Price comparison records: every listing of the group, cheapest first"""
+        records = []
+        for docs in groups:
+            listings = sorted(
+                ({'store': self.stores[doc], 'name': self.products[doc].get('name'),
+                  'url': self.products[doc].get('url'), 'price': self.products[doc].get('price'),
+                  'in_stock': self.products[doc].get('in_stock', True)} for doc in docs),
+                key=lambda listing: (not isinstance(listing['price'], (int, float)),
+                                     listing['price'] if isinstance(listing['price'], (int, float)) else 0),
+            )
+            prices = [listing['price'] for listing in listings if isinstance(listing['price'], (int, float))]
+            records.append({
+                'name': listings[0]['name'],
+                'stores': sorted({listing['store'] for listing in listings}),
+                'lowest_price': min(prices) if prices else None,
+                'highest_price': max(prices) if prices else None,
+                'listings': listings,
+            })
+        return records
+
+    def print_stats(self, groups):
+        print(f"Matching: {self.counts['products']} products from {len(set(self.stores))} stores "
+              f"({self.counts['skipped']} without a name or URL skipped)")
+        if self.counts['invalid']:
+            print(f"- Skipped {self.counts['invalid']} records that fail the product schema")
+        if self.counts['duplicates']:
+            print(f"- Skipped {self.counts['duplicates']} duplicate product URLs")
+        print(f"- {self.counts['candidates']} candidate pairs, {self.counts['matched_pairs']} matched, "
+              f"{len(groups)} cross-store groups")
+        if self.counts['oversized_buckets']:
+            print(f"- {self.counts['oversized_buckets']} buckets over {self.max_bucket} products skipped")
+        print('- ' + ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.seconds.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Group listings of the same product across stores for price comparison')
+    parser.add_argument('inputs', nargs='*',
+                        default=[os.path.join(DATA_DIR, 'ifit_supplements.json'),
+                                 os.path.join(DATA_DIR, 'nbs_supplements.json')],
+                        help='catalogue .json documents or scraped .jsonl files, any number of stores')
+    parser.add_argument('-o', '--output', default=os.path.join(DATA_DIR, 'product_matches.json'),
+                        help='matched groups document to write')
+    parser.add_argument('--threshold', type=float, default=0.5, help='name similarity (Jaccard) for a match')
+    parser.add_argument('--num-perm', type=int, default=64, help='MinHash signature length')
+    parser.add_argument('--bands', type=int, default=16, help='LSH bands (num-perm / bands rows each)')
+    args = parser.parse_args()
+
+    matcher = ProductMatcher(args.threshold, args.num_perm, args.bands)
+    for path in args.inputs:
+        products, _ = read_products(path)
+        matcher.add_all(products)
+    groups = matcher.groups()
+    matcher.print_stats(groups)
+
+    document = {
+        'groups': matcher.export(groups),
+        'total_groups': len(groups),
+        'stores': sorted(set(matcher.stores)),
+        'matched_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, args.output)
+    print(f"✓ Wrote {len(groups)} groups to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
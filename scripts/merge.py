@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Catalogue Merge
+Upserts products into a catalogue keyed by canonical URL, unioning categories and skipping unchanged records
+"""
+
+import argparse
+import hashlib
+import json
+from urllib.parse import urlsplit, urlunsplit
+
+from jsonl_store import write_document
+from postprocess import read_products
+
+
+def canonical_url(url):
+    """The key two listings of the same product share: no www., query, fragment or missing slash"""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    path = parts.path or '/'
+    if not path.endswith('/'):
+        path += '/'
+    return urlunsplit(('https' if parts.scheme in ('http', 'https') else parts.scheme, host, path, '', ''))
+
+
+def content_hash(product):
+    """Stable digest of a product record, independent of key order"""
+    payload = json.dumps(product, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def union(first, second):
+    """Items of both lists, in first-seen order"""
+    return list(dict.fromkeys([*(first or []), *(second or [])]))
+
+
+class CatalogueIndex:
+    def __init__(self, products=()):
+        """products: the existing catalogue; duplicate URLs in it are collapsed"""
+        self.products = []
+        self.positions = {}
+        self.hashes = {}
+        self.counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+        for product in products:
+            self.upsert(product)
+        self.duplicates = self.counts['updated'] + self.counts['unchanged']
+        self.counts = dict.fromkeys(self.counts, 0)
+
+    def upsert(self, product):
+        """Insert a new product or fold it into the stored one; returns what happened"""
+        key = canonical_url(product['url'])
+        position = self.positions.get(key)
+        if position is None:
+            self.positions[key] = len(self.products)
+            self.products.append(product)
+            self.hashes[key] = content_hash(product)
+            self.counts['inserted'] += 1
+            return 'inserted'
+
+        existing = self.products[position]
+        merged = {**existing, **product}
+        # A product listed under several categories keeps them all and its first main category
+        merged['categories'] = union(existing.get('categories'), product.get('categories'))
+        merged['category'] = existing.get('category') or product.get('category', '')
+        digest = content_hash(merged)
+        if digest == self.hashes[key]:
+            self.counts['unchanged'] += 1
+            return 'unchanged'
+        self.products[position] = merged
+        self.hashes[key] = digest
+        self.counts['updated'] += 1
+        return 'updated'
+
+    def merge(self, products):
+        for product in products:
+            self.upsert(product)
+        return self.counts
+
+    def print_stats(self):
+        print(f"Merge: {self.counts['inserted']} inserted, {self.counts['updated']} updated, "
+              f"{self.counts['unchanged']} unchanged ({len(self.products)} products)")
+        if self.duplicates:
+            print(f"Merge: collapsed {self.duplicates} duplicate records already in the catalogue")
+
+
+def merge_into(existing_file, products, output_file=None):
+    """
+    Upsert products into the catalogue document existing_file and write the
+    result atomically to output_file (default: replace it). A missing
+    existing_file starts an empty catalogue. Returns the CatalogueIndex.
+    """
+    output_file = output_file or existing_file
+    try:
+        records, meta = read_products(existing_file)
+        index = CatalogueIndex(records)
+        meta = dict(meta)
+    except FileNotFoundError:
+        index, meta = CatalogueIndex(), {}
+    index.merge(products)
+    # The merged catalogue is as fresh as its newest source
+    meta.pop('scraped_at', None)
+    write_document(index.products, output_file, meta)
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge scraped product files into one catalogue')
+    parser.add_argument('catalogue', help='catalogue .json document to merge into')
+    parser.add_argument('sources', nargs='+', help='.json documents or .jsonl files to merge, in order')
+    parser.add_argument('-o', '--output', help='output .json document (default: rewrite the catalogue)')
+    args = parser.parse_args()
+
+    def incoming():
+        for source in args.sources:
+            records, _ = read_products(source)
+            yield from records
+
+    index = merge_into(args.catalogue, incoming(), args.output)
+    index.print_stats()
+    print(f"✓ Wrote {len(index.products)} products to {args.output or args.catalogue}")
+
+
+if __name__ == '__main__':
+    main()
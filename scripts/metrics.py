@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Crawl Metrics
+Per-stage timing histograms, counters, JSON/Prometheus export and optional cProfile dumps per stage
+"""
+
+import bisect
+import cProfile
+import json
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from parsing a small page to a slow retried fetch
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the quantile (the maximum for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+    def to_json(self):
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[repr(bound)] = cumulative
+        buckets['+Inf'] = self.count
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 6),
+            'mean': round(self.sum / self.count, 6) if self.count else 0.0,
+            'max': round(self.max, 6),
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': buckets,
+        }
+
+
+class Metrics:
+    def __init__(self, profile_dir=None):
+        """profile_dir: when set, each stage is profiled with cProfile and dumped there as <stage>.prof"""
+        self.profile_dir = profile_dir
+        self.counters = {}
+        self.histograms = {}
+        self.profiles = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.started = time.time()
+
+    def inc(self, name, amount=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def add_counters(self, prefix, counters):
+        """Fold another component's counters in (e.g. HttpClient.stats()) under prefix_"""
+        with self.lock:
+            for name, value in counters.items():
+                self.counters[f"{prefix}_{name}"] = value
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block into the stage's histogram (and its profile)"""
+        profile = self._start_profile(name) if self.profile_dir else None
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+            if profile is not None:
+                self._stop_profile()
+
+    def _start_profile(self, name):
+        """
+        One profiler per stage and thread. Entering a nested stage pauses the
+        outer stage's profiler, so each dump holds only its own stage's time.
+        """
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+            self.local.profilers = {}
+        profile = self.local.profilers.get(name)
+        if profile is None:
+            profile = self.local.profilers[name] = cProfile.Profile()
+            with self.lock:
+                self.profiles.setdefault(name, []).append(profile)
+        if stack:
+            stack[-1].disable()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process; keep timing, skip the profile
+            if stack:
+                stack[-1].enable()
+            return None
+        stack.append(profile)
+        return profile
+
+    def _stop_profile(self):
+        stack = self.local.stack
+        stack.pop().disable()
+        if stack:
+            stack[-1].enable()
+
+    def to_json(self):
+        with self.lock:
+            return {
+                'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.started)),
+                'duration': round(time.time() - self.started, 3),
+                'counters': dict(sorted(self.counters.items())),
+                'stages': {name: histogram.to_json() for name, histogram in sorted(self.histograms.items())},
+            }
+
+    def to_prometheus(self, job):
+        """Prometheus text exposition format, e.g. for node_exporter's textfile collector"""
+        lines = [
+            '# HELP scraper_stage_seconds Time spent per scraper stage',
+            '# TYPE scraper_stage_seconds histogram',
+        ]
+        with self.lock:
+            for name, histogram in sorted(self.histograms.items()):
+                labels = f'job="{job}",stage="{name}"'
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'scraper_stage_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'scraper_stage_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f'scraper_stage_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+                lines.append(f'scraper_stage_seconds_count{{{labels}}} {histogram.count}')
+            for name, value in sorted(self.counters.items()):
+                lines.append(f'# TYPE scraper_{name}_total counter')
+                lines.append(f'scraper_{name}_total{{job="{job}"}} {value}')
+        lines.append('# TYPE scraper_last_run_timestamp_seconds gauge')
+        lines.append(f'scraper_last_run_timestamp_seconds{{job="{job}"}} {self.started:.0f}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path, job):
+        """Export to path atomically: Prometheus text for .prom, JSON otherwise"""
+        if path.endswith('.prom'):
+            payload = self.to_prometheus(job)
+        else:
+            payload = json.dumps({'job': job, **self.to_json()}, indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def dump_profiles(self):
+        """Write one merged <stage>.prof per profiled stage, returns the paths"""
+        os.makedirs(self.profile_dir, exist_ok=True)
+        paths = []
+        for name, profiles in sorted(self.profiles.items()):
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            path = os.path.join(self.profile_dir, f"{name}.prof")
+            stats.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def finish(self, path, job):
+        """End-of-run export: the metrics file when path is set, the profiles when profiling"""
+        if path:
+            self.write(path, job)
+            print(f"✓ Metrics written to {path}")
+        if self.profile_dir:
+            paths = self.dump_profiles()
+            print(f"✓ {len(paths)} stage profiles written to {self.profile_dir} "
+                  f"(python -m pstats {os.path.join(self.profile_dir, '<stage>.prof')})")
+
+    def print_stats(self):
+        with self.lock:
+            histograms = sorted(self.histograms.items())
+        if not histograms:
+            return
+        print(f"{'Stage':<14} {'count':>6} {'total s':>8} {'mean ms':>8} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+        for name, histogram in histograms:
+            print(f"{name:<14} {histogram.count:>6} {histogram.sum:>8.2f} "
+                  f"{histogram.sum / histogram.count * 1000:>8.1f} {histogram.quantile(0.5) * 1000:>7.0f} "
+                  f"{histogram.quantile(0.99) * 1000:>7.0f} {histogram.max * 1000:>7.0f}")
+
+
+def add_metrics_arguments(parser):
+    """Add the shared --metrics / --profile options to a scraper CLI"""
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='write stage timings and counters here at the end of the run '
+                             '(.prom for the Prometheus text format, JSON otherwise)')
+    parser.add_argument('--profile', metavar='DIR', help='write a cProfile dump per stage into DIR')
+
+
+def metrics_from_args(args):
+    """Build the Metrics selected by add_metrics_arguments options"""
+    return Metrics(profile_dir=args.profile)
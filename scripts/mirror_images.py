@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Product Image Mirror
+Downloads each product image once, dedups by content hash and writes resized WebP/AVIF variants with a srcset manifest
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from crawl_engine import CrawlEngine
+from http_client import HttpClient
+from postprocess import read_products
+
+# Pillow is optional: without it the originals are mirrored but no variants are made
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+IMAGES_DIR = os.path.join(ROOT_DIR, 'assets', 'images', 'products')
+
+# Card thumbnails render at ~250px, the detail page at ~500px; 2x screens take the next size up
+WIDTHS = (300, 600)
+FORMATS = ('avif', 'webp')
+EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif'}
+
+
+def available_formats(formats):
+    """The requested variant formats this Pillow build can encode"""
+    if Image is None:
+        return ()
+    supported = []
+    for fmt in formats:
+        try:
+            if features.check(fmt):
+                supported.append(fmt)
+        except ValueError:
+            # Pillow versions that predate the codec do not know the feature name
+            pass
+    return tuple(supported)
+
+
+def load_manifest(path):
+    """{'images': {url: {hash, etag, last_modified}}, 'files': {hash: {original, width, height, variants}}}"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+    manifest.setdefault('images', {})
+    manifest.setdefault('files', {})
+    return manifest
+
+
+def srcsets(record):
+    """{format: "path 300w, path 600w"} for a mirrored file"""
+    return {fmt: ', '.join(f"{path} {width}w" for width, path in sizes)
+            for fmt, sizes in record.get('variants', {}).items()}
+
+
+def local_image(manifest, url):
+    """(original path, srcsets) of a mirrored image URL, None when it was not mirrored"""
+    entry = manifest['images'].get(url)
+    record = manifest['files'].get(entry['hash']) if entry else None
+    if record is None:
+        return None
+    return record['original'], srcsets(record)
+
+
+def write_file(path, data):
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class ImageMirror:
+    def __init__(self, output_dir=IMAGES_DIR, http=None, widths=WIDTHS, formats=FORMATS,
+                 quality=80, revalidate=False):
+        """
+        output_dir receives <hash>.<ext> originals, <hash>-<width>.<format>
+        variants and manifest.json. Images already in the manifest are skipped
+        without a request unless revalidate, which sends a conditional GET.
+        """
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self.manifest_path = os.path.join(output_dir, 'manifest.json')
+        self.manifest = load_manifest(self.manifest_path)
+        self.http = http or HttpClient()
+        self.widths = sorted(widths)
+        self.formats = available_formats(formats)
+        self.quality = quality
+        self.revalidate = revalidate
+        self.lock = threading.Lock()
+        self.claims = {}
+        self.counts = {'images': 0, 'skipped': 0, 'not_modified': 0, 'downloaded': 0, 'deduplicated': 0,
+                       'processed': 0, 'failed': 0, 'bytes_original': 0, 'bytes_variants': 0}
+
+    def _count(self, key, amount=1):
+        with self.lock:
+            self.counts[key] += amount
+
+    def _site_path(self, name):
+        """Path of an output file relative to the site root, as the pages reference it"""
+        return os.path.relpath(os.path.join(self.output_dir, name), ROOT_DIR).replace(os.sep, '/')
+
+    def _complete(self, digest):
+        """True when a file's original and every wanted variant are on disk"""
+        record = self.manifest['files'].get(digest)
+        if record is None or not set(self.formats) <= set(record.get('formats', [])):
+            return False
+        paths = [record['original']] + [path for sizes in record['variants'].values() for _, path in sizes]
+        return all(os.path.exists(os.path.join(ROOT_DIR, path)) for path in paths)
+
+    def mirror(self, url):
+        """Mirror one image URL, returns its manifest entry or None when it could not be fetched"""
+        self._count('images')
+        with self.lock:
+            entry = self.manifest['images'].get(url)
+        if entry and self._complete(entry['hash']):
+            if not self.revalidate:
+                self._count('skipped')
+                return entry
+            headers = {key: value for key, value in (('If-None-Match', entry.get('etag')),
+                                                     ('If-Modified-Since', entry.get('last_modified'))) if value}
+        else:
+            headers = None
+
+        response = self.http.get(url, headers)
+        if response is None:
+            self._count('failed')
+            return entry
+        if response.status_code == 304:
+            self._count('not_modified')
+            return entry
+
+        content = response.content
+        digest = hashlib.sha1(content).hexdigest()[:16]
+        self._count('downloaded')
+        self._count('bytes_original', len(content))
+        # The first URL to deliver these bytes writes the files, the others wait for it
+        with self.lock:
+            done = self.claims.get(digest)
+            first = done is None
+            if first:
+                done = self.claims[digest] = threading.Event()
+        if first and not self._complete(digest):
+            try:
+                record = self._process(digest, content, url)
+                with self.lock:
+                    self.manifest['files'][digest] = record
+            finally:
+                done.set()
+        else:
+            # Same bytes behind another URL (or unchanged behind this one)
+            if first:
+                done.set()
+            else:
+                done.wait()
+            self._count('deduplicated')
+
+        entry = {'hash': digest, 'etag': response.headers.get('ETag'),
+                 'last_modified': response.headers.get('Last-Modified')}
+        with self.lock:
+            self.manifest['images'][url] = entry
+        return entry
+
+    def _process(self, digest, content, url):
+        """Write the original and its resized variants, returns the manifest record"""
+        extension = os.path.splitext(urlsplit(url).path)[1].lower()
+        if extension not in EXTENSIONS:
+            extension = '.jpg'
+        original = f"{digest}{extension}"
+        write_file(os.path.join(self.output_dir, original), content)
+        record = {'original': self._site_path(original), 'width': None, 'height': None,
+                  'formats': list(self.formats), 'variants': {}}
+        self._count('processed')
+        if not self.formats:
+            return record
+
+        try:
+            with Image.open(io.BytesIO(content)) as image:
+                image.load()
+                record['width'], record['height'] = image.size
+                has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+                image = image.convert('RGBA' if has_alpha else 'RGB')
+        except (OSError, ValueError) as e:
+            print(f"  ✗ Cannot decode {url}: {e}")
+            return record
+
+        # Never upscale: widths above the original collapse into the original width
+        widths = sorted({min(width, image.width) for width in self.widths})
+        for width in widths:
+            if width == image.width:
+                resized = image
+            else:
+                resized = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+            for fmt in self.formats:
+                buffer = io.BytesIO()
+                resized.save(buffer, fmt.upper(), quality=self.quality)
+                name = f"{digest}-{width}.{fmt}"
+                write_file(os.path.join(self.output_dir, name), buffer.getvalue())
+                self._count('bytes_variants', buffer.tell())
+                record['variants'].setdefault(fmt, []).append([width, self._site_path(name)])
+        return record
+
+    def prune(self, urls):
+        """Forget images not in urls and delete files no remaining image uses"""
+        keep = set(urls)
+        images = self.manifest['images']
+        for url in [url for url in images if url not in keep]:
+            del images[url]
+        used = {entry['hash'] for entry in images.values()}
+        removed = 0
+        for digest in [digest for digest in self.manifest['files'] if digest not in used]:
+            record = self.manifest['files'].pop(digest)
+            paths = [record['original']] + [path for sizes in record['variants'].values() for _, path in sizes]
+            for path in paths:
+                try:
+                    os.remove(os.path.join(ROOT_DIR, path))
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        return removed
+
+    def save(self):
+        payload = json.dumps(self.manifest, ensure_ascii=False, indent=2, sort_keys=True)
+        write_file(self.manifest_path, payload.encode('utf-8'))
+
+    def print_stats(self):
+        counts = self.counts
+        print(f"✓ Mirrored {counts['images']} images into {self.output_dir}")
+        print(f"- {counts['skipped']} already mirrored, {counts['not_modified']} not modified, "
+              f"{counts['downloaded']} downloaded, {counts['failed']} failed")
+        print(f"- {counts['processed']} new files, {counts['deduplicated']} duplicates of a mirrored file")
+        if counts['downloaded']:
+            print(f"- {counts['bytes_original'] / 1024:.0f} KB downloaded, "
+                  f"{counts['bytes_variants'] / 1024:.0f} KB of {'/'.join(self.formats) or 'no'} variants written")
+        if not self.formats:
+            print("- Pillow (with WebP/AVIF support) is not installed, only originals were mirrored")
+
+
+def image_urls(paths, listing_only=False):
+    """Image URLs of every product in the catalogues, in first-seen order"""
+    urls = {}
+    for path in paths:
+        products, _ = read_products(path)
+        for product in products:
+            images = product.get('images') or []
+            for url in images[:1] if listing_only else images:
+                if isinstance(url, str) and url.startswith('http'):
+                    urls[url] = None
+    return list(urls)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mirror product images with resized WebP/AVIF variants')
+    parser.add_argument('inputs', nargs='*',
+                        default=[os.path.join(ROOT_DIR, 'data', 'nbs_supplements.json')],
+                        help='catalogue .json documents or .jsonl files')
+    parser.add_argument('--output', default=IMAGES_DIR, help='directory for the images and manifest.json')
+    parser.add_argument('--widths', default=','.join(map(str, WIDTHS)), help='comma-separated variant widths')
+    parser.add_argument('--formats', default=','.join(FORMATS), help='comma-separated variant formats')
+    parser.add_argument('--quality', type=int, default=80, help='WebP/AVIF encoder quality')
+    parser.add_argument('--listing-only', action='store_true',
+                        help='only mirror the first image of each product (the listing thumbnail)')
+    parser.add_argument('--revalidate', action='store_true',
+                        help='send conditional requests for images that are already mirrored')
+    parser.add_argument('--prune', action='store_true',
+                        help='delete mirrored images no product in the inputs uses any more')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent downloads')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    urls = image_urls(args.inputs, args.listing_only)
+    engine = CrawlEngine(max_workers=args.workers, per_host_limit=4, rate=8.0, burst=4)
+    http = HttpClient({
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }, throttle=engine.throttle)
+    mirror = ImageMirror(args.output, http,
+                         widths=[int(w) for w in args.widths.split(',') if w.strip()],
+                         formats=[f.strip().lower() for f in args.formats.split(',') if f.strip()],
+                         quality=args.quality, revalidate=args.revalidate)
+    print(f"Mirroring {len(urls)} images from {len(args.inputs)} catalogues...")
+    try:
+        engine.map(mirror.mirror, urls)
+        if args.prune:
+            print(f"- Pruned {mirror.prune(urls)} files of images no longer used")
+    finally:
+        # Keep what was mirrored so far even when the run is interrupted
+        mirror.save()
+        engine.shutdown()
+        http.close()
+    mirror.print_stats()
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
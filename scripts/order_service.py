@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Order Ingestion Service
+Asyncio HTTP endpoint for the Buy Now button: validates orders against the catalogue and group-commits them to SQLite
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from merge import canonical_url
+from postprocess import read_products
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+MAX_QUANTITY = 20
+MAX_BODY = 1 << 16
+
+STATUS_TEXT = {
+    200: 'OK',
+    201: 'Created',
+    204: 'No Content',
+    400: 'Bad Request',
+    404: 'Not Found',
+    409: 'Conflict',
+    413: 'Payload Too Large',
+    422: 'Unprocessable Entity',
+    500: 'Internal Server Error',
+}
+
+# The storefront is served from another origin (or file://)
+CORS_HEADERS = (
+    'Access-Control-Allow-Origin: *\r\n'
+    'Access-Control-Allow-Methods: POST, GET, OPTIONS\r\n'
+    'Access-Control-Allow-Headers: Content-Type\r\n'
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    client_order_id TEXT NOT NULL UNIQUE,
+    payload_hash TEXT NOT NULL,
+    product_url TEXT NOT NULL,
+    product_name TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    unit_price REAL NOT NULL,
+    total REAL NOT NULL,
+    client_timestamp TEXT,
+    created_at TEXT NOT NULL
+)
+"""
+
+
+class OrderCatalogue:
+    def __init__(self, path):
+        """Prices and stock by canonical product URL; the first record of a duplicated URL wins"""
+        products, _ = read_products(path)
+        self.products = {}
+        for product in products:
+            self.products.setdefault(canonical_url(product['url']), product)
+
+    def validate(self, data):
+        """Return (order, errors); the order carries the catalogue's name and price"""
+        if not isinstance(data, dict):
+            return None, ['order must be a JSON object']
+        errors = []
+        client_order_id = data.get('client_order_id')
+        if not isinstance(client_order_id, str) or not 0 < len(client_order_id) <= 100:
+            errors.append('client_order_id must be a string of 1-100 characters')
+        url = data.get('product_url')
+        try:
+            product = self.products.get(canonical_url(url)) if isinstance(url, str) and url else None
+        except ValueError:
+            product = None
+            errors.append('product_url is not a valid URL')
+        else:
+            if product is None:
+                errors.append('product_url is not in the catalogue')
+        quantity = data.get('quantity', 1)
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or not 0 < quantity <= MAX_QUANTITY:
+            errors.append(f'quantity must be an integer from 1 to {MAX_QUANTITY}')
+        price = data.get('price')
+        if isinstance(price, bool) or not isinstance(price, (int, float)):
+            errors.append('price must be a number')
+        if errors:
+            return None, errors
+
+        if product.get('price') is None or abs(price - product['price']) >= 0.005:
+            errors.append(f"price {price} does not match the catalogue price {product.get('price')}")
+        elif not product.get('in_stock', True):
+            errors.append('product is out of stock')
+        total = round(product['price'] * quantity, 2) if product.get('price') is not None else None
+        if 'total' in data and (not isinstance(data['total'], (int, float)) or total is None
+                                or abs(data['total'] - total) >= 0.005):
+            errors.append(f"total does not match price x quantity ({total})")
+        if errors:
+            return None, errors
+
+        order = {
+            'client_order_id': client_order_id,
+            'product_url': product['url'],
+            'product_name': product['name'],
+            'quantity': quantity,
+            'unit_price': product['price'],
+            'total': total,
+            'client_timestamp': data.get('timestamp') if isinstance(data.get('timestamp'), str) else None,
+        }
+        # A retry of the same order may carry a new timestamp, so it is left out of the identity
+        identity = json.dumps([order['product_url'], quantity, order['unit_price']])
+        order['payload_hash'] = hashlib.sha1(identity.encode('utf-8')).hexdigest()
+        return order, []
+
+
+def order_response(order_id, client_order_id, total, created_at):
+    return {'order_id': order_id, 'client_order_id': client_order_id, 'status': 'accepted',
+            'total': total, 'created_at': created_at}
+
+
+class OrderStore:
+    def __init__(self, path, batch_size=256, max_delay=0.0):
+        """
+        SQLite in WAL mode behind one writer thread. Orders queued while a
+        commit is running go into the next transaction together (group
+        commit), so the fsync cost is shared by the whole batch. max_delay
+        (seconds) optionally holds a batch open for stragglers.
+        """
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=FULL')
+        self.db.execute(SCHEMA)
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.queue = asyncio.Queue(maxsize=batch_size * 4)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.counts = {'accepted': 0, 'replayed': 0, 'conflicts': 0, 'commits': 0}
+
+    async def submit(self, order):
+        """Queue a validated order and wait for its commit; returns (status, response body)"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((order, future))
+        return await future
+
+    async def run(self):
+        """Writer loop: drain the queue into one transaction per batch"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                results = await loop.run_in_executor(self.executor, self._commit, [order for order, _ in batch])
+            except sqlite3.Error as e:
+                print(f"  ✗ Commit of {len(batch)} orders failed: {e}")
+                results = [(500, {'error': 'order could not be stored'})] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    def _commit(self, orders):
+        """Insert a batch in one transaction; a known client_order_id replays its stored response"""
+        created_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        results = []
+        counts = dict.fromkeys(('accepted', 'replayed', 'conflicts'), 0)
+        cursor = self.db.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            for order in orders:
+                cursor.execute(
+                    'INSERT OR IGNORE INTO orders (client_order_id, payload_hash, product_url, product_name, '
+                    'quantity, unit_price, total, client_timestamp, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (order['client_order_id'], order['payload_hash'], order['product_url'], order['product_name'],
+                     order['quantity'], order['unit_price'], order['total'], order['client_timestamp'], created_at))
+                if cursor.rowcount:
+                    counts['accepted'] += 1
+                    results.append((201, order_response(cursor.lastrowid, order['client_order_id'],
+                                                        order['total'], created_at)))
+                    continue
+                row = cursor.execute('SELECT id, payload_hash, total, created_at FROM orders WHERE client_order_id = ?',
+                                     (order['client_order_id'],)).fetchone()
+                if row[1] == order['payload_hash']:
+                    counts['replayed'] += 1
+                    results.append((200, order_response(row[0], order['client_order_id'], row[2], row[3])))
+                else:
+                    counts['conflicts'] += 1
+                    results.append((409, {'error': 'client_order_id was already used for a different order'}))
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        for key, value in counts.items():
+            self.counts[key] += value
+        self.counts['commits'] += 1
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+        self.db.close()
+
+
+def http_response(status, payload=None, keep_alive=True):
+    body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    head = (f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'OK')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"{CORS_HEADERS}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode('latin-1') + body
+
+
+async def read_request(reader):
+    """(method, path, headers, body) of the next request on a connection, None when it closes"""
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    parts = line.decode('latin-1').split()
+    if len(parts) != 3:
+        raise ValueError('malformed request line')
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+        if len(headers) > 100:
+            raise ValueError('too many headers')
+    length = int(headers.get('content-length') or 0)
+    if length > MAX_BODY:
+        raise OverflowError('request body too large')
+    body = await reader.readexactly(length) if length else b''
+    return parts[0].upper(), parts[1].split('?')[0], headers, body
+
+
+class OrderService:
+    def __init__(self, catalogue, store):
+        self.catalogue = catalogue
+        self.store = store
+        self.requests = 0
+
+    async def route(self, method, path, body):
+        if method == 'OPTIONS':
+            return 204, None
+        if method == 'GET' and path == '/health':
+            return 200, {'status': 'ok', 'products': len(self.catalogue.products), **self.store.counts}
+        if path != '/api/orders':
+            return 404, {'error': 'not found'}
+        if method != 'POST':
+            return 404, {'error': 'POST orders to /api/orders'}
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return 400, {'error': 'body is not valid JSON'}
+        try:
+            order, errors = self.catalogue.validate(data)
+        except (ValueError, TypeError) as e:
+            return 422, {'error': 'invalid order', 'details': [str(e)]}
+        if errors:
+            return 422, {'error': 'invalid order', 'details': errors}
+        return await self.store.submit(order)
+
+    async def handle(self, reader, writer):
+        """Serve one keep-alive connection"""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except OverflowError as e:
+                    writer.write(http_response(413, {'error': str(e)}, keep_alive=False))
+                    break
+                except ValueError as e:
+                    writer.write(http_response(400, {'error': str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, path, headers, body = request
+                self.requests += 1
+                try:
+                    status, payload = await self.route(method, path, body)
+                except Exception as e:
+                    print(f"  ✗ {method} {path} failed: {type(e).__name__}: {e}", flush=True)
+                    status, payload = 500, {'error': 'internal server error'}
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(http_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        writer_task = asyncio.create_task(self.store.run())
+        server = await asyncio.start_server(self.handle, host, port, backlog=1024)
+        print(f"Listening on http://{host}:{server.sockets[0].getsockname()[1]}/api/orders", flush=True)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+    def print_stats(self):
+        counts = self.store.counts
+        batched = counts['accepted'] + counts['replayed'] + counts['conflicts']
+        print(f"✓ {counts['accepted']} orders accepted, {counts['replayed']} replayed, "
+              f"{counts['conflicts']} conflicting ids ({self.requests} requests)")
+        if counts['commits']:
+            print(f"- {counts['commits']} commits, {batched / counts['commits']:.1f} orders per commit")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the Buy Now order endpoint')
+    parser.add_argument('--catalogue', default=os.path.join(DATA_DIR, 'nbs_supplements.json'),
+                        help='catalogue document orders are validated against')
+    parser.add_argument('--db', default=os.path.join(DATA_DIR, 'orders.sqlite'), help='SQLite order database')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--batch-size', type=int, default=256, help='most orders per transaction')
+    parser.add_argument('--max-delay-ms', type=float, default=0.0,
+                        help='hold a transaction open this long for more orders (0 = commit as soon as idle)')
+    args = parser.parse_args()
+
+    catalogue = OrderCatalogue(args.catalogue)
+    store = OrderStore(args.db, args.batch_size, args.max_delay_ms / 1000)
+    service = OrderService(catalogue, store)
+    print(f"✓ Loaded {len(catalogue.products)} products from {args.catalogue}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+        service.print_stats()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Process-Pool Parsing Stage
+Hands fetched page bytes to parser worker processes through a bounded queue
+"""
+
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+# One scraper instance per worker process and scraper class
+_worker_scrapers = {}
+
+
+def parse_product_page(scraper_class, product_url, content, parser, scoped, options=()):
+    """
+    Worker entry point: build the same product dict scrape_product_details
+    returns. options are extra (name, value) constructor arguments that change
+    parsing, e.g. the categories a configured source files its products under.
+    """
+    key = (scraper_class, parser, scoped, options)
+    scraper = _worker_scrapers.get(key)
+    if scraper is None:
+        scraper = _worker_scrapers[key] = scraper_class(parser=parser, scoped=scoped, **dict(options))
+    return scraper.parse_page(product_url, content)
+
+
+class ParsePool:
+    def __init__(self, workers=None, max_pending=None):
+        """
+        workers: parser processes (defaults to the CPU count)
+        max_pending: pages queued or in flight before fetchers block (backpressure)
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        self.slots = threading.BoundedSemaphore(max_pending or self.workers * 4)
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) on a worker, blocking while the queue is full"""
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(fn, *args)
+        except Exception:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+def resolve(result):
+    """Wait for a value that may still be a parse-pool Future"""
+    while isinstance(result, Future):
+        result = result.result()
+    return result
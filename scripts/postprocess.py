@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Product Data Post-Processing
+Streams a scraped catalogue through thumbnail removal, price normalisation and schema validation
+"""
+
+import argparse
+import json
+import re
+from urllib.parse import urlparse
+
+from jsonl_store import read_jsonl, write_document
+
+# WordPress resized copies end in -<width>x<height> before the extension
+SIZE_SUFFIX = re.compile(r'-(\d+)x(\d+)(\.[A-Za-z0-9]+)$')
+
+# field: (accepted types, required)
+PRODUCT_SCHEMA = {
+    'url': (str, True),
+    'name': (str, True),
+    'price': ((int, float, type(None)), True),
+    'original_price': ((int, float, type(None)), False),
+    'category': (str, False),
+    'categories': (list, False),
+    'images': (list, False),
+    'description': (str, False),
+    'short_description': (str, False),
+    'in_stock': (bool, False),
+}
+
+DEFAULTS = {
+    'original_price': None,
+    'category': '',
+    'categories': [],
+    'images': [],
+    'description': '',
+    'short_description': '',
+    'in_stock': True,
+}
+
+
+class ProductDocumentReader:
+    """
+    Iterate the "products" array of a catalogue JSON document one record at a
+    time, reading the file in chunks. The other top-level keys are in .meta
+    once iteration finishes. A stray trailing comma in the array is tolerated.
+    """
+
+    def __init__(self, path, chunk_size=1 << 16):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.meta = {}
+        self.decoder = json.JSONDecoder()
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            buf = ''
+            match = None
+            while match is None:
+                chunk = f.read(self.chunk_size)
+                buf += chunk
+                match = re.search(r'"products"\s*:\s*\[', buf)
+                if not chunk and match is None:
+                    raise ValueError(f"{self.path} has no \"products\" array")
+            head = buf[:match.start()].strip().rstrip(',')
+            if head != '{':
+                self.meta.update(json.loads(head + '}'))
+            buf = buf[match.end():]
+            pos = 0
+            eof = False
+
+            while True:
+                # Skip separators, refilling the buffer when it runs dry
+                while True:
+                    while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                        pos += 1
+                    if pos < len(buf) or eof:
+                        break
+                    buf, pos = f.read(self.chunk_size), 0
+                    eof = not buf
+                if pos >= len(buf):
+                    raise ValueError(f"{self.path} ends inside the products array")
+                if buf[pos] == ']':
+                    pos += 1
+                    break
+                try:
+                    record, end = self.decoder.raw_decode(buf, pos)
+                except ValueError:
+                    if eof:
+                        raise
+                    chunk = f.read(self.chunk_size)
+                    eof = not chunk
+                    buf, pos = buf[pos:] + chunk, 0
+                    continue
+                yield record
+                pos = end
+                if pos > self.chunk_size:
+                    buf, pos = buf[pos:], 0
+
+            tail = (buf[pos:] + f.read()).strip()
+        if tail.startswith(','):
+            self.meta.update(json.loads('{' + tail[1:]))
+
+
+def read_products(path):
+    """Records of a .jsonl file or of a catalogue document, plus the document's other keys"""
+    if path.endswith('.jsonl'):
+        return read_jsonl(path), {}
+    reader = ProductDocumentReader(path)
+    return reader, reader.meta
+
+
+def image_size(url):
+    """(base url, width, height) of a WordPress image URL; no size suffix means the original"""
+    path = urlparse(url).path
+    match = SIZE_SUFFIX.search(path)
+    if not match:
+        return url, None, None
+    base = url[:len(url) - len(path)] + path[:match.start()] + match.group(3)
+    return base, int(match.group(1)), int(match.group(2))
+
+
+def drop_thumbnails(images, thumbnail_size=150):
+    """
+    Keep one copy of each image, the largest size listed, and drop thumbnail
+    sizes (longest edge <= thumbnail_size) unless nothing else is left.
+    """
+    best = {}
+    for url in images:
+        if not isinstance(url, str) or not url.startswith('http'):
+            continue
+        base, width, height = image_size(url)
+        area = width * height if width else float('inf')
+        if base not in best or area > best[base][0]:
+            best[base] = (area, url, max(width, height) if width else None)
+    kept = [url for _, url, edge in best.values() if edge is None or edge > thumbnail_size]
+    if not kept and best:
+        kept = [max(best.values(), key=lambda entry: entry[0])[1]]
+    return kept
+
+
+def normalise_price(value):
+    """A price as a float rounded to piastres, None when missing or not positive"""
+    if isinstance(value, str):
+        match = re.search(r'\d+(?:\.\d+)?', value.replace(',', ''))
+        value = float(match.group()) if match else None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    value = round(float(value), 2)
+    return value if value > 0 else None
+
+
+def validate(product):
+    """Schema errors for a product record, empty when it is valid"""
+    errors = []
+    for field, (types, required) in PRODUCT_SCHEMA.items():
+        if field not in product:
+            if required:
+                errors.append(f"missing {field}")
+            continue
+        if not isinstance(product[field], types):
+            errors.append(f"{field} is {type(product[field]).__name__}")
+    if not errors:
+        if not product['name'].strip():
+            errors.append("empty name")
+        if not product['url'].startswith('http'):
+            errors.append("url is not absolute")
+        for field in ('categories', 'images'):
+            if not all(isinstance(item, str) for item in product.get(field, [])):
+                errors.append(f"{field} holds non-strings")
+    return errors
+
+
+def clean_product(product, thumbnail_size=150):
+    """Normalise one record into the schema's field order; validation runs on the result"""
+    product = {
+        **{field: product.get(field, DEFAULTS.get(field)) for field in PRODUCT_SCHEMA
+           if field in product or field in DEFAULTS},
+        **{key: value for key, value in product.items() if key not in PRODUCT_SCHEMA},
+    }
+    product['price'] = normalise_price(product.get('price'))
+    product['original_price'] = normalise_price(product['original_price'])
+    if product['original_price'] is not None and (
+            product['price'] is None or product['original_price'] <= product['price']):
+        # Not a sale, just the same price listed twice
+        product['original_price'] = None
+    # A list holding non-strings is left for validate() to reject, not silently trimmed
+    if isinstance(product['images'], list) and all(isinstance(url, str) for url in product['images']):
+        product['images'] = drop_thumbnails(product['images'], thumbnail_size)
+    for field in ('name', 'description', 'short_description', 'category'):
+        if isinstance(product.get(field), str):
+            product[field] = product[field].strip()
+    return product
+
+
+def postprocess(input_path, output_path=None, thumbnail_size=150, strict=False):
+    """
+    Clean every product of input_path (catalogue .json or scraped .jsonl) in
+    one streaming pass and write the document atomically to output_path
+    (default: replace the input). Returns the counters.
+    """
+    output_path = output_path or input_path
+    if output_path.endswith('.jsonl'):
+        raise ValueError("output must be a .json catalogue document")
+    products, meta = read_products(input_path)
+    stats = {'read': 0, 'written': 0, 'invalid': 0, 'images_dropped': 0, 'prices_changed': 0}
+
+    def cleaned():
+        for product in products:
+            stats['read'] += 1
+            if not isinstance(product, dict):
+                errors = ['not an object']
+            else:
+                before = (product.get('price'), product.get('original_price'), len(product.get('images') or []))
+                product = clean_product(product, thumbnail_size)
+                errors = validate(product)
+            if errors:
+                stats['invalid'] += 1
+                label = product.get('url') if isinstance(product, dict) else stats['read']
+                if strict:
+                    raise ValueError(f"Invalid product {label}: {', '.join(errors)}")
+                if stats['invalid'] <= 10:
+                    print(f"  ✗ Dropped {label}: {', '.join(errors)}")
+                continue
+            stats['images_dropped'] += before[2] - len(product['images'])
+            stats['prices_changed'] += before[:2] != (product['price'], product['original_price'])
+            stats['written'] += 1
+            yield product
+
+    # meta is filled in by the reader as it passes the document's other keys
+    write_document(cleaned(), output_path, meta)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean and validate a scraped product catalogue')
+    parser.add_argument('input', help='catalogue .json document or scraped .jsonl file')
+    parser.add_argument('-o', '--output', help='output .json document (default: rewrite the input)')
+    parser.add_argument('--thumbnail-size', type=int, default=150,
+                        help='drop WordPress image sizes whose longest edge is at most this')
+    parser.add_argument('--strict', action='store_true',
+                        help='stop at the first invalid product instead of dropping it')
+    args = parser.parse_args()
+
+    stats = postprocess(args.input, args.output, args.thumbnail_size, args.strict)
+    print(f"✓ Wrote {stats['written']} of {stats['read']} products to {args.output or args.input}")
+    print(f"- Removed {stats['images_dropped']} thumbnail or duplicate-size images")
+    print(f"- Normalised {stats['prices_changed']} prices")
+    if stats['invalid']:
+        print(f"- Dropped {stats['invalid']} products that failed validation")
+
+
+if __name__ == '__main__':
+    main()
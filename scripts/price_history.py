@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Price History
+Append-only SQLite log of (price, original_price, in_stock) changes per product, with per-product exports
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+from datetime import datetime
+
+from merge import canonical_url
+from postprocess import read_products
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+# products holds each URL's latest state so a run is compared without reading the log;
+# the log is clustered by (product_id, recorded_at) so one product's series is a range scan
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL UNIQUE,
+    price REAL,
+    original_price REAL,
+    in_stock INTEGER,
+    changed_at INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS prices (
+    product_id INTEGER NOT NULL REFERENCES products (id),
+    recorded_at INTEGER NOT NULL,
+    price REAL,
+    original_price REAL,
+    in_stock INTEGER,
+    PRIMARY KEY (product_id, recorded_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS prices_recorded_at ON prices (recorded_at);
+CREATE TABLE IF NOT EXISTS runs (
+    recorded_at INTEGER PRIMARY KEY,
+    products INTEGER NOT NULL,
+    changed INTEGER NOT NULL
+);
+"""
+
+
+def parse_timestamp(value):
+    """Epoch seconds of a scraped_at string ('2025-12-24 19:14:35' or ISO 8601), None when unparsable"""
+    try:
+        return int(datetime.fromisoformat(value).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+def price_state(product):
+    """The tracked (price, original_price, in_stock) tuple of a product record"""
+    def number(value):
+        return float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else None
+
+    in_stock = product.get('in_stock')
+    return number(product.get('price')), number(product.get('original_price')), \
+        None if in_stock is None else int(bool(in_stock))
+
+
+class PriceHistory:
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.executescript(SCHEMA)
+        self.counts = {'products': 0, 'new': 0, 'changed': 0, 'unchanged': 0, 'duplicates': 0}
+
+    def record(self, products, recorded_at=None):
+        """
+        Append the state of every product whose tuple differs from its latest
+        one. products may be a streaming reader; recorded_at may be a callable
+        evaluated after the last record (a document's scraped_at is only known
+        then). Runs in one transaction; returns the run's timestamp.
+        """
+        current = {url: (product_id, (price, original_price, in_stock))
+                   for product_id, url, price, original_price, in_stock
+                   in self.db.execute("SELECT id, url, price, original_price, in_stock FROM products")}
+        seen = set()
+        new, changed = [], []
+        for product in products:
+            if not product.get('url'):
+                continue
+            url = canonical_url(product['url'])
+            if url in seen:
+                # The first record of a URL wins, as in the catalogue build
+                self.counts['duplicates'] += 1
+                continue
+            seen.add(url)
+            state = price_state(product)
+            known = current.get(url)
+            if known is None:
+                new.append((url, state))
+            elif known[1] != state:
+                changed.append((known[0], state))
+            else:
+                self.counts['unchanged'] += 1
+        if callable(recorded_at):
+            recorded_at = recorded_at()
+        recorded_at = int(recorded_at if recorded_at is not None else time.time())
+
+        with self.db:
+            rows = [(product_id, recorded_at, *state) for product_id, state in changed]
+            for url, state in new:
+                cursor = self.db.execute(
+                    "INSERT INTO products (url, price, original_price, in_stock, changed_at) VALUES (?, ?, ?, ?, ?)",
+                    (url, *state, recorded_at),
+                )
+                rows.append((cursor.lastrowid, recorded_at, *state))
+            self.db.executemany(
+                "UPDATE products SET price = ?, original_price = ?, in_stock = ?, changed_at = ? WHERE id = ?",
+                [(*state, recorded_at, product_id) for product_id, state in changed],
+            )
+            # Re-recording the same run overwrites its rows instead of failing
+            self.db.executemany(
+                "INSERT OR REPLACE INTO prices (product_id, recorded_at, price, original_price, in_stock) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self.db.execute("INSERT OR REPLACE INTO runs (recorded_at, products, changed) VALUES (?, ?, ?)",
+                            (recorded_at, len(seen), len(rows)))
+        self.counts['products'] += len(seen)
+        self.counts['new'] += len(new)
+        self.counts['changed'] += len(changed)
+        return recorded_at
+
+    def series(self, url):
+        """[(recorded_at, price, original_price, in_stock), ...] of one product, oldest first"""
+        return self.db.execute(
+            "SELECT recorded_at, price, original_price, in_stock FROM prices "
+            "WHERE product_id = (SELECT id FROM products WHERE url = ?) ORDER BY recorded_at",
+            (canonical_url(url),),
+        ).fetchall()
+
+    def changed_since(self, since, price_only=False):
+        """
+        Products with a change recorded at or after since (epoch seconds), as
+        dicts of url, the price before since (None for products first seen
+        since), the current state and the number of changes. price_only drops
+        products whose price ended where it started.
+        """
+        rows = self.db.execute(
+            "SELECT p.url, p.price, p.original_price, p.in_stock, p.changed_at, COUNT(*), "
+            "(SELECT price FROM prices b WHERE b.product_id = p.id AND b.recorded_at < ? "
+            " ORDER BY b.recorded_at DESC LIMIT 1), "
+            "EXISTS (SELECT 1 FROM prices b WHERE b.product_id = p.id AND b.recorded_at < ?) "
+            "FROM prices h JOIN products p ON p.id = h.product_id "
+            "WHERE h.recorded_at >= ? GROUP BY p.id ORDER BY p.changed_at DESC",
+            (since, since, since),
+        )
+        results = []
+        for url, price, original_price, in_stock, changed_at, changes, before, existed in rows:
+            if price_only and existed and before == price:
+                continue
+            results.append({
+                'url': url,
+                'previous_price': before if existed else None,
+                'price': price,
+                'original_price': original_price,
+                'in_stock': None if in_stock is None else bool(in_stock),
+                'changed_at': changed_at,
+                'changes': changes,
+            })
+        return results
+
+    def export(self, url):
+        """Compact per-product history for the detail page, None for a product without changes"""
+        points = self.series(url)
+        if len(points) < 2:
+            return None
+        prices = [price for _, price, _, _ in points if price is not None]
+        return {
+            'points': [[recorded_at, price, original_price, None if in_stock is None else bool(in_stock)]
+                       for recorded_at, price, original_price, in_stock in points],
+            'lowest': min(prices) if prices else None,
+            'highest': max(prices) if prices else None,
+        }
+
+    def print_stats(self):
+        total = self.db.execute("SELECT COUNT(*) FROM prices").fetchone()[0]
+        runs = self.db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        print(f"Price history: {self.counts['products']} products, {self.counts['new']} new, "
+              f"{self.counts['changed']} changed, {self.counts['unchanged']} unchanged")
+        print(f"- {total} rows over {runs} runs in {self.path}")
+        if self.counts['duplicates']:
+            print(f"- Skipped {self.counts['duplicates']} duplicate product URLs")
+
+    def close(self):
+        self.db.close()
+
+
+def format_time(timestamp):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record and query the price history of scraped products')
+    parser.add_argument('--db', default=os.path.join(DATA_DIR, 'price_history.sqlite'), help='history database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    record = commands.add_parser('record', help="append a catalogue's changed prices")
+    record.add_argument('inputs', nargs='+', help='catalogue .json documents or scraped .jsonl files')
+    record.add_argument('--at', help="run time (default: the document's scraped_at, else now)")
+    series = commands.add_parser('series', help='price series of one product')
+    series.add_argument('url')
+    changed = commands.add_parser('changed', help='products changed since a time')
+    changed.add_argument('since', help="'YYYY-MM-DD[ HH:MM]' or epoch seconds")
+    changed.add_argument('--price-only', action='store_true', help='ignore stock-only changes')
+    args = parser.parse_args()
+
+    history = PriceHistory(args.db)
+    try:
+        if args.command == 'record':
+            for path in args.inputs:
+                products, meta = read_products(path)
+                at = parse_timestamp(args.at) if args.at else None
+                recorded_at = history.record(products, lambda: at or parse_timestamp(meta.get('scraped_at')))
+                print(f"✓ Recorded {path} at {format_time(recorded_at)}")
+            history.print_stats()
+        elif args.command == 'series':
+            points = history.series(args.url)
+            if not points:
+                raise SystemExit(f"No history for {args.url}")
+            for recorded_at, price, original_price, in_stock in points:
+                stock = '' if in_stock is None else ('in stock' if in_stock else 'out of stock')
+                was = f" (was {original_price:.2f})" if original_price else ''
+                print(f"{format_time(recorded_at)}  {price if price is not None else '-':>10}{was}  {stock}")
+        else:
+            since = int(args.since) if args.since.isdigit() else parse_timestamp(args.since)
+            if since is None:
+                raise SystemExit(f"Unrecognised time: {args.since}")
+            start = time.perf_counter()
+            results = history.changed_since(since, args.price_only)
+            for result in results:
+                before = '-' if result['previous_price'] is None else result['previous_price']
+                print(f"{format_time(result['changed_at'])}  {before} → {result['price']}  {result['url']}")
+            print(f"✓ {len(results)} products changed since {format_time(since)} "
+                  f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+    finally:
+        history.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Product Records
+Slotted, validated product records with interned categories, dict conversion and a columnar export for analytics
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+from array import array
+
+from postprocess import PRODUCT_SCHEMA, read_products, validate
+
+DATA_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+# The schema's fields, in its order
+FIELDS = tuple(PRODUCT_SCHEMA)
+
+# Exported by write_columns(); prices are float columns with NaN (null in JSON) for missing ones
+COLUMNS = ('url', 'name', 'category', 'price', 'original_price', 'in_stock')
+
+
+class Product:
+    """
+    One catalogue record. Fixed slots instead of a per-record dict;
+    categories and images are tuples and category names are interned, so a
+    catalogue holds each category string once. Keys outside the schema
+    (history, _extracted_by, ...) are kept in extra.
+    """
+
+    __slots__ = (*FIELDS, 'extra')
+
+    def __init__(self, url, name, price=None, original_price=None, category='', categories=(), images=(),
+                 description='', short_description='', in_stock=True, extra=None):
+        self.url = url
+        self.name = name
+        self.price = price
+        self.original_price = original_price
+        self.category = sys.intern(category)
+        self.categories = tuple(map(sys.intern, categories))
+        self.images = tuple(images)
+        self.description = description
+        self.short_description = short_description
+        self.in_stock = in_stock
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, product, check=True):
+        """A record from a product dict; with check, schema errors raise ValueError"""
+        if check:
+            errors = validate(product)
+            if errors:
+                raise ValueError(f"Invalid product {product.get('url')}: {', '.join(errors)}")
+        extra = {key: value for key, value in product.items() if key not in PRODUCT_SCHEMA}
+        get = product.get
+        return cls(product['url'], product['name'], get('price'), get('original_price'), get('category') or '',
+                   get('categories') or (), get('images') or (), get('description') or '',
+                   get('short_description') or '', get('in_stock', True), extra or None)
+
+    def to_dict(self):
+        """The product dict in schema field order, with lists for the frontend JSON"""
+        product = {
+            'url': self.url,
+            'name': self.name,
+            'price': self.price,
+            'original_price': self.original_price,
+            'category': self.category,
+            'categories': list(self.categories),
+            'images': list(self.images),
+            'description': self.description,
+            'short_description': self.short_description,
+            'in_stock': self.in_stock,
+        }
+        if self.extra:
+            product.update(self.extra)
+        return product
+
+    def __eq__(self, other):
+        if not isinstance(other, Product):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"Product(url={self.url!r}, name={self.name!r}, price={self.price!r})"
+
+
+def read_records(path, check=True):
+    """Products of a catalogue document or .jsonl file as Product records, plus the document's other keys"""
+    products, meta = read_products(path)
+    return (Product.from_dict(product, check) for product in products), meta
+
+
+def to_columns(records):
+    """
+    {column: values} of COLUMNS: lists for the strings, array('d') for the
+    prices (NaN when missing) and array('b') for in_stock
+    """
+    columns = {'url': [], 'name': [], 'category': [], 'price': array('d'), 'original_price': array('d'),
+               'in_stock': array('b')}
+    for record in records:
+        columns['url'].append(record.url)
+        columns['name'].append(record.name)
+        columns['category'].append(record.category)
+        columns['price'].append(math.nan if record.price is None else record.price)
+        columns['original_price'].append(math.nan if record.original_price is None else record.original_price)
+        columns['in_stock'].append(bool(record.in_stock))
+    return columns
+
+
+def write_columns(records, path):
+    """Write the columns as one JSON array per column; returns the number of rows"""
+    columns = to_columns(records)
+    document = {
+        'url': columns['url'],
+        'name': columns['name'],
+        'category': columns['category'],
+        'price': [None if math.isnan(price) else price for price in columns['price']],
+        'original_price': [None if math.isnan(price) else price for price in columns['original_price']],
+        'in_stock': [bool(value) for value in columns['in_stock']],
+        'rows': len(columns['url']),
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+    return document['rows']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export a catalogue as columns (name/price/in_stock arrays) for analytics')
+    parser.add_argument('input', nargs='?', default=os.path.join(DATA_DIR, 'nbs_supplements.json'),
+                        help='catalogue .json document or scraped .jsonl file')
+    parser.add_argument('-o', '--output', default=os.path.join(DATA_DIR, 'catalogue_columns.json'),
+                        help='columnar JSON to write')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    records, _ = read_records(args.input)
+    try:
+        rows = write_columns(records, args.output)
+    except ValueError as e:
+        raise SystemExit(f"✗ {e}")
+    print(f"✓ Wrote {rows} rows of {', '.join(COLUMNS)} to {args.output} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
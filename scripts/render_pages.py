@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Static Page Renderer
+Pre-renders one HTML page per product and paginated listing pages from data/catalog, rewriting only pages whose inputs changed
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from html import escape
+
+ROOT_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+CATALOG_DIR = os.path.join(ROOT_DIR, 'data', 'catalog')
+PAGES_DIR = os.path.join(ROOT_DIR, 'pages')
+MANIFEST_NAME = 'render-manifest.json'
+RELATED_COUNT = 4
+
+HEAD = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <meta name="description" content="{description}">
+    <link rel="preconnect" href="https://fonts.googleapis.com">
+    <link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>
+    <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;700;800;900&display=swap" rel="stylesheet">
+    <link rel="stylesheet" href="../css/supplements.css">
+</head>
+<body>
+"""
+
+FOOTER = """
+    <!-- Footer -->
+    <footer style="background: var(--card-bg); padding: 2rem; text-align: center; margin-top: 4rem; border-top: 1px solid rgba(108, 99, 255, 0.2);">
+        <p style="color: var(--text-secondary); margin-bottom: 1rem;">
+            <a href="supplements.html" style="color: var(--primary-color); text-decoration: none; margin: 0 1rem;">← Back to Supplements</a>
+            <a href="../index.html" style="color: var(--primary-color); text-decoration: none; margin: 0 1rem;">Home</a>
+        </p>
+        <p style="color: var(--text-secondary);">
+            © 2024 GRLLA Fitness. All rights reserved.
+        </p>
+    </footer>
+{scripts}</body>
+</html>
+"""
+
+CARD = """
+                <a class="product-card" href="{href}">
+                    <div class="product-image">{image}</div>
+                    <div class="product-info">
+                        <h3 class="product-name">{name}</h3>{summary}
+                        <div class="product-price">{price} <small>EGP</small></div>{stock}
+                        <span class="view-details-btn">View Details</span>
+                    </div>
+                </a>"""
+
+PRODUCT_BODY = """    <div class="product-detail-container" id="productDetailContainer">
+        <a href="supplements.html" class="back-link">← Back to Products</a>
+
+        <div class="product-detail">
+            <div class="product-detail-image">
+                {images}
+            </div>
+
+            <div class="product-detail-info">
+                <h1>{name}</h1>
+
+                <div class="product-detail-price">{price} <small>EGP</small></div>
+
+                {stock}
+
+                <div class="price-history" id="priceHistory" hidden></div>
+
+                <div class="product-detail-description">
+                    <h3>Description</h3>
+                    <p>{description}</p>
+                </div>
+
+                <button class="buy-now-btn" id="buyNowBtn">
+                    🛒 Buy Now
+                </button>
+            </div>
+        </div>
+{related}
+    </div>
+"""
+
+LISTING_BODY = """    <section class="supplements-hero">
+        <div>
+            <h1>💊 Supplements & Vitamins</h1>
+            <p>Premium quality supplements to fuel your fitness journey and support your health goals</p>
+        </div>
+    </section>
+
+    <div class="supplements-container">
+        <section class="products-section">
+            <div class="products-header">
+                <h2>Our Products</h2>
+                <a href="supplements.html" class="filter-modal-btn">🔍 Search &amp; Filter</a>
+            </div>
+            <p class="products-count">Page <strong>{page}</strong> of <strong>{pages}</strong> · <strong>{total}</strong> products</p>
+            <div class="products-grid">{cards}
+            </div>
+{pagination}
+        </section>
+    </div>
+"""
+
+# Any template change invalidates every page
+TEMPLATE_DIGEST = hashlib.sha1(''.join([HEAD, FOOTER, CARD, PRODUCT_BODY, LISTING_BODY]).encode('utf-8')).hexdigest()
+
+
+def product_page_name(slug):
+    return f"product-{slug}.html"
+
+
+def listing_page_name(page):
+    return f"shop-{page}.html"
+
+
+def site_path(path):
+    """Mirrored images are site-relative, hot-linked ones absolute (as sitePath() in supplements.js)"""
+    return path if path.startswith(('http://', 'https://')) else f"../{path}"
+
+
+def format_price(price):
+    return f"{price:.2f}" if isinstance(price, (int, float)) else '—'
+
+
+def stock_badge(in_stock):
+    if in_stock:
+        return '<span class="stock-badge in-stock">✓ In Stock</span>'
+    return '<span class="stock-badge out-of-stock">✗ Out of Stock</span>'
+
+
+def card_image(entry):
+    """The listing entry's image, with the mirrored AVIF/WebP variants when it has them"""
+    name = escape(entry['name'])
+    if not entry.get('thumbnail'):
+        return '<div class="product-image-placeholder">💊</div>'
+    img = f'<img src="{escape(site_path(entry["thumbnail"]))}" alt="{name}" loading="lazy">'
+    if not entry.get('srcset'):
+        return img
+    sources = ''.join(
+        f'<source type="image/{escape(image_format)}" '
+        f'srcset="{escape(", ".join(site_path(candidate) for candidate in srcset.split(", ")))}" '
+        f'sizes="(max-width: 600px) 50vw, 300px">'
+        for image_format, srcset in entry['srcset'].items()
+    )
+    return f'<picture>{sources}{img}</picture>'
+
+
+def render_card(entry, summary=True):
+    text = f'\n                        <p class="product-description">{escape(entry["summary"])}</p>' \
+        if summary and entry.get('summary') else ''
+    stock = f'\n                        {stock_badge(entry.get("in_stock", True))}' if summary else ''
+    return CARD.format(href=product_page_name(entry['id']), image=card_image(entry), name=escape(entry['name']),
+                       summary=text, price=format_price(entry.get('price')), stock=stock)
+
+
+def render_images(product):
+    name = escape(product['name'])
+    images = product.get('images') or []
+    if not images:
+        return '<div class="product-image-placeholder" style="font-size: 6rem;">💊</div>'
+    thumbnails = ''
+    if len(images) > 1:
+        thumbnails = '\n                    <div class="image-thumbnails-scroll">' + ''.join(
+            f'\n                        <img src="{escape(url)}" alt="{name} {index + 1}" '
+            f'class="thumbnail{" active" if index == 0 else ""}" data-index="{index}" loading="lazy">'
+            for index, url in enumerate(images)
+        ) + '\n                    </div>'
+    return f"""<div class="product-image-carousel">
+                    <div class="main-image">
+                        <img id="mainProductImage" src="{escape(images[0])}" alt="{name}">
+                    </div>{thumbnails}
+                </div>"""
+
+
+def render_product(product, related):
+    """The complete detail page; the record is embedded for Buy Now and the price history"""
+    related_html = ''
+    if related:
+        related_html = f"""
+        <div class="related-products-section">
+            <h2>You May Also Like</h2>
+            <div class="related-products-grid">{''.join(render_card(entry, summary=False) for entry in related)}
+            </div>
+        </div>"""
+    description = product.get('description') or product.get('short_description') or 'No description available.'
+    body = PRODUCT_BODY.format(
+        images=render_images(product), name=escape(product['name']), price=format_price(product.get('price')),
+        stock=stock_badge(product.get('in_stock', True)), description=escape(description), related=related_html,
+    )
+    # </script> inside a description must not end the data block
+    data = json.dumps(product, ensure_ascii=False, separators=(',', ':')).replace('<', '\\u003c')
+    scripts = (f'    <script type="application/json" id="productData">{data}</script>\n'
+               f'    <script src="../js/supplements.js"></script>\n')
+    summary = product.get('short_description') or description
+    return (HEAD.format(title=f"{escape(product['name'])} | Supplements", description=escape(summary[:160]))
+            + body + FOOTER.format(scripts=scripts))
+
+
+def render_pagination(page, pages):
+    if pages <= 1:
+        return ''
+    links = []
+    if page > 1:
+        links.append(f'<a class="page-btn" href="{listing_page_name(page - 1)}">← Prev</a>')
+    for number in range(1, pages + 1):
+        active = ' active' if number == page else ''
+        links.append(f'<a class="page-btn{active}" href="{listing_page_name(number)}">{number}</a>')
+    if page < pages:
+        links.append(f'<a class="page-btn" href="{listing_page_name(page + 1)}">Next →</a>')
+    return '            <div class="pagination">\n                ' + '\n                '.join(links) + '\n            </div>'
+
+
+def render_listing(entries, page, pages, total):
+    body = LISTING_BODY.format(page=page, pages=pages, total=total,
+                               cards=''.join(render_card(entry) for entry in entries),
+                               pagination=render_pagination(page, pages))
+    return (HEAD.format(title=f"Supplements & Vitamins – Page {page} | GRLLA",
+                        description='Browse our premium selection of vitamins and supplements')
+            + body + FOOTER.format(scripts=''))
+
+
+def digest(*parts):
+    sha = hashlib.sha1(TEMPLATE_DIGEST.encode('utf-8'))
+    for part in parts:
+        sha.update(b'\0' + (part if isinstance(part, bytes) else json.dumps(part, sort_keys=True).encode('utf-8')))
+    return sha.hexdigest()
+
+
+class PageRenderer:
+    def __init__(self, catalog_dir=CATALOG_DIR, output_dir=PAGES_DIR, per_page=24):
+        """
+        catalog_dir: build_data.py output; output_dir receives product-<id>.html,
+        shop-<n>.html and the render manifest
+        """
+        self.catalog_dir = catalog_dir
+        self.output_dir = output_dir
+        self.per_page = per_page
+        self.manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                self.previous = json.load(f).get('pages', {})
+        except FileNotFoundError:
+            self.previous = {}
+        self.pages = {}
+        self.counts = {'rendered': 0, 'unchanged': 0, 'removed': 0}
+
+    def related(self, entries):
+        """Up to RELATED_COUNT products sharing each product's main category, nearest in listing order first"""
+        by_category = {}
+        for position, entry in enumerate(entries):
+            by_category.setdefault(entry.get('category') or '', []).append(position)
+        related = {}
+        for positions in by_category.values():
+            for index, position in enumerate(positions):
+                window = positions[max(0, index - RELATED_COUNT):index] + positions[index + 1:index + RELATED_COUNT + 1]
+                nearby = sorted(window, key=lambda other: abs(other - position))[:RELATED_COUNT]
+                related[entries[position]['id']] = [entries[other] for other in nearby]
+        return related
+
+    def _write(self, name, html):
+        tmp_path = os.path.join(self.output_dir, f"{name}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, os.path.join(self.output_dir, name))
+
+    def _unchanged(self, name, key):
+        """True when the page on disk was rendered from the same inputs"""
+        return self.previous.get(name, {}).get('digest') == key and \
+            os.path.exists(os.path.join(self.output_dir, name))
+
+    def render_product_pages(self, entries):
+        related = self.related(entries)
+        for entry in entries:
+            name = product_page_name(entry['id'])
+            path = os.path.join(self.catalog_dir, 'products', f"{entry['id']}.json")
+            stat = os.stat(path)
+            stamp = [stat.st_mtime_ns, stat.st_size]
+            neighbours = related[entry['id']]
+            previous = self.previous.get(name, {})
+            # build_data.py only rewrites changed product files, so an unchanged stamp skips the read
+            if previous.get('stamp') == stamp and previous.get('related') == digest(neighbours) and \
+                    self._unchanged(name, previous.get('digest')):
+                self.pages[name] = previous
+                self.counts['unchanged'] += 1
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+            key = digest(data, neighbours)
+            if not self._unchanged(name, key):
+                self._write(name, render_product(json.loads(data), neighbours))
+                self.counts['rendered'] += 1
+            else:
+                self.counts['unchanged'] += 1
+            self.pages[name] = {'digest': key, 'stamp': stamp, 'related': digest(neighbours)}
+
+    def render_listing_pages(self, entries):
+        pages = max(1, -(-len(entries) // self.per_page))
+        for page in range(1, pages + 1):
+            name = listing_page_name(page)
+            chunk = entries[(page - 1) * self.per_page:page * self.per_page]
+            key = digest(chunk, page, pages, len(entries))
+            if self._unchanged(name, key):
+                self.counts['unchanged'] += 1
+            else:
+                self._write(name, render_listing(chunk, page, pages, len(entries)))
+                self.counts['rendered'] += 1
+            self.pages[name] = {'digest': key}
+
+    def render(self):
+        with open(os.path.join(self.catalog_dir, 'index.json'), 'r', encoding='utf-8') as f:
+            entries = json.load(f)['products']
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.render_product_pages(entries)
+        self.render_listing_pages(entries)
+        # Pages of products that are gone
+        for name in set(self.previous) - set(self.pages):
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+                self.counts['removed'] += 1
+            except FileNotFoundError:
+                pass
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'template': TEMPLATE_DIGEST, 'pages': self.pages}, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def print_stats(self):
+        print(f"✓ {len(self.pages)} pages in {self.output_dir}: {self.counts['rendered']} rendered, "
+              f"{self.counts['unchanged']} unchanged, {self.counts['removed']} removed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-render product and listing pages from data/catalog')
+    parser.add_argument('--catalog', default=CATALOG_DIR, help='build_data.py output directory')
+    parser.add_argument('--output', default=PAGES_DIR, help='directory for the rendered pages')
+    parser.add_argument('--per-page', type=int, default=24, help='products per listing page')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    renderer = PageRenderer(args.catalog, args.output, args.per_page)
+    renderer.render()
+    renderer.print_stats()
+    print(f"- {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
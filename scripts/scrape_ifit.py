@@ -4,32 +4,33 @@ iFit Egypt Best Sellers Scraper (English Version)
 Scrapes best seller supplements from ifit-eg.com with images
 """
 
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
+import argparse
 import re
-from urllib.parse import urljoin
+from crawl_engine import add_crawl_arguments, engine_from_args
+from html_parsing import add_parser_arguments
+from http_cache import add_cache_arguments, cache_from_args
+from incremental import IncrementalCrawl
+from sitemap import SitemapCrawl, add_sitemap_arguments
+from parse_pool import ParsePool
+from frontier import add_frontier_arguments, frontier_from_args
+from metrics import add_metrics_arguments, metrics_from_args
+from structured_data import EXTRACTED_BY, add_structured_arguments, jsonld_product
+from jsonl_store import add_stream_arguments, writer_from_args
+from store_scraper import StoreScraper
 
-class IFitScraper:
-    def __init__(self):
-        self.base_url = "https://ifit-eg.com"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept-Language': 'en-US,en;q=0.9'
-        }
-        self.products = []
-        self.categories = set()
-        
-    def get_page(self, url):
-        """Fetch a page with error handling"""
-        try:
-            response = requests.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-            return None
+class IFitScraper(StoreScraper):
+    source = 'iFit Egypt - Best Sellers (English)'
+    description_limit = 1000
+    short_description_limit = 200
+
+    def __init__(self, base_url=None, category_slug='best-sellers-sport-supplement',
+                 category_names=('Best Sellers', 'Sport Supplement'), **options):
+        # The categories the crawled category's products are filed under
+        self.category_names = list(category_names)
+        self.name = f"iFit Egypt {' & '.join(self.category_names) or category_slug}"
+        super().__init__(base_url or "https://ifit-eg.com", category_slug, **options)
+        # Products are filed under the crawled category, so it is part of the parse key
+        self.parse_key = f"{type(self).__name__}:{self.category_slug}:{'|'.join(self.category_names)}"
     
     def extract_price(self, price_text):
         """Extract numeric price from text"""
@@ -40,57 +41,68 @@ class IFitScraper:
         match = re.search(r'[\d.]+', price_text)
         return float(match.group()) if match else None
     
-    def scrape_product_details(self, product_url):
-        """Scrape detailed information from a product page"""
-        print(f"  Scraping: {product_url}")
-        soup = self.get_page(product_url)
-        if not soup:
-            return None
-        
+    def parse_options(self):
+        """The categories to file products under, for parse-pool workers"""
+        return (('category_names', tuple(self.category_names)),)
+    
+    def parse_product(self, product_url, soup):
+        """Extract the product fields from a parsed product page"""
         product = {
             'url': product_url,
             'name': '',
             'price': None,
             'original_price': None,
-            'category': 'Best Sellers',
-            'categories': ['Best Sellers', 'Sport Supplement'],
+            'category': self.category_names[0] if self.category_names else '',
+            'categories': list(self.category_names),
             'images': [],
             'description': '',
             'short_description': '',
             'in_stock': True
         }
         
+        # Structured data first; the DOM heuristics below only fill what it lacks
+        structured = jsonld_product(soup) or {}
+        product.update(structured)
+        product[EXTRACTED_BY] = 'json_ld' if structured else 'dom'
+        
         # Extract product name
-        title_elem = soup.find('h1', class_='product_title')
-        if not title_elem:
-            title_elem = soup.find('h1')
-        if title_elem:
-            product['name'] = title_elem.get_text(strip=True)
+        if not product['name']:
+            title_elem = soup.find('h1', class_='product_title')
+            if not title_elem:
+                title_elem = soup.find('h1')
+            if title_elem:
+                product['name'] = title_elem.get_text(strip=True)
         
         # Extract price
-        price_elem = soup.find('p', class_='price')
-        if not price_elem:
-            price_elem = soup.find('span', class_='woocommerce-Price-amount')
-        
-        if price_elem:
-            # Check for sale price
-            sale_price = price_elem.find('ins')
-            regular_price = price_elem.find('del')
+        if product['price'] is None:
+            price_elem = soup.find('p', class_='price')
+            if not price_elem:
+                price_elem = soup.find('span', class_='woocommerce-Price-amount')
             
-            if sale_price:
-                product['price'] = self.extract_price(sale_price.get_text())
-                if regular_price:
-                    product['original_price'] = self.extract_price(regular_price.get_text())
-            else:
-                # Try to find any price
-                price_spans = price_elem.find_all('span', class_='woocommerce-Price-amount')
-                if price_spans:
-                    product['price'] = self.extract_price(price_spans[-1].get_text())
+            if price_elem:
+                # Check for sale price
+                sale_price = price_elem.find('ins')
+                regular_price = price_elem.find('del')
+                
+                if sale_price:
+                    product['price'] = self.extract_price(sale_price.get_text())
+                    if regular_price:
+                        product['original_price'] = self.extract_price(regular_price.get_text())
                 else:
-                    product['price'] = self.extract_price(price_elem.get_text())
-        
-        # Extract images - multiple methods
-        images_found = []
+                    # Try to find any price
+                    price_spans = price_elem.find_all('span', class_='woocommerce-Price-amount')
+                    if price_spans:
+                        product['price'] = self.extract_price(price_spans[-1].get_text())
+                    else:
+                        product['price'] = self.extract_price(price_elem.get_text())
+        elif product['original_price'] is None:
+            # JSON-LD carries the price paid; a sale's regular price is only on the page
+            price_elem = soup.find('p', class_='price')
+            if price_elem and price_elem.find('ins') and price_elem.find('del'):
+                product['original_price'] = self.extract_price(price_elem.find('del').get_text())
+        
+        # Extract images - JSON-LD names the main image, the gallery has the rest
+        images_found = list(product['images'])
         
         # Method 1: Product gallery
         gallery = soup.find('div', class_='woocommerce-product-gallery')
@@ -101,19 +113,20 @@ class IFitScraper:
                 if img_url and img_url.startswith('http'):
                     images_found.append(img_url)
         
-        # Method 2: Featured image
-        featured_img = soup.find('img', class_='wp-post-image')
-        if featured_img:
-            img_url = featured_img.get('src') or featured_img.get('data-src')
-            if img_url and img_url.startswith('http'):
-                images_found.append(img_url)
-        
-        # Method 3: Any product images
-        product_images = soup.find_all('img', class_='attachment-shop_single')
-        for img in product_images:
-            img_url = img.get('src') or img.get('data-src')
-            if img_url and img_url.startswith('http'):
-                images_found.append(img_url)
+        if not images_found:
+            # Method 2: Featured image
+            featured_img = soup.find('img', class_='wp-post-image')
+            if featured_img:
+                img_url = featured_img.get('src') or featured_img.get('data-src')
+                if img_url and img_url.startswith('http'):
+                    images_found.append(img_url)
+            
+            # Method 3: Any product images
+            product_images = soup.find_all('img', class_='attachment-shop_single')
+            for img in product_images:
+                img_url = img.get('src') or img.get('data-src')
+                if img_url and img_url.startswith('http'):
+                    images_found.append(img_url)
         
         # Remove duplicates and add to product
         product['images'] = list(dict.fromkeys(images_found))
@@ -137,116 +150,63 @@ class IFitScraper:
             product['description'] = product['short_description']
         
         # Check stock status
-        stock_elem = soup.find('p', class_='stock')
-        if stock_elem:
-            stock_text = stock_elem.get_text().lower()
-            if 'out of stock' in stock_text or 'نفذ من المخزون' in stock_text:
-                product['in_stock'] = False
+        if 'in_stock' not in structured:
+            stock_elem = soup.find('p', class_='stock')
+            if stock_elem:
+                stock_text = stock_elem.get_text().lower()
+                if 'out of stock' in stock_text or 'نفذ من المخزون' in stock_text:
+                    product['in_stock'] = False
         
         return product
     
-    def scrape_category_page(self, page_num=1):
-        """Scrape products from category page"""
-        if page_num == 1:
-            url = "https://ifit-eg.com/product-category/best-sellers-sport-supplement/"
-        else:
-            url = f"https://ifit-eg.com/product-category/best-sellers-sport-supplement/page/{page_num}/"
-        
-        print(f"\n{'='*60}")
-        print(f"Scraping page {page_num}: {url}")
-        print('='*60)
-        
-        soup = self.get_page(url)
-        if not soup:
-            return False
-        
-        # Find all product links
-        products_found = 0
-        
-        # Try different selectors for product items
-        product_items = soup.find_all('li', class_='product')
-        if not product_items:
-            product_items = soup.find_all('div', class_='product')
-        
-        print(f"Found {len(product_items)} product items on page")
-        
-        for item in product_items:
-            # Find product link
-            link_elem = item.find('a', class_='woocommerce-LoopProduct-link')
-            if not link_elem:
-                link_elem = item.find('a', href=True)
-            
-            if link_elem:
-                product_url = link_elem.get('href')
-                
-                # Scrape product details
-                product_data = self.scrape_product_details(product_url)
-                
-                if product_data and product_data['name']:
-                    self.products.append(product_data)
-                    products_found += 1
-                    print(f"  ✓ Added: {product_data['name']} ({len(product_data['images'])} images)")
-                else:
-                    print(f"  ✗ Skipped: Could not extract product data")
-                
-                # Be nice to the server
-                time.sleep(1)
-        
-        print(f"\nPage {page_num} complete: {products_found} products added")
-        
-        # Check if there's a next page
-        next_page = soup.find('a', class_='next')
-        return next_page is not None
-    
-    def scrape_all(self, max_pages=10):
-        """Scrape all products from multiple pages"""
-        print("\n" + "="*60)
-        print("Starting iFit Egypt Best Sellers Scraper (English)")
-        print("="*60)
-        
-        page = 1
-        while page <= max_pages:
-            has_next = self.scrape_category_page(page)
-            if not has_next:
-                print(f"\nNo more pages found after page {page}")
-                break
-            page += 1
-            if page <= max_pages:
-                time.sleep(2)  # Be respectful to the server
-        
-        print("\n" + "="*60)
-        print("Scraping Complete!")
-        print("="*60)
-        print(f"Total products scraped: {len(self.products)}")
-        print(f"Products with images: {sum(1 for p in self.products if p['images'])}")
-        print(f"Average images per product: {sum(len(p['images']) for p in self.products) / len(self.products) if self.products else 0:.1f}")
-        
-        return self.products
+    def store_categories(self, fields):
+        """Store API products are filed under the crawled category"""
+        return list(self.category_names)
     
     def save_to_json(self, filename='ifit_supplements.json'):
         """Save scraped data to JSON file"""
-        data = {
-            'products': self.products,
-            'categories': sorted(list(self.categories)),
-            'total_products': len(self.products),
-            'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S'),
-            'source': 'iFit Egypt - Best Sellers (English)'
-        }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        print(f"\n✓ Data saved to {filename}")
-        return filename
+        return super().save_to_json(filename)
 
 def main():
-    scraper = IFitScraper()
+    parser = argparse.ArgumentParser(description='Scrape best seller supplements from ifit-eg.com')
+    parser.add_argument('--max-pages', type=int, default=10)
+    parser.add_argument('--incremental', action='store_true',
+                        help='only re-scrape products that are new or whose listing price/stock changed')
+    add_crawl_arguments(parser)
+    add_parser_arguments(parser)
+    add_cache_arguments(parser)
+    add_stream_arguments(parser, 'ifit_supplements.jsonl')
+    add_structured_arguments(parser)
+    add_metrics_arguments(parser)
+    add_sitemap_arguments(parser)
+    add_frontier_arguments(parser, 'ifit_frontier.sqlite')
+    args = parser.parse_args()
+    
+    parse_pool = ParsePool(args.parse_workers) if args.parse_workers else None
+    incremental = IncrementalCrawl('ifit_supplements.json') if args.incremental else None
+    sitemap = SitemapCrawl('ifit_supplements.json') if args.sitemap else None
+    
+    metrics = metrics_from_args(args)
+    engine = engine_from_args(args, metrics)
+    scraper = IFitScraper(cache=cache_from_args(args), offline=args.offline,
+                          incremental=incremental, parser=args.parser,
+                          scoped=not args.full_parse, parse_pool=parse_pool,
+                          writer=writer_from_args(args), frontier=frontier_from_args(args),
+                          store_api=not args.no_store_api,
+                          metrics=metrics, sitemap=sitemap, engine=engine)
     
     # Scrape all pages
-    scraper.scrape_all(max_pages=10)
+    try:
+        scraper.scrape_all(max_pages=args.max_pages)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        engine.shutdown()
     
     # Save to JSON
-    scraper.save_to_json('ifit_supplements.json')
+    with scraper.metrics.stage('save'):
+        scraper.save_to_json('ifit_supplements.json')
+    scraper.metrics.finish(args.metrics, 'ifit')
     
     # Print summary
     print("\n" + "="*60)
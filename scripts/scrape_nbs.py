@@ -4,32 +4,62 @@ NBS Supplements Scraper
 Scrapes vitamins and supplements products from nbs-supplements.com
 """
 
-import requests
-from bs4 import BeautifulSoup
-import json
-import time
+import argparse
 import re
-from urllib.parse import urljoin
+from crawl_engine import add_crawl_arguments, engine_from_args
+from html_parsing import add_parser_arguments
+from http_cache import add_cache_arguments, cache_from_args
+from incremental import IncrementalCrawl
+from sitemap import SitemapCrawl, add_sitemap_arguments
+from parse_pool import ParsePool
+from frontier import add_frontier_arguments, frontier_from_args
+from metrics import add_metrics_arguments, metrics_from_args
+from structured_data import EXTRACTED_BY, add_structured_arguments, jsonld_product
+from jsonl_store import add_stream_arguments, writer_from_args
+from store_scraper import StoreScraper
 
-class NBSScraper:
-    def __init__(self):
-        self.base_url = "https://www.nbs-supplements.com"
-        self.headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        self.products = []
-        self.categories = set()
+# Keywords that indicate vitamins/supplements
+SUPPLEMENT_KEYWORDS = (
+    'vitamin', 'supplement', 'mineral', 'protein', 'amino', 'bcaa',
+    'creatine', 'collagen', 'omega', 'fish oil', 'multivitamin',
+    'probiotic', 'enzyme', 'antioxidant', 'ginseng', 'extract',
+    'complex', 'support', 'health', 'wellness', 'nutrition',
+    'capsule', 'tablet', 'powder', 'gummies'
+)
+
+
+def keyword_pattern(keywords):
+    """One case-insensitive regex matching any of the keywords, None to match everything"""
+    if keywords is None:
+        return None
+    return re.compile('|'.join(re.escape(keyword) for keyword in keywords), re.IGNORECASE)
+
+
+def card_text(item, link_elem):
+    """A listing card's title plus its product_cat-* classes as words, e.g. 'sport supplement'"""
+    title = item.find(class_='woocommerce-loop-product__title') or link_elem
+    categories = [name[len('product_cat-'):].replace('-', ' ')
+                  for name in item.get('class') or [] if name.startswith('product_cat-')]
+    return ' '.join([title.get_text(' ', strip=True), *categories])
+
+
+class NBSScraper(StoreScraper):
+    name = 'NBS Supplements'
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+    }
+
+    def __init__(self, base_url=None, category_slug=None, keywords=SUPPLEMENT_KEYWORDS, **options):
+        # None crawls the whole shop; keywords=None keeps every product
+        self.keywords = keywords
+        self.keyword_pattern = keyword_pattern(keywords)
+        # A category listing whose own slug is a supplement category needs no per-card check
+        self.listing_matches = self.keyword_pattern is None or bool(
+            category_slug and self.keyword_pattern.search(category_slug.replace('-', ' ')))
+        self.cards_seen = 0
+        self.cards_prefiltered = 0
+        super().__init__(base_url or "https://www.nbs-supplements.com", category_slug, **options)
         
-    def get_page(self, url):
-        """Fetch a page with error handling"""
-        try:
-            response = requests.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
-            return None
-    
     def extract_price(self, price_text):
         """Extract numeric price from text"""
         if not price_text:
@@ -38,13 +68,8 @@ class NBSScraper:
         match = re.search(r'[\d,]+\.?\d*', price_text.replace(',', ''))
         return float(match.group()) if match else None
     
-    def scrape_product_details(self, product_url):
-        """Scrape detailed information from a product page"""
-        print(f"Scraping product: {product_url}")
-        soup = self.get_page(product_url)
-        if not soup:
-            return None
-        
+    def parse_product(self, product_url, soup):
+        """Extract the product fields from a parsed product page"""
         product = {
             'url': product_url,
             'name': '',
@@ -58,26 +83,40 @@ class NBSScraper:
             'in_stock': True
         }
         
+        # Structured data first; the DOM heuristics below only fill what it lacks
+        structured = jsonld_product(soup) or {}
+        product.update(structured)
+        product[EXTRACTED_BY] = 'json_ld' if structured else 'dom'
+        
         # Extract product name
-        title_elem = soup.find('h1', class_='product_title')
-        if title_elem:
-            product['name'] = title_elem.get_text(strip=True)
+        if not product['name']:
+            title_elem = soup.find('h1', class_='product_title')
+            if title_elem:
+                product['name'] = title_elem.get_text(strip=True)
         
         # Extract price
-        price_elem = soup.find('p', class_='price')
-        if price_elem:
-            # Check for sale price
-            sale_price = price_elem.find('ins')
-            regular_price = price_elem.find('del') or price_elem.find('bdi')
-            
-            if sale_price:
-                product['price'] = self.extract_price(sale_price.get_text())
+        if product['price'] is None:
+            price_elem = soup.find('p', class_='price')
+            if price_elem:
+                # Check for sale price
+                sale_price = price_elem.find('ins')
+                regular_price = price_elem.find('del') or price_elem.find('bdi')
+                
+                if sale_price:
+                    product['price'] = self.extract_price(sale_price.get_text())
+                    if regular_price:
+                        product['original_price'] = self.extract_price(regular_price.get_text())
+                elif regular_price:
+                    product['price'] = self.extract_price(regular_price.get_text())
+                else:
+                    product['price'] = self.extract_price(price_elem.get_text())
+        elif product['original_price'] is None:
+            # JSON-LD carries the price paid; a sale's regular price is only on the page
+            price_elem = soup.find('p', class_='price')
+            if price_elem and price_elem.find('ins'):
+                regular_price = price_elem.find('del') or price_elem.find('bdi')
                 if regular_price:
                     product['original_price'] = self.extract_price(regular_price.get_text())
-            elif regular_price:
-                product['price'] = self.extract_price(regular_price.get_text())
-            else:
-                product['price'] = self.extract_price(price_elem.get_text())
         
         # Extract images
         image_gallery = soup.find('div', class_='woocommerce-product-gallery')
@@ -96,7 +135,6 @@ class NBSScraper:
                 cat_name = link.get_text(strip=True)
                 if cat_name and cat_name.lower() not in ['home', 'shop']:
                     product['categories'].append(cat_name)
-                    self.categories.add(cat_name)
         
         # Set main category
         if product['categories']:
@@ -112,110 +150,83 @@ class NBSScraper:
             product['description'] = full_desc.get_text(strip=True)
         
         # Check stock status
-        stock_elem = soup.find('p', class_='stock')
-        if stock_elem and 'out of stock' in stock_elem.get_text().lower():
-            product['in_stock'] = False
+        if 'in_stock' not in structured:
+            stock_elem = soup.find('p', class_='stock')
+            if stock_elem and 'out of stock' in stock_elem.get_text().lower():
+                product['in_stock'] = False
         
         return product
     
-    def scrape_shop_page(self, page_num=1):
-        """Scrape products from shop listing page"""
-        url = f"{self.base_url}/shop/page/{page_num}/" if page_num > 1 else f"{self.base_url}/shop/"
-        print(f"\nScraping shop page {page_num}: {url}")
-        
-        soup = self.get_page(url)
-        if not soup:
-            return False
-        
-        # Find all product links
-        products_found = 0
-        product_items = soup.find_all('li', class_='product')
-        
-        for item in product_items:
-            link_elem = item.find('a', class_='woocommerce-LoopProduct-link')
-            if link_elem:
-                product_url = link_elem.get('href')
-                
-                # Check if it's a vitamin/supplement by looking at the product
-                product_data = self.scrape_product_details(product_url)
-                if product_data:
-                    # Filter for vitamins and supplements
-                    name_lower = product_data['name'].lower()
-                    categories_lower = ' '.join(product_data['categories']).lower()
-                    
-                    # Keywords that indicate vitamins/supplements
-                    supplement_keywords = [
-                        'vitamin', 'supplement', 'mineral', 'protein', 'amino', 'bcaa',
-                        'creatine', 'collagen', 'omega', 'fish oil', 'multivitamin',
-                        'probiotic', 'enzyme', 'antioxidant', 'ginseng', 'extract',
-                        'complex', 'support', 'health', 'wellness', 'nutrition',
-                        'capsule', 'tablet', 'powder', 'gummies'
-                    ]
-                    
-                    is_supplement = any(keyword in name_lower or keyword in categories_lower 
-                                       for keyword in supplement_keywords)
-                    
-                    if is_supplement:
-                        self.products.append(product_data)
-                        products_found += 1
-                        print(f"  ✓ Added: {product_data['name']}")
-                    else:
-                        print(f"  ✗ Skipped (not supplement): {product_data['name']}")
-                
-                # Be nice to the server
-                time.sleep(0.5)
-        
-        print(f"Found {products_found} supplements on page {page_num}")
-        
-        # Check if there's a next page
-        next_page = soup.find('a', class_='next')
-        return next_page is not None
+    def store_categories(self, fields):
+        """The Store API categories, without the breadcrumb roots"""
+        return [name for name in fields['categories'] if name.lower() not in ['home', 'shop']]
     
-    def scrape_all(self, max_pages=10):
-        """Scrape all products from multiple pages"""
-        print("Starting NBS Supplements scraper...")
-        print("=" * 60)
-        
-        page = 1
-        while page <= max_pages:
-            has_next = self.scrape_shop_page(page)
-            if not has_next:
-                print(f"\nReached last page at page {page}")
-                break
-            page += 1
-            time.sleep(1)  # Be respectful to the server
-        
-        print("\n" + "=" * 60)
-        print(f"Scraping complete!")
-        print(f"Total products scraped: {len(self.products)}")
-        print(f"Categories found: {len(self.categories)}")
-        print(f"Categories: {', '.join(sorted(self.categories))}")
-        
-        return self.products
+    def keep_card(self, item, link_elem):
+        """Classify on the card so non-supplements never cost a detail fetch"""
+        self.cards_seen += 1
+        if self.listing_matches or self.keyword_pattern.search(card_text(item, link_elem)):
+            return True
+        self.cards_prefiltered += 1
+        self.metrics.inc('detail_fetches_avoided')
+        return False
+    
+    def keep_product(self, product):
+        """Keep vitamins and supplements"""
+        # The listing pre-filter already dropped most others,
+        # Store API pages and listings recorded by an older frontier are only checked here
+        return self.keyword_pattern is None or bool(
+            self.keyword_pattern.search(' '.join([product['name'], *product['categories']])))
+    
+    def print_stats(self):
+        super().print_stats()
+        if self.cards_prefiltered:
+            print(f"Listing pre-filter: skipped {self.cards_prefiltered} of {self.cards_seen} cards as "
+                  f"non-supplements ({self.cards_prefiltered} detail fetches avoided)")
     
     def save_to_json(self, filename='nbs_supplements.json'):
         """Save scraped data to JSON file"""
-        data = {
-            'products': self.products,
-            'categories': sorted(list(self.categories)),
-            'total_products': len(self.products),
-            'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        print(f"\n✓ Data saved to {filename}")
-        return filename
+        return super().save_to_json(filename)
 
 def main():
-    scraper = NBSScraper()
+    parser = argparse.ArgumentParser(description='Scrape vitamins and supplements from nbs-supplements.com')
+    parser.add_argument('--max-pages', type=int, default=5)
+    parser.add_argument('--incremental', action='store_true',
+                        help='only re-scrape products that are new or whose listing price/stock changed')
+    add_crawl_arguments(parser)
+    add_parser_arguments(parser)
+    add_cache_arguments(parser)
+    add_stream_arguments(parser, 'nbs_supplements.jsonl')
+    add_structured_arguments(parser)
+    add_metrics_arguments(parser)
+    add_sitemap_arguments(parser)
+    add_frontier_arguments(parser, 'nbs_frontier.sqlite')
+    args = parser.parse_args()
+    
+    parse_pool = ParsePool(args.parse_workers) if args.parse_workers else None
+    incremental = IncrementalCrawl('nbs_supplements.json') if args.incremental else None
+    sitemap = SitemapCrawl('nbs_supplements.json') if args.sitemap else None
+    
+    metrics = metrics_from_args(args)
+    engine = engine_from_args(args, metrics)
+    scraper = NBSScraper(cache=cache_from_args(args), offline=args.offline,
+                         incremental=incremental, parser=args.parser,
+                         scoped=not args.full_parse, parse_pool=parse_pool,
+                         writer=writer_from_args(args), frontier=frontier_from_args(args),
+                         store_api=not args.no_store_api,
+                         metrics=metrics, sitemap=sitemap, engine=engine)
     
     # Scrape products (limit to 5 pages for now, adjust as needed)
-    scraper.scrape_all(max_pages=5)
+    try:
+        scraper.scrape_all(max_pages=args.max_pages)
+    finally:
+        if parse_pool is not None:
+            parse_pool.shutdown()
+        engine.shutdown()
     
     # Save to JSON
-    scraper.save_to_json('nbs_supplements.json')
+    with scraper.metrics.stage('save'):
+        scraper.save_to_json('nbs_supplements.json')
+    scraper.metrics.finish(args.metrics, 'nbs')
 
 if __name__ == '__main__':
     main()
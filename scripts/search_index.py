@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Client-Side Search Index
+Builds the inverted index (normalised tokens, prefix and trigram postings) the supplements page searches
+"""
+
+import bisect
+import re
+import unicodedata
+
+# Letters and digits; underscores and punctuation separate tokens
+TOKEN = re.compile(r'[^\W_]+')
+
+# Arabic spellings that shoppers type interchangeably, after marks are stripped
+ARABIC_FOLD = str.maketrans({
+    'ى': 'ي',
+    'ة': 'ه',
+    'ٱ': 'ا',
+    'ـ': None,
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06F0 + digit): str(digit) for digit in range(10)},
+})
+
+
+def normalise(text, arabic=True):
+    """
+    Lower-case text without diacritics. NFKD splits accented letters and
+    hamza/madda forms (أ إ آ ؤ ئ) into a base letter plus a mark, and the
+    marks (including Arabic tashkeel) are dropped. With arabic, ى ة ٱ,
+    tatweel and Arabic-Indic digits are folded too. js/supplements.js
+    mirrors this exactly.
+    """
+    text = text or ''
+    if text.isascii():
+        # Nothing to decompose or fold
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(char for char in text if unicodedata.category(char) != 'Mn').lower()
+    if arabic:
+        text = text.translate(ARABIC_FOLD)
+    return text
+
+
+def tokenize(text, arabic=True):
+    return TOKEN.findall(normalise(text, arabic))
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def delta_encode(numbers):
+    previous = 0
+    encoded = []
+    for number in numbers:
+        encoded.append(number - previous)
+        previous = number
+    return encoded
+
+
+def delta_decode(encoded):
+    total = 0
+    numbers = []
+    for delta in encoded:
+        total += delta
+        numbers.append(total)
+    return numbers
+
+
+class SearchIndexBuilder:
+    def __init__(self, arabic=True):
+        self.arabic = arabic
+        self.postings = {}
+        self.doc_count = 0
+
+    def add(self, doc_id, *texts):
+        """Index the texts of one document; doc_id is its position in the listing index"""
+        for text in texts:
+            for token in tokenize(text, self.arabic):
+                docs = self.postings.setdefault(token, [])
+                if not docs or docs[-1] != doc_id:
+                    docs.append(doc_id)
+        self.doc_count = max(self.doc_count, doc_id + 1)
+
+    def to_json(self):
+        """
+        {tokens: sorted tokens, postings: delta-encoded doc ids per token,
+        trigrams: {trigram: delta-encoded token positions}}. Prefix search is
+        a binary search over tokens; substring search intersects trigrams.
+        """
+        tokens = sorted(self.postings)
+        grams = {}
+        for position, token in enumerate(tokens):
+            for gram in trigrams(token):
+                grams.setdefault(gram, []).append(position)
+        return {
+            'version': 1,
+            'arabic': self.arabic,
+            'doc_count': self.doc_count,
+            'tokens': tokens,
+            'postings': [delta_encode(self.postings[token]) for token in tokens],
+            'trigrams': {gram: delta_encode(positions) for gram, positions in sorted(grams.items())},
+        }
+
+
+class SearchIndex:
+    """Query side of the index, the same algorithm as searchIndexLookup in js/supplements.js"""
+
+    def __init__(self, data):
+        self.arabic = data['arabic']
+        self.tokens = data['tokens']
+        self.postings = [delta_decode(docs) for docs in data['postings']]
+        self.trigrams = {gram: delta_decode(positions) for gram, positions in data['trigrams'].items()}
+
+    def matching_tokens(self, term):
+        """Positions of indexed tokens that start with a short term or contain a longer one"""
+        if len(term) < 3:
+            start = bisect.bisect_left(self.tokens, term)
+            end = start
+            while end < len(self.tokens) and self.tokens[end].startswith(term):
+                end += 1
+            return range(start, end)
+        candidates = None
+        for gram in trigrams(term):
+            positions = self.trigrams.get(gram)
+            if positions is None:
+                return []
+            candidates = set(positions) if candidates is None else candidates.intersection(positions)
+        return [position for position in candidates if term in self.tokens[position]]
+
+    def search(self, query):
+        """Doc ids matching every term of the query, or None for an empty query"""
+        matches = None
+        for term in tokenize(query, self.arabic):
+            docs = set()
+            for position in self.matching_tokens(term):
+                docs.update(self.postings[position])
+            matches = docs if matches is None else matches & docs
+            if not matches:
+                return set()
+        return matches
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Sitemap Discovery
+Finds changed products from the shop's XML sitemaps (lastmod) instead of paging through every listing
+"""
+
+from datetime import datetime
+from urllib.parse import urlsplit
+from xml.etree.ElementTree import ParseError, XMLPullParser
+
+from incremental import IncrementalCrawl
+from merge import canonical_url
+from price_history import parse_timestamp
+
+# Yoast publishes sitemap_index.xml, WordPress core wp-sitemap.xml
+INDEX_PATHS = ('sitemap_index.xml', 'wp-sitemap.xml')
+CHUNK_SIZE = 1 << 16
+
+
+def local_name(tag):
+    """'loc' for '{http://www.sitemaps.org/schemas/sitemap/0.9}loc'"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_lastmod(value):
+    """Epoch seconds of a W3C datetime ('2025-12-24', '2025-12-24T19:14:35+00:00'), None when missing"""
+    if not value:
+        return None
+    try:
+        return int(datetime.fromisoformat(value.strip().replace('Z', '+00:00')).timestamp())
+    except ValueError:
+        return None
+
+
+def sitemap_entries(chunks):
+    """
+    Stream (loc, lastmod) pairs out of a sitemap index or urlset body given
+    as an iterable of byte chunks (e.g. HttpClient.stream()). Each chunk is
+    parsed as it arrives and each entry is detached from its parent once
+    read, so neither the body nor the tree of a 50,000-URL sitemap is ever
+    held whole. Raises ParseError on a malformed or empty body.
+    """
+    parser = XMLPullParser(events=('start', 'end'))
+    parents = []
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _read_entries(parser, parents)
+    parser.close()
+    yield from _read_entries(parser, parents)
+
+
+def _read_entries(parser, parents):
+    for event, element in parser.read_events():
+        if event == 'start':
+            parents.append(element)
+            continue
+        parents.pop()
+        if local_name(element.tag) not in ('url', 'sitemap'):
+            continue
+        loc = lastmod = None
+        for child in element:
+            name = local_name(child.tag)
+            if name == 'loc':
+                loc = (child.text or '').strip()
+            elif name == 'lastmod':
+                lastmod = parse_lastmod(child.text)
+        if parents:
+            parents[-1].remove(element)
+        if loc:
+            yield loc, lastmod
+
+
+def is_product_sitemap(url):
+    name = urlsplit(url).path.rsplit('/', 1)[-1]
+    return name.startswith('product-sitemap') or name.startswith('wp-sitemap-posts-product-')
+
+
+def is_category_sitemap(url):
+    name = urlsplit(url).path.rsplit('/', 1)[-1]
+    return name.startswith('product_cat-sitemap') or name.startswith('wp-sitemap-taxonomies-product_cat-')
+
+
+def category_slug_of(url):
+    """'fish-oil-omegas' for .../product-category/supplements/fish-oil-omegas/"""
+    segments = [segment for segment in urlsplit(url).path.split('/') if segment]
+    return segments[-1] if 'product-category' in segments[:-1] else None
+
+
+class SitemapDiscovery:
+    def __init__(self, http, base_url):
+        """http: the scraper's HttpClient, so throttling, retries and the conditional cache apply"""
+        self.http = http
+        self.base_url = base_url.rstrip('/')
+        self.products = {}
+        self.categories = {}
+        self.counts = {'fetches': 0, 'bytes': 0, 'sitemaps': 0}
+
+    def entries(self, url):
+        """(loc, lastmod) pairs of one sitemap, parsed while its body downloads"""
+        self.counts['fetches'] += 1
+        yield from sitemap_entries(self._counted(self.http.stream(url, CHUNK_SIZE)))
+
+    def _counted(self, chunks):
+        for chunk in chunks:
+            self.counts['bytes'] += len(chunk)
+            yield chunk
+
+    def scan(self):
+        """
+        Read the sitemap index and its product and product-category children into
+        self.products {canonical url: (url, lastmod)} and self.categories
+        {slug: lastmod}. False when the shop publishes no usable sitemap, or
+        when a product sitemap cannot be read: its products would otherwise
+        look delisted.
+        """
+        for path in INDEX_PATHS:
+            try:
+                # A missing index has an empty body, which does not parse either
+                children = [loc for loc, _ in self.entries(f"{self.base_url}/{path}")]
+            except ParseError:
+                continue
+            product_maps = [url for url in children if is_product_sitemap(url)]
+            if not product_maps:
+                continue
+            unread = [url for url in product_maps if not self._read_child(url, self._add_product)]
+            if unread:
+                print(f"Sitemap: {len(unread)} of {len(product_maps)} product sitemaps unreadable")
+                return False
+            # An unread category sitemap only costs the listing pages of that category
+            for url in filter(is_category_sitemap, children):
+                self._read_child(url, self._add_category)
+            return True
+        return False
+
+    def _read_child(self, url, add):
+        """Add the entries of one child sitemap, False when it cannot be read"""
+        try:
+            for loc, lastmod in self.entries(url):
+                add(loc, lastmod)
+        except ParseError as e:
+            print(f"Sitemap: cannot read {url}: {e}")
+            return False
+        self.counts['sitemaps'] += 1
+        return True
+
+    def _add_product(self, url, lastmod):
+        if '/product/' in url:
+            self.products[canonical_url(url)] = (url, lastmod)
+
+    def _add_category(self, url, lastmod):
+        slug = category_slug_of(url)
+        if slug:
+            self.categories[slug] = lastmod
+
+
+class SitemapCrawl(IncrementalCrawl):
+    mode = 'Sitemap mode'
+
+    def __init__(self, existing_file, category=None):
+        """
+        The previous dataset is the baseline: a product is fetched again only
+        when its sitemap lastmod is newer than the dataset's scraped_at
+        """
+        super().__init__(existing_file, category)
+        self.since = parse_timestamp(self.scraped_at)
+        self.discovery = None
+        self.listing_pages = 0
+        self.counts.update({'excluded': 0, 'removed': 0})
+
+    def plan(self, scraper, max_pages=10):
+        """
+        (urls to fetch, baseline products carried over) for a scraper, or None
+        when the shop has no sitemap and the listings have to be crawled.
+        Membership of a category is taken from the baseline while the
+        category's own lastmod is older than the baseline, and read from its
+        listing pages (cards only, no detail fetches) otherwise.
+        """
+        self.discovery = SitemapDiscovery(scraper.http, scraper.base_url)
+        if not self.discovery.scan():
+            print(f"Sitemap: no usable sitemap at {scraper.base_url}, crawling the listings")
+            return None
+        published = self.discovery.products
+        baseline = {canonical_url(url): product for url, product in self.existing.items()}
+
+        slug = getattr(scraper, 'category_slug', None)
+        category_lastmod = self.discovery.categories.get(slug) if slug else None
+        listed = {}
+        if slug is None:
+            members = set(published)
+        elif self.since is not None and category_lastmod is not None and category_lastmod <= self.since:
+            members = set(baseline) & set(published)
+        else:
+            listed = self.listed_urls(scraper, max_pages)
+            members = set(listed)
+
+        urls, carried = [], []
+        for key in members:
+            url, lastmod = published.get(key) or (listed[key], None)
+            fresh = lastmod is None or self.since is None or lastmod > self.since
+            product = baseline.get(key)
+            if product is None:
+                if fresh or listed:
+                    self.counts['new'] += 1
+                    urls.append(url)
+                else:
+                    # Unchanged since the last run, which left it out (e.g. not a supplement)
+                    self.counts['excluded'] += 1
+            elif fresh:
+                self.counts['changed'] += 1
+                urls.append(url)
+            else:
+                self.counts['unchanged'] += 1
+                carried.append(product)
+        self.counts['removed'] = len(set(baseline) - members)
+        return sorted(urls), carried
+
+    def listed_urls(self, scraper, max_pages=10):
+        """{canonical url: url} of every card on the listing pages of the scraper's category"""
+        urls = {}
+        page_num = 1
+        while True:
+            result = scraper.scrape_category_page(page_num)
+            if not result:
+                break
+            self.listing_pages += 1
+            cards, has_next = result
+            urls.update((canonical_url(card['url']), card['url']) for card in cards)
+            if not has_next or page_num >= max_pages:
+                break
+            page_num += 1
+        return urls
+
+    def print_stats(self):
+        discovery = self.discovery.counts if self.discovery is not None else {'fetches': 0, 'bytes': 0}
+        fetched = self.counts['new'] + self.counts['changed']
+        print(f"Sitemap: {discovery['fetches']} XML fetches ({discovery['bytes']:,} bytes), "
+              f"{self.listing_pages} listing pages for category membership")
+        print(f"Sitemap: {fetched} detail fetches ({self.counts['new']} new, {self.counts['changed']} changed), "
+              f"{self.counts['unchanged']} unchanged carried over, {self.counts['removed']} no longer listed")
+        if self.counts['excluded']:
+            print(f"Sitemap: {self.counts['excluded']} unchanged products left out by the last run skipped")
+
+
+def add_sitemap_arguments(parser):
+    """Add the shared --sitemap option to a scraper CLI"""
+    parser.add_argument('--sitemap', action='store_true',
+                        help="discover products from the shop's sitemaps and only fetch those whose lastmod "
+                             "is newer than the existing dataset")
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Stand-in WooCommerce Server
+Serves the saved fixture pages of both sites on localhost with configurable latency, jitter and error injection
+"""
+
+import argparse
+import gzip
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+# Path prefix per site; the scrapers get http://host:port/<site> as their base_url
+SITES = ('ifit', 'nbs')
+# Listed in every site's product_cat sitemap
+CATEGORIES = ('best-sellers-sport-supplement', 'fish-oil-omegas')
+
+PRODUCT_LINK = re.compile(r'https?://(?:www\.)?(?:ifit-eg\.com|nbs-supplements\.com)/product/([^/"\']+)/')
+NEXT_LINK = re.compile(r'<a class="next[^"]*"[^>]*>.*?</a>', re.S)
+SITEMAP_PATH = re.compile(r'^/(?P<site>\w+)/(?P<name>sitemap_index|product-sitemap|product_cat-sitemap)\.xml$')
+LISTING_PATH = re.compile(r'^/(?P<site>\w+)/(?:shop|product-category/[^/]+)/(?:page/(?P<page>\d+)/)?$')
+PRODUCT_PATH = re.compile(r'^/(?P<site>\w+)/product/(?P<slug>[^/]+)/$')
+
+
+def read_fixture(site, name):
+    with open(os.path.join(FIXTURES_DIR, site, name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+class FixtureSite:
+    def __init__(self, site, base_url, pages, lastmod=0):
+        """
+        Every listing page is the first saved listing with its product links
+        made unique to the page (<slug>-p<page>), so a crawl of N pages visits
+        N x 24 distinct product URLs. The last page has no next link. The
+        sitemaps list the same products, all modified at lastmod.
+        """
+        self.listing = read_fixture(site, 'listing-1.html')
+        self.lastmod = time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(lastmod))
+        self.products = [read_fixture(site, name) for name in sorted(os.listdir(os.path.join(FIXTURES_DIR, site)))
+                         if name.startswith('product')]
+        self.base_url = f"{base_url}/{site}"
+        self.pages = pages
+
+    def listing_page(self, path, page):
+        if page > self.pages:
+            return None
+        html = PRODUCT_LINK.sub(lambda match: f"{self.base_url}/product/{match.group(1)}-p{page}/", self.listing)
+        directory = path if page == 1 else path[:path.rindex('/page/') + 1]
+        next_link = f'<a class="next page-numbers" href="{self.base_url}{directory}page/{page + 1}/">→</a>'
+        return NEXT_LINK.sub(next_link if page < self.pages else '', html)
+
+    def sitemap(self, name):
+        if name == 'sitemap_index':
+            entries = [f"{self.base_url}/product-sitemap.xml", f"{self.base_url}/product_cat-sitemap.xml"]
+            tag, wrapper = 'sitemap', 'sitemapindex'
+        elif name == 'product-sitemap':
+            slugs = dict.fromkeys(PRODUCT_LINK.findall(self.listing))
+            entries = [f"{self.base_url}/product/{slug}-p{page}/" for page in range(1, self.pages + 1) for slug in slugs]
+            tag, wrapper = 'url', 'urlset'
+        else:
+            entries = [f"{self.base_url}/product-category/{slug}/" for slug in CATEGORIES]
+            tag, wrapper = 'url', 'urlset'
+        body = ''.join(f"<{tag}><loc>{url}</loc><lastmod>{self.lastmod}</lastmod></{tag}>" for url in entries)
+        return (f'<?xml version="1.0" encoding="UTF-8"?>'
+                f'<{wrapper} xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">{body}</{wrapper}>')
+
+    def product_page(self, slug):
+        # The same slug always gets the same fixture
+        return self.products[zlib.crc32(slug.encode('utf-8')) % len(self.products)]
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pages=5, latency=0.0, jitter=0.0, error_rate=0.0, seed=1, lastmod=None):
+        """
+        latency/jitter in seconds; error_rate: share of requests answered with a 503;
+        lastmod: epoch seconds the sitemaps report for every product (default now)
+        """
+        super().__init__(address, StandInHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.cache = {}
+        base_url = f"http://{self.server_address[0]}:{self.server_address[1]}"
+        lastmod = time.time() if lastmod is None else lastmod
+        self.sites = {site: FixtureSite(site, base_url, pages, lastmod) for site in SITES}
+        self.counts = {'requests': 0, 'errors': 0, 'bytes': 0}
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def delay_and_fail(self):
+        """Sleep the injected latency; True when this request should fail"""
+        with self.lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            fail = self.random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return fail
+
+    def render(self, path):
+        """Body of a path (cached, as bytes), None for a 404"""
+        with self.lock:
+            if path in self.cache:
+                return self.cache[path]
+        body = None
+        match = LISTING_PATH.match(path)
+        if match and match.group('site') in self.sites:
+            body = self.sites[match.group('site')].listing_page(path[len(match.group('site')) + 1:],
+                                                                int(match.group('page') or 1))
+        match = PRODUCT_PATH.match(path)
+        if match and match.group('site') in self.sites:
+            body = self.sites[match.group('site')].product_page(match.group('slug'))
+        match = SITEMAP_PATH.match(path)
+        if match and match.group('site') in self.sites:
+            body = self.sites[match.group('site')].sitemap(match.group('name'))
+        if body is not None:
+            body = body.encode('utf-8')
+            body = (body, gzip.compress(body, compresslevel=6, mtime=0))
+        with self.lock:
+            self.cache[path] = body
+        return body
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        fail = server.delay_and_fail()
+        body = None if fail else server.render(self.path.split('?')[0])
+        if fail:
+            status, payload, encoding = 503, b'Service Unavailable', None
+        elif body is None:
+            status, payload, encoding = 404, b'Not Found', None
+        elif 'gzip' in self.headers.get('Accept-Encoding', ''):
+            status, payload, encoding = 200, body[1], 'gzip'
+        else:
+            status, payload, encoding = 200, body[0], None
+        self.send_response(status)
+        xml = self.path.split('?')[0].endswith('.xml') and status == 200
+        self.send_header('Content-Type', f"{'application/xml' if xml else 'text/html'}; charset=UTF-8")
+        self.send_header('Content-Length', str(len(payload)))
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if status == 503:
+            self.send_header('Retry-After', '0')
+        self.end_headers()
+        self.wfile.write(payload)
+        with server.lock:
+            server.counts['requests'] += 1
+            server.counts['errors'] += status == 503
+            server.counts['bytes'] += len(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def add_server_arguments(parser):
+    """Add the shared latency / jitter / error injection options"""
+    parser.add_argument('--pages', type=int, default=5, help='listing pages per site')
+    parser.add_argument('--latency-ms', type=float, default=50.0, help='added response latency')
+    parser.add_argument('--jitter-ms', type=float, default=20.0, help='uniform +/- latency jitter')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with a 503')
+    parser.add_argument('--seed', type=int, default=1, help='seed for jitter and error injection')
+
+
+def server_from_args(args, port=0):
+    return StandInServer(('127.0.0.1', port), pages=args.pages, latency=args.latency_ms / 1000,
+                         jitter=args.jitter_ms / 1000, error_rate=args.error_rate, seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the saved WooCommerce fixtures on localhost')
+    parser.add_argument('--port', type=int, default=8090)
+    add_server_arguments(parser)
+    args = parser.parse_args()
+
+    server = server_from_args(args, args.port)
+    print(f"Listening on {server.url} (sites: {', '.join(f'{server.url}/{site}' for site in SITES)})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"✓ Served {server.counts['requests']} requests ({server.counts['errors']} injected errors, "
+              f"{server.counts['bytes']:,} bytes)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+WooCommerce Store Scraper Base
+Fetch, parse and collect plumbing shared by the store scrapers; subclasses supply the site's selectors
+"""
+
+import json
+import time
+from crawl_engine import CrawlEngine
+from http_client import HttpClient
+from html_parsing import LISTING_SCOPE, PRODUCT_SCOPE, make_soup, resolve_parser
+from parse_pool import parse_product_page
+from metrics import Metrics
+from structured_data import ExtractionStats, StoreApiListing, store_api_fields
+from jsonl_store import finalise
+from incremental import listing_card
+
+
+class StoreScraper:
+    """
+    Crawls one shop (or one product category of it) through the shared
+    engine. Subclasses implement extract_price() and parse_product() for
+    their site, and may narrow what is kept with keep_card() / keep_product().
+    """
+
+    # Shown in the run banner and written as the output document's source
+    name = 'WooCommerce store'
+    source = None
+    headers = {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+        'Accept-Language': 'en-US,en;q=0.9'
+    }
+    # Store API descriptions are cut to the lengths the site's page parser keeps
+    description_limit = None
+    short_description_limit = None
+
+    def __init__(self, base_url, category_slug=None, engine=None, http=None, cache=None, offline=False,
+                 incremental=None, parser='auto', scoped=True, parse_pool=None, writer=None, frontier=None,
+                 store_api=True, metrics=None, sitemap=None):
+        self.base_url = base_url
+        # The product category crawled, None for the whole shop
+        self.category_slug = category_slug
+        self.products = []
+        self.categories = set()
+        self.metrics = metrics or Metrics()
+        self.engine = engine or CrawlEngine(metrics=self.metrics)
+        self.http = http or HttpClient(self.headers, throttle=self.engine.throttle,
+                                      cache=cache, offline=offline, metrics=self.metrics)
+        self.incremental = incremental
+        self.sitemap = sitemap
+        self.parser = resolve_parser(parser)
+        self.scoped = scoped
+        self.parse_pool = parse_pool
+        self.writer = writer
+        self.frontier = frontier
+        self.store_api = StoreApiListing(self.http, self.base_url, category=self.category_slug) if store_api else None
+        self.extraction = ExtractionStats()
+        # Names this scraper's parsed records in a response cache other scrapers may share
+        self.parse_key = type(self).__name__
+        self.product_count = 0
+        self.products_with_images = 0
+        self.image_count = 0
+
+    def get_page(self, url, scope=None):
+        """Fetch a page through the pooled, retrying HTTP client"""
+        response = self.http.get(url)
+        if response is None:
+            return None
+        return self.make_soup(response.content, scope)
+
+    def make_soup(self, content, scope=None):
+        """Parse page bytes, keeping only the scoped nodes unless scoping is off"""
+        with self.metrics.stage('parse'):
+            return make_soup(content, self.parser, scope if self.scoped else None)
+
+    def scrape_product_details(self, product_url):
+        """Scrape detailed information from a product page"""
+        if self.store_api is not None:
+            product = self.store_api.take(product_url)
+            if product is not None:
+                return product
+        print(f"  Scraping: {product_url}")
+        return self.http.get_parsed(
+            product_url,
+            lambda response: self.parse_response(product_url, response),
+            key=self.parse_key
+        )
+
+    def parse_options(self):
+        """(name, value) constructor arguments a parse-pool worker needs to parse like this scraper"""
+        return ()
+
+    def parse_response(self, product_url, response):
+        """Parse a product page here, or hand its bytes to the parse pool"""
+        if self.parse_pool is not None:
+            return self.parse_pool.submit(parse_product_page, type(self), product_url,
+                                          response.content, self.parser, self.scoped, self.parse_options())
+        return self.parse_page(product_url, response.content)
+
+    def parse_page(self, product_url, content):
+        """Parse product page bytes into the product dict"""
+        soup = self.make_soup(content, PRODUCT_SCOPE)
+        with self.metrics.stage('extract'):
+            return self.parse_product(product_url, soup)
+
+    def extract_price(self, price_text):
+        """Extract numeric price from text"""
+        raise NotImplementedError
+
+    def parse_product(self, product_url, soup):
+        """Extract the product fields from a parsed product page"""
+        raise NotImplementedError
+
+    def store_categories(self, fields):
+        """The categories a Store API product is filed under"""
+        return fields['categories']
+
+    def parse_store_product(self, item):
+        """Build the product dict from one Store API product"""
+        fields = store_api_fields(item)
+        categories = self.store_categories(fields)
+        description = fields['description'][:self.description_limit]
+        short_description = fields['short_description'][:self.short_description_limit]
+        return {
+            'url': fields['url'],
+            'name': fields['name'],
+            'price': fields['price'],
+            'original_price': fields['original_price'],
+            'category': categories[0] if categories else '',
+            'categories': categories,
+            'images': fields['images'],
+            'description': description or short_description,
+            'short_description': short_description,
+            'in_stock': fields['in_stock']
+        }
+
+    def listing_url(self, page_num):
+        path = f"product-category/{self.category_slug}" if self.category_slug else 'shop'
+        return f"{self.base_url}/{path}/page/{page_num}/" if page_num > 1 else f"{self.base_url}/{path}/"
+
+    def scrape_category_page(self, page_num=1):
+        """Scrape product links from a listing page, returns (cards, has_next)"""
+        if self.store_api is not None:
+            # A whole page of complete products in one request when the shop exposes it
+            listing = self.store_api.fetch(page_num, self.parse_store_product)
+            if listing is not None:
+                return listing
+
+        url = self.listing_url(page_num)
+        print(f"\n{'='*60}")
+        print(f"Scraping page {page_num}: {url}")
+        print('='*60)
+
+        soup = self.get_page(url, LISTING_SCOPE)
+        if not soup:
+            return None
+
+        return self.parse_listing(soup)
+
+    def keep_card(self, item, link_elem):
+        """False drops a listing card before its product page is fetched"""
+        return True
+
+    def parse_listing(self, soup):
+        """Extract the product cards and next-page flag from a parsed listing page"""
+        # Try different selectors for product items
+        product_items = soup.find_all('li', class_='product')
+        if not product_items:
+            product_items = soup.find_all('div', class_='product')
+
+        print(f"Found {len(product_items)} product items on page")
+
+        cards = []
+        for item in product_items:
+            # Find product link
+            link_elem = item.find('a', class_='woocommerce-LoopProduct-link')
+            if not link_elem:
+                link_elem = item.find('a', href=True)
+
+            if link_elem and self.keep_card(item, link_elem):
+                cards.append(listing_card(item, link_elem.get('href'), self.extract_price))
+
+        # Check if there's a next page
+        next_page = soup.find('a', class_='next')
+        return cards, next_page is not None
+
+    def keep_product(self, product):
+        """False leaves a scraped product out of the output"""
+        return True
+
+    def add_product(self, product):
+        """Keep a scraped product, streaming it to the JSON Lines writer when one is set"""
+        if self.writer is not None:
+            self.writer.write(product)
+        else:
+            self.products.append(product)
+        self.categories.update(product['categories'])
+        self.product_count += 1
+        if product['images']:
+            self.products_with_images += 1
+        self.image_count += len(product['images'])
+
+    def collect_page(self, page_num, results):
+        """Add the scraped products of one listing page, in listing order"""
+        products_found = 0
+        for product_url, product_data in results:
+            product_data = self.extraction.record(product_data)
+            if not product_data or not product_data['name']:
+                self.metrics.inc('products_failed')
+                print(f"  ✗ Skipped: Could not extract product data")
+            elif not self.keep_product(product_data):
+                self.metrics.inc('products_filtered')
+                print(f"  ✗ Skipped (filtered out): {product_data['name']}")
+            else:
+                self.add_product(product_data)
+                products_found += 1
+                self.metrics.inc('products_added')
+                print(f"  ✓ Added: {product_data['name']} ({len(product_data['images'])} images)")
+
+        print(f"\nPage {page_num} complete: {products_found} products added")
+        if self.writer is not None:
+            self.writer.checkpoint()
+
+    def scrape_all(self, max_pages=10):
+        """Scrape all products from multiple pages"""
+        print("\n" + "="*60)
+        print(f"Starting {self.name} Scraper")
+        print("="*60)
+
+        # Listing and product pages are fetched concurrently; politeness is
+        # enforced per host by the engine's concurrency cap and rate limit
+        done_urls = self.writer.done_urls if self.writer is not None else None
+        plan = self.sitemap.plan(self, max_pages) if self.sitemap is not None else None
+        if plan is not None:
+            # Only products the sitemap shows as new or modified are fetched
+            urls, carried = plan
+            self.engine.crawl_urls(self, urls, skip=done_urls, frontier=self.frontier)
+            for product in carried:
+                self.add_product(product)
+            self.sitemap.print_stats()
+        else:
+            last_page = self.engine.crawl(self, max_pages, incremental=self.incremental, skip=done_urls,
+                                          frontier=self.frontier)
+            stopped_early = self.incremental is not None and self.incremental.stopped_early
+            if last_page < max_pages and not stopped_early:
+                print(f"\nNo more pages found after page {last_page}")
+
+            if self.incremental is not None:
+                # Products on listing pages after an unchanged one are kept as they were
+                carried = self.incremental.unvisited() if stopped_early else []
+                for product in carried:
+                    self.add_product(product)
+                self.incremental.print_stats()
+
+        print("\n" + "="*60)
+        print("Scraping Complete!")
+        print("="*60)
+        self.print_stats()
+        self.extraction.print_stats(self.store_api)
+        self.http.print_stats()
+        if self.frontier is not None:
+            self.frontier.print_stats()
+        self.metrics.add_counters('http', self.http.stats())
+        self.metrics.print_stats()
+
+        return self.products
+
+    def print_stats(self):
+        print(f"Total products scraped: {self.product_count}")
+        print(f"Products with images: {self.products_with_images}")
+        print(f"Average images per product: {self.image_count / self.product_count if self.product_count else 0:.1f}")
+        print(f"Categories: {', '.join(sorted(self.categories))}")
+
+    def save_to_json(self, filename):
+        """Save scraped data to JSON file"""
+        if self.writer is not None:
+            # Products were streamed as they were scraped, compact them now
+            self.writer.close()
+            total = finalise(self.writer.path, filename, source=self.source, categories=self.categories)
+            print(f"\n✓ Data saved to {filename} ({total} products from {self.writer.path})")
+            return filename
+
+        data = {
+            'products': self.products,
+            'categories': sorted(list(self.categories)),
+            'total_products': len(self.products),
+            'scraped_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        if self.source:
+            data['source'] = self.source
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+        print(f"\n✓ Data saved to {filename}")
+        return filename
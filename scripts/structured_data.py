@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Structured Product Data
+Reads products from the WooCommerce Store API and Product JSON-LD before falling back to DOM heuristics
+"""
+
+import html
+import json
+from urllib.parse import urlencode
+
+from html_parsing import make_soup
+
+# Key a parsed product carries until collect_page counts and drops it
+EXTRACTED_BY = '_extracted_by'
+PATHS = ('store_api', 'json_ld', 'dom')
+
+
+def html_text(fragment):
+    """Plain text of an HTML fragment, the way get_text(strip=True) reads the page"""
+    if not fragment:
+        return ''
+    return make_soup(fragment).get_text(strip=True)
+
+
+def _product_node(data):
+    """Find the Product object in a JSON-LD document (plain, list or @graph)"""
+    if isinstance(data, list):
+        for item in data:
+            node = _product_node(item)
+            if node is not None:
+                return node
+        return None
+    if not isinstance(data, dict):
+        return None
+    types = data.get('@type')
+    if types == 'Product' or (isinstance(types, list) and 'Product' in types):
+        return data
+    if '@graph' in data:
+        return _product_node(data['@graph'])
+    return None
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def jsonld_product(soup):
+    """
+    The fields a Product JSON-LD block provides: name, price, original_price,
+    in_stock and images. Only fields present in the block are returned;
+    None when the page has no usable Product block.
+    """
+    node = None
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            node = _product_node(json.loads(script.string or ''))
+        except ValueError:
+            continue
+        if node is not None:
+            break
+    if node is None or not node.get('name'):
+        return None
+
+    fields = {'name': html.unescape(str(node['name'])).strip()}
+
+    offers = node.get('offers') or []
+    if isinstance(offers, dict):
+        offers = [offers]
+    offer = offers[0] if offers else {}
+    specs = offer.get('priceSpecification') or []
+    if isinstance(specs, dict):
+        specs = [specs]
+
+    price = _to_float(offer.get('price'))
+    if price is None:
+        price = _to_float(offer.get('lowPrice'))
+    for spec in specs:
+        price_type = str(spec.get('priceType', ''))
+        if price_type.endswith(('ListPrice', 'StrikethroughPrice')):
+            # WooCommerce 9+ lists the regular price of a sale item this way
+            fields['original_price'] = _to_float(spec.get('price'))
+        elif price is None:
+            price = _to_float(spec.get('price'))
+    if price is not None:
+        fields['price'] = price
+
+    availability = offer.get('availability')
+    if availability:
+        fields['in_stock'] = not str(availability).endswith(('OutOfStock', 'SoldOut', 'Discontinued'))
+
+    images = node.get('image') or []
+    if not isinstance(images, list):
+        images = [images]
+    images = [image.get('url') if isinstance(image, dict) else image for image in images]
+    images = [image for image in images if isinstance(image, str) and image.startswith('http')]
+    if images:
+        fields['images'] = images
+    return fields
+
+
+def store_api_fields(item):
+    """Common product fields from one /wp-json/wc/store/v1/products entry"""
+    prices = item.get('prices') or {}
+    minor_unit = 10 ** int(prices.get('currency_minor_unit', 2))
+
+    def amount(key):
+        value = _to_float(prices.get(key))
+        return value / minor_unit if value is not None else None
+
+    price = amount('price')
+    regular_price = amount('regular_price')
+    on_sale = item.get('on_sale') or (regular_price is not None and price is not None and regular_price > price)
+    images = [image.get('src') for image in item.get('images') or []]
+    return {
+        'url': item.get('permalink', ''),
+        'name': html.unescape(item.get('name', '')).strip(),
+        'price': price,
+        'original_price': regular_price if on_sale else None,
+        'categories': [html.unescape(category.get('name', '')) for category in item.get('categories') or []],
+        'images': [image for image in images if image and image.startswith('http')],
+        'description': html_text(item.get('description')),
+        'short_description': html_text(item.get('short_description')),
+        'in_stock': item.get('is_in_stock', True),
+    }
+
+
+class StoreApiListing:
+    """Listing pages read from the WooCommerce Store API, a whole page of full products per request"""
+
+    def __init__(self, http, base_url, category=None, per_page=100):
+        """
+        http: the scraper's HttpClient (throttling, retries and cache apply)
+        category: category slug to list, None for the whole shop
+        per_page: products per API request (the Store API allows up to 100)
+        """
+        self.http = http
+        self.base_url = base_url.rstrip('/')
+        self.category = category
+        self.per_page = per_page
+        self.available = True
+        self.products = {}
+        self.pages = 0
+        self.served = 0
+
+    def page_url(self, page_num):
+        params = {'per_page': self.per_page, 'page': page_num}
+        if self.category:
+            params['category'] = self.category
+        return f"{self.base_url}/wp-json/wc/store/v1/products?{urlencode(params)}"
+
+    def fetch(self, page_num, to_product):
+        """
+        (cards, has_next) for one API page, keeping each product built by
+        to_product(item) for take(). None once the endpoint turned out to be
+        missing, so the caller reads the HTML listing instead.
+        """
+        if not self.available:
+            return None
+        url = self.page_url(page_num)
+        response = self.http.get(url)
+        try:
+            items = response.json() if response is not None else None
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            if page_num == 1:
+                print(f"Store API not available at {url}, reading the HTML listings")
+                self.available = False
+            return None
+
+        self.pages += 1
+        print(f"\nStore API page {page_num}: {len(items)} products ({url})")
+        cards = []
+        for item in items:
+            product = to_product(item)
+            product[EXTRACTED_BY] = 'store_api'
+            self.products[product['url']] = product
+            cards.append({'url': product['url'], 'price': product['price'], 'in_stock': product['in_stock']})
+
+        total_pages = response.headers.get('X-WP-TotalPages')
+        if total_pages is not None:
+            has_next = page_num < int(total_pages)
+        else:
+            # Replayed responses lose their headers, a full page means there may be more
+            has_next = len(items) >= self.per_page
+        return cards, has_next
+
+    def take(self, url):
+        """The product an API page already returned for url, or None"""
+        product = self.products.pop(url, None)
+        if product is not None:
+            self.served += 1
+        return product
+
+
+class ExtractionStats:
+    def __init__(self):
+        self.counts = dict.fromkeys(PATHS, 0)
+
+    def record(self, product):
+        """Count which path produced a product and return it without the marker"""
+        if not product or EXTRACTED_BY not in product:
+            return product
+        product = dict(product)
+        self.counts[product.pop(EXTRACTED_BY)] += 1
+        return product
+
+    def print_stats(self, store_api=None):
+        print(f"Extraction: {self.counts['store_api']} Store API, {self.counts['json_ld']} JSON-LD, "
+              f"{self.counts['dom']} DOM fallback")
+        if store_api is not None and store_api.pages:
+            print(f"Store API: {store_api.served} products from {store_api.pages} requests, "
+                  f"{store_api.served} product page requests saved")
+
+
+def add_structured_arguments(parser):
+    """Add the shared --no-store-api option to a scraper CLI"""
+    parser.add_argument('--no-store-api', action='store_true',
+                        help='read the HTML listings and product pages instead of the WooCommerce Store API')